@@ -1,32 +1,156 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_file
+import numpy as np
 import pandas as pd
-import mysql.connector
-from datetime import datetime, timedelta
-import io
+from datetime import datetime
 import json
+import os
+import tempfile
+import time
+
+from cache import table_cache, invalidate_table
+from dashboard_summary import compute_dashboard_summary, lab_overview, staff_overview, finance_overview
+from query_builder import filter_args, apply_filters, AGE_GROUP_BOUNDS
+from data_source import read_table, open_table_chunks, get_connection, connection_stats, reconcile_table, refresh_rows, delta_stats, use_snapshot
+from snapshot import write_frames
+from pagination import paginate_frame
+from schedule_conflicts import find_schedule_conflicts, filter_conflicts, conflict_summary
+from availability import slot_index, normalize_day, parse_time
+from normalize import LAB_STATUS, STAFF_ACTIVE
+from search_index import search_indexes
+from finance_rollup import finance_rollup, summarize_frame
+from registration_index import registration_index
+from lab_turnaround import lab_turnaround
+from pharmacy_ledger import pharmacy_ledger, InsufficientStock, EXPIRY_WINDOW_DAYS
+from forecast import forecast_service, FORECAST_HORIZON
+from serializer import FastJSONProvider, serialize_frame, to_records
+import instrumentation
+from instrumentation import phase
 
 app = Flask(__name__)
+# jsonify() dan |tojson lewat serializer.py (konversi per kolom, orjson kalau ada)
+app.json = FastJSONProvider(app)
+# Server-Timing, /metrics, profiler opt-in (lihat instrumentation.py)
+instrumentation.init_app(app)
 
 # ------------------------------
-# FUNGSI KONEKSI DATABASE
+# PREPARE FUNCTIONS
 # ------------------------------
-def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="hospital"
-    )
+# Kolom turunan per baris. Dipisah dari loader supaya bisa dipakai juga
+# per chunk saat export streaming.
+
+def prepare_doctor_df(df):
+    if 'doctor_id' not in df.columns:
+        df['doctor_id'] = range(1, len(df) + 1)
+
+    # Konversi hari Indonesia ke Inggris untuk konsistensi
+    day_mapping = {
+        'Senin': 'Monday',
+        'Selasa': 'Tuesday', 
+        'Rabu': 'Wednesday',
+        'Kamis': 'Thursday',
+        'Jumat': 'Friday',
+        'Sabtu': 'Saturday',
+        'Minggu': 'Sunday'
+    }
+    
+    if 'schedule_day' in df.columns:
+        df['schedule_day_english'] = df['schedule_day'].map(day_mapping)
+        # Simpan juga versi Indonesia untuk display
+        df['schedule_day_indonesia'] = df['schedule_day']
+    else:
+        df['schedule_day_english'] = ''
+        df['schedule_day_indonesia'] = ''
+
+    # Clean data types untuk menghindari JSON serialization issues
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif pd.api.types.is_timedelta64_dtype(df[col]):
+            df[col] = df[col].astype(str)
+
+    return df
+
+# Bin kelompok umur dari AGE_GROUP_BOUNDS: [0, 18) [18, 40) [40, 60) [60, ...)
+AGE_GROUP_LABELS = list(AGE_GROUP_BOUNDS)
+AGE_GROUP_BINS = [-float('inf')] + [low for low, _ in list(AGE_GROUP_BOUNDS.values())[1:]] + [float('inf')]
+
+def compute_age(birth_dates, today=None):
+    """
+    Umur (tahun penuh) per tanggal lahir, dihitung vektor di array datetime:
+    selisih tahun dikurangi 1 kalau ulang tahun tahun ini belum lewat.
+    Tanggal kosong/invalid -> 0.
+    """
+    today = pd.Timestamp(today or datetime.today())
+    births = pd.to_datetime(birth_dates, errors='coerce')
+    birthday_pending = births.dt.month * 100 + births.dt.day > today.month * 100 + today.day
+    age = today.year - births.dt.year - birthday_pending.astype(int)
+    return age.fillna(0).astype(int)
+
+def categorize_age(ages):
+    """Kelompok umur sebagai categorical (urutan kategori = urutan umur)"""
+    return pd.cut(ages, bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS, right=False)
+
+def prepare_patient_df(df):
+    if 'birth_date' in df.columns:
+        df['birth_date'] = pd.to_datetime(df['birth_date'], errors='coerce')
+        df['age'] = compute_age(df['birth_date'])
+    else:
+        df['age'] = 0
+
+    df['age_group'] = categorize_age(df['age'])
+    return df
+
+def prepare_pharmacy_df(df):
+    if 'expiry_date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['expiry_date']):
+        df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
+
+    # Hitung stok saat ini
+    if 'stock_in' in df.columns and 'stock_out' in df.columns:
+        df['current_stock'] = df['stock_in'] - df['stock_out']
+    else:
+        df['current_stock'] = 0
+    return df
+
+def prepare_staff_df(df):
+    # Hitung years of service
+    if 'hire_date' in df.columns:
+        df['hire_date'] = pd.to_datetime(df['hire_date'], errors='coerce')
+        today = datetime.today()
+        df['years_of_service'] = ((today - df['hire_date']).dt.days / 365.25).round(1)
+    else:
+        df['years_of_service'] = 0
+    return df
+
+def prepare_finance_df(df):
+    # Convert amount to float
+    if 'amount_idr' in df.columns:
+        df['amount_idr'] = pd.to_numeric(df['amount_idr'], errors='coerce')
+    
+    # Convert transaction_date to datetime
+    if 'transaction_date' in df.columns:
+        df['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
+    return df
+
+def count_values(df, column, head=None):
+    """
+    value_counts() sebagai dict untuk chart. Kolom category ikut menghitung
+    kategori yang tidak muncul di hasil filter (count 0); itu dibuang.
+    """
+    if column not in df.columns:
+        return {}
+    counts = df[column].value_counts()
+    counts = counts[counts > 0]
+    if head is not None:
+        counts = counts.head(head)
+    return counts.to_dict()
 
 # ------------------------------
 # LOAD DATA FUNCTIONS
 # ------------------------------
+@table_cache.cached('doctor_schedule')
 def load_doctor_data():
     try:
-        conn = get_connection()
-        query = "SELECT * FROM doctor_schedule"
-        df = pd.read_sql(query, conn)
-        conn.close()
+        df = read_table('doctor_schedule')
 
         print("Kolom di tabel doctor_schedule:", df.columns.tolist())
         print(f"Jumlah baris data dokter: {len(df)}")
@@ -40,48 +164,20 @@ def load_doctor_data():
 
         if 'doctor_id' not in df.columns:
             print("⚠️ Kolom 'doctor_id' tidak ditemukan! Menambahkan dummy ID...")
-            df['doctor_id'] = range(1, len(df) + 1)
-
-        # Konversi hari Indonesia ke Inggris untuk konsistensi
-        day_mapping = {
-            'Senin': 'Monday',
-            'Selasa': 'Tuesday', 
-            'Rabu': 'Wednesday',
-            'Kamis': 'Thursday',
-            'Jumat': 'Friday',
-            'Sabtu': 'Saturday',
-            'Minggu': 'Sunday'
-        }
-        
-        if 'schedule_day' in df.columns:
-            df['schedule_day_english'] = df['schedule_day'].map(day_mapping)
-            # Simpan juga versi Indonesia untuk display
-            df['schedule_day_indonesia'] = df['schedule_day']
-        else:
-            df['schedule_day_english'] = ''
-            df['schedule_day_indonesia'] = ''
-
-        # Clean data types untuk menghindari JSON serialization issues
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
-            elif pd.api.types.is_timedelta64_dtype(df[col]):
-                df[col] = df[col].astype(str)
 
-        return df
+        return prepare_doctor_df(df)
     except Exception as e:
         print(f"[ERROR] Gagal load data dokter: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(columns=[
             'schedule_id', 'doctor_id', 'name', 'specialization',
             'schedule_day', 'start_time', 'end_time', 'room_id'
         ])
 
+@table_cache.cached('rooms')
 def load_room_data():
     try:
-        conn = get_connection()
-        query = "SELECT * FROM rooms"
-        df = pd.read_sql(query, conn)
-        conn.close()
+        df = read_table('rooms')
 
         total_rooms = len(df)
         occupied_rooms = len(df[df['current_occupancy'] > 0]) if 'current_occupancy' in df.columns else 0
@@ -105,66 +201,40 @@ def load_room_data():
 
     except Exception as e:
         print(f"[ERROR] Gagal load data ruangan: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(), 0, 0, 0, {}
 
-def load_patient_data():
+@table_cache.cached('patients')
+def load_patient_data(filters=()):
     try:
-        conn = get_connection()
-        query = "SELECT * FROM patients"
-        df = pd.read_sql(query, conn)
-        conn.close()
-
-        if 'birth_date' in df.columns:
-            df['birth_date'] = pd.to_datetime(df['birth_date'], errors='coerce')
-            today = datetime.today()
-            df['age'] = df['birth_date'].apply(
-                lambda x: today.year - x.year - ((today.month, today.day) < (x.month, x.day)) 
-                if pd.notnull(x) else 0
-            )
-        else:
-            df['age'] = 0
-
-        def categorize_age(age):
-            if age < 18:
-                return 'Anak (<18)'
-            elif 18 <= age < 40:
-                return 'Dewasa Muda (18-39)'
-            elif 40 <= age < 60:
-                return 'Dewasa (40-59)'
-            else:
-                return 'Lansia (60+)'
-        
-        df['age_group'] = df['age'].apply(categorize_age)
+        df = read_table('patients', filters)
+
+        df = prepare_patient_df(df)
 
         total_patients = len(df)
-        gender_dist = df['gender'].value_counts().to_dict() if 'gender' in df.columns else {}
-        payment_dist = df['payment_type'].value_counts().to_dict() if 'payment_type' in df.columns else {}
-        insurance_dist = df['insurance_provider'].value_counts().to_dict() if 'insurance_provider' in df.columns else {}
-        city_dist = df['city'].value_counts().head(10).to_dict() if 'city' in df.columns else {}
+        gender_dist = count_values(df, 'gender')
+        payment_dist = count_values(df, 'payment_type')
+        insurance_dist = count_values(df, 'insurance_provider')
+        city_dist = count_values(df, 'city', head=10)
 
         return df, total_patients, gender_dist, payment_dist, insurance_dist, city_dist
 
     except Exception as e:
         print(f"[ERROR] Gagal load data pasien: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(), 0, {}, {}, {}, {}
 
+@table_cache.cached('pharmacy_stock')
 def load_pharmacy_data():
     try:
-        conn = get_connection()
-        query = "SELECT * FROM pharmacy_stock"
-        df = pd.read_sql(query, conn)
-        conn.close()
+        df = read_table('pharmacy_stock')
 
         if df.empty:
             return pd.DataFrame(columns=[
                 'drug_id','drug_name','category','stock_in','stock_out','stock_date','expiry_date','supplier'
             ]), 0, 0, 0, 0
 
-        # Hitung stok saat ini
-        if 'stock_in' in df.columns and 'stock_out' in df.columns:
-            df['current_stock'] = df['stock_in'] - df['stock_out']
-        else:
-            df['current_stock'] = 0
+        df = prepare_pharmacy_df(df)
 
         # Statistik
         total_medicines = len(df)
@@ -176,28 +246,21 @@ def load_pharmacy_data():
 
     except Exception as e:
         print(f"[ERROR] Gagal load data pharmacy: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(columns=[
             'drug_id','drug_name','category','stock_in','stock_out','stock_date','expiry_date','supplier'
         ]), 0, 0, 0, 0
 
-def load_staff_data():
+@table_cache.cached('staff')
+def load_staff_data(filters=()):
     try:
-        conn = get_connection()
-        query = "SELECT * FROM staff"
-        df = pd.read_sql(query, conn)
-        conn.close()
-
-        # Hitung years of service
-        if 'hire_date' in df.columns:
-            df['hire_date'] = pd.to_datetime(df['hire_date'], errors='coerce')
-            today = datetime.today()
-            df['years_of_service'] = ((today - df['hire_date']).dt.days / 365.25).round(1)
-        else:
-            df['years_of_service'] = 0
+        df = read_table('staff', filters)
+
+        df = prepare_staff_df(df)
 
         # Hitung statistik
         total_staff = len(df)
-        active_staff = len(df[df['active'] == 'True']) if 'active' in df.columns else 0
+        active_staff = STAFF_ACTIVE.count(df['active'], 'True') if 'active' in df.columns else 0
         inactive_staff = total_staff - active_staff
         staff_departments_count = df['department'].nunique() if 'department' in df.columns else 0
 
@@ -205,62 +268,151 @@ def load_staff_data():
 
     except Exception as e:
         print(f"[ERROR] Gagal load data staff: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(columns=[
             'staff_id', 'name', 'role', 'department', 'hire_date', 'active', 'years_of_service'
         ]), 0, 0, 0, 0
 
-def load_lab_tests_data():
+@table_cache.cached('lab_tests', 'patients')
+def load_lab_tests_data(filters=()):
     try:
-        conn = get_connection()
-        
         # Query dengan JOIN ke tabel patients untuk mendapatkan nama pasien
-        query = """
-        SELECT lt.*, p.name as patient_name 
-        FROM lab_tests lt 
-        LEFT JOIN patients p ON lt.patient_id = p.patient_id
-        """
-        df = pd.read_sql(query, conn)
-        conn.close()
+        df = read_table('lab_tests', filters)
 
         # Hitung statistik
         total_lab_tests = len(df)
-        pending_tests = len(df[df['result_status'] == 'Pending']) if 'result_status' in df.columns else 0
-        completed_tests = len(df[df['result_status'] == 'Completed']) if 'result_status' in df.columns else 0
+        pending_tests = LAB_STATUS.count(df['result_status'], 'Pending') if 'result_status' in df.columns else 0
+        completed_tests = LAB_STATUS.count(df['result_status'], 'Completed') if 'result_status' in df.columns else 0
         lab_test_types_count = df['test_type'].nunique() if 'test_type' in df.columns else 0
 
         return df, total_lab_tests, pending_tests, completed_tests, lab_test_types_count
 
     except Exception as e:
         print(f"[ERROR] Gagal load data lab tests: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(columns=[
             'test_id', 'patient_id', 'patient_name', 'test_type', 
             'scheduled_date', 'result_date', 'result_status', 'lab_staff_id'
         ]), 0, 0, 0, 0
 
-def load_finance_data():
+@table_cache.cached('finance')
+def load_finance_data(filters=()):
     try:
-        conn = get_connection()
-        query = "SELECT * FROM finance"
-        df = pd.read_sql(query, conn)
-        conn.close()
-
-        # Convert amount to float
-        if 'amount_idr' in df.columns:
-            df['amount_idr'] = pd.to_numeric(df['amount_idr'], errors='coerce')
-        
-        # Convert transaction_date to datetime
-        if 'transaction_date' in df.columns:
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'], errors='coerce')
+        df = read_table('finance', filters)
 
-        return df
+        return prepare_finance_df(df)
 
     except Exception as e:
         print(f"[ERROR] Gagal load data finance: {e}")
+        table_cache.dont_cache()
         return pd.DataFrame(columns=[
             'transaction_id', 'patient_id', 'entry_type', 'service_type', 
             'amount_idr', 'payment_type', 'insurance_provider', 'payment_method', 'transaction_date'
         ])
 
+@table_cache.cached('finance')
+def count_finance_patients(filters=()):
+    # Distinct count tidak bisa diambil dari rollup; di-cache per filter bersama frame-nya
+    df = load_finance_data(filters)
+    return int(df['patient_id'].nunique()) if 'patient_id' in df.columns else 0
+
+@table_cache.cached('registrations')
+def load_registration_data(filters=()):
+    try:
+        return read_table('registrations', filters)
+
+    except Exception as e:
+        print(f"[ERROR] Gagal load data registrasi: {e}")
+        table_cache.dont_cache()
+        return pd.DataFrame(columns=[
+            'registration_id', 'patient_id', 'visit_date', 'visit_time', 'department', 'status'
+        ])
+
+@table_cache.cached('patient_trends')
+def load_patient_trends():
+    try:
+        return read_table('patient_trends')
+
+    except Exception as e:
+        print(f"[ERROR] Gagal load data patient_trends: {e}")
+        table_cache.dont_cache()
+        return pd.DataFrame(columns=[
+            'date', 'total_patients', 'top_disease', 'weather', 'population_density', 'external_event'
+        ])
+
+@table_cache.cached('doctor_schedule')
+def load_schedule_conflicts():
+    # Bentrok jadwal dokter & ruangan (lihat schedule_conflicts.py)
+    return find_schedule_conflicts(load_doctor_data())
+
+DOCTOR_GROUP_KEYS = ['name', 'specialization', 'schedule_day_indonesia']
+
+def group_doctor_schedules(df):
+    """
+    Satu baris per (dokter, spesialisasi, hari) berisi jadwal pertama untuk tabel
+    dan `all_schedules` untuk modal. Satu sort stabil lalu batas grup dicari
+    dengan numpy, jadi tidak ada loop pandas per grup.
+    """
+    # Frame fallback (DB gagal) kosong dan tanpa schedule_day_indonesia
+    if df.empty or not set(DOCTOR_GROUP_KEYS).issubset(df.columns):
+        return []
+    ordered = df.dropna(subset=DOCTOR_GROUP_KEYS).sort_values(DOCTOR_GROUP_KEYS, kind='stable')
+    if ordered.empty:
+        return []
+
+    keys = ordered[DOCTOR_GROUP_KEYS]
+    new_group = keys.ne(keys.shift()).any(axis=1).to_numpy()
+    starts = np.flatnonzero(new_group).tolist()
+    ends = starts[1:] + [len(ordered)]
+
+    schedules = [
+        {'start_time': start, 'end_time': end, 'room_id': room}
+        for start, end, room in zip(
+            ordered['start_time'].tolist(), ordered['end_time'].tolist(), ordered['room_id'].tolist()
+        )
+    ]
+    names, specializations, days = (ordered[col].tolist() for col in DOCTOR_GROUP_KEYS)
+
+    table_data = []
+    for start, end in zip(starts, ends):
+        first = schedules[start]
+        table_data.append({
+            'name': names[start],
+            'specialization': specializations[start],
+            'schedule_day_indonesia': days[start],
+            'start_time': first['start_time'],
+            'end_time': first['end_time'],
+            'room_id': first['room_id'],
+            'all_schedules': schedules[start:end]  # Simpan semua jadwal untuk modal
+        })
+    return table_data
+
+# Argumen pencarian teks per tabel -> (index trigram, kolom id)
+SEARCH_FILTERS = {
+    'patients': ('search_patient', 'patients', 'patient_id'),
+    'staff': ('search_staff', 'staff', 'staff_id'),
+}
+
+def load_searched(table, args, load):
+    """
+    Frame `table` untuk filter tab di `args`. Pencarian >= 3 huruf dilayani index
+    trigram (search_index.py) alih-alih LIKE; filter lain tetap di SQL.
+    `load(filters)` = loader tabel, mis. lambda f: load_patient_data(f)[0].
+    """
+    filters = filter_args(table, args)
+    arg, entity, id_column = SEARCH_FILTERS[table]
+    query = dict(filters).get(arg)
+    ids = None
+    if query:
+        index = search_indexes[entity]
+        index.sync(SEARCH_SOURCES[entity]())
+        ids = index.search_ids(query)
+    if ids is None:
+        # Tanpa pencarian, atau query < 3 huruf: LIKE di SQL
+        return load(filters)
+    df = load(tuple((name, value) for name, value in filters if name != arg))
+    return df[df[id_column].astype(str).isin(ids)]
+
 # ------------------------------
 # ROUTES
 # ------------------------------
@@ -288,86 +440,35 @@ def dashboard():
         }
         today_indonesia = day_mapping_reverse.get(today_english, today_english)
         
-        # Data dokter hari ini
-        df_doctor = load_doctor_data()
-        if 'schedule_day_english' in df_doctor.columns:
-            today_doctors = df_doctor[df_doctor['schedule_day_english'] == today_english]
-            total_today_doctors = len(today_doctors)
-            print(f"🩺 Dokter hari ini ({today_english}/{today_indonesia}): {total_today_doctors} dokter")
-        else:
-            total_today_doctors = 0
-            today_doctors = pd.DataFrame()
-            print("⚠️ Kolom schedule_day_english tidak ditemukan")
-        
-        # Data ruangan
-        df_room, total_rooms, occupied_rooms, available_rooms, room_stats = load_room_data()
-        occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
-        
-        # Data pasien hari ini
-        try:
-            conn = get_connection()
-            query = "SELECT COUNT(*) as count FROM patients WHERE DATE(registration_date) = %s"
-            df_today_patients = pd.read_sql(query, conn, params=[today])
-            today_patients = df_today_patients.iloc[0]['count']
-            conn.close()
-        except Exception as e:
-            print(f"Error loading today patients: {e}")
-            today_patients = 0
-        
-        # Data pharmacy
-        df_pharmacy, total_medicines, low_stock_medicines, out_of_stock_medicines, pharmacy_categories = load_pharmacy_data()
-        
-        # Data lab tests hari ini
-        df_lab, total_lab_tests, pending_tests, completed_tests, lab_test_types_count = load_lab_tests_data()
-        if 'scheduled_date' in df_lab.columns:
-            today_lab_tests = df_lab[df_lab['scheduled_date'] == today.strftime('%Y-%m-%d')]
-            total_today_tests = len(today_lab_tests)
-        else:
-            total_today_tests = 0
-            today_lab_tests = pd.DataFrame()
-        
-        # Data staff aktif
-        df_staff, total_staff, active_staff, inactive_staff, staff_departments_count = load_staff_data()
-        
-        # Data finance hari ini
-        try:
-            df_finance = load_finance_data()
-            today_finance = df_finance[df_finance['transaction_date'] == today.strftime('%Y-%m-%d')] if 'transaction_date' in df_finance.columns else pd.DataFrame()
-            today_revenue = today_finance['amount_idr'].sum() if 'amount_idr' in today_finance.columns else 0
-            total_revenue = df_finance['amount_idr'].sum() if 'amount_idr' in df_finance.columns else 0
-        except Exception as e:
-            print(f"Error loading finance data: {e}")
-            today_revenue = 0
-            total_revenue = 0
+        # Semua angka dihitung dengan query agregat (lihat dashboard_summary.py)
+        summary = compute_dashboard_summary(today, today_indonesia)
+        print(f"🩺 Dokter hari ini ({today_english}/{today_indonesia}): {summary['today_doctors']} dokter")
         
-        # Data untuk chart dokter hari ini
-        today_doctors_spec = today_doctors['specialization'].value_counts().to_dict() if 'specialization' in today_doctors.columns else {}
-        
-        # Data untuk chart tes lab hari ini
-        today_tests_status = today_lab_tests['result_status'].value_counts().to_dict() if 'result_status' in today_lab_tests.columns else {}
-
         # Data untuk chart tambahan
         time_slots = {}
-        room_type_occupancy = {}
+        room_stats = summary['room_stats']
+        today_doctors_spec = summary['today_doctors_spec']
+        today_tests_status = summary['today_tests_status']
         
         # Statistik untuk cards
         stats = {
-            'today_doctors': total_today_doctors,
-            'today_patients': today_patients,
-            'today_tests': total_today_tests,
-            'total_rooms': total_rooms,
-            'occupied_rooms': occupied_rooms,
-            'available_rooms': available_rooms,
-            'occupancy_rate': round(occupancy_rate, 1),
-            'total_medicines': total_medicines,
-            'low_stock_medicines': low_stock_medicines,
-            'out_of_stock_medicines': out_of_stock_medicines,
-            'active_staff': active_staff,
-            'pending_tests': pending_tests,
-            'total_patients': len(load_patient_data()[0]),
-            'total_lab_tests': total_lab_tests,
-            'today_revenue': today_revenue,
-            'total_revenue': total_revenue
+            'today_doctors': summary['today_doctors'],
+            'today_patients': summary['today_patients'],
+            'today_tests': summary['today_tests'],
+            'total_rooms': summary['total_rooms'],
+            'occupied_rooms': summary['occupied_rooms'],
+            'available_rooms': summary['available_rooms'],
+            'occupancy_rate': summary['occupancy_rate'],
+            'total_medicines': summary['total_medicines'],
+            'low_stock_medicines': summary['low_stock_medicines'],
+            'out_of_stock_medicines': summary['out_of_stock_medicines'],
+            'active_staff': summary['active_staff'],
+            'total_staff': summary['total_staff'],
+            'pending_tests': summary['pending_tests'],
+            'total_patients': summary['total_patients'],
+            'total_lab_tests': summary['total_lab_tests'],
+            'today_revenue': summary['today_revenue'],
+            'total_revenue': summary['total_revenue']
         }
         
         return render_template(
@@ -419,63 +520,57 @@ def doctor_tab():
     search_doctor = request.args.get('search_doctor', '')
     room_id = request.args.get('room_id', 'All')
 
-    filtered_doctor_df = df_doctor.copy()
-    if specialization != 'All' and 'specialization' in filtered_doctor_df.columns:
-        filtered_doctor_df = filtered_doctor_df[filtered_doctor_df['specialization'] == specialization]
-    if day != 'All' and 'schedule_day_indonesia' in filtered_doctor_df.columns:
-        filtered_doctor_df = filtered_doctor_df[filtered_doctor_df['schedule_day_indonesia'] == day]
-    if search_doctor and 'name' in filtered_doctor_df.columns:
-        filtered_doctor_df = filtered_doctor_df[filtered_doctor_df['name'].str.contains(search_doctor, case=False, na=False)]
-    if room_id != 'All' and 'room_id' in filtered_doctor_df.columns:
-        filtered_doctor_df = filtered_doctor_df[filtered_doctor_df['room_id'] == room_id]
-
-    # Group data by doctor name dan hari untuk menghindari duplikasi
-    grouped_data = []
-    if not filtered_doctor_df.empty:
-        # Group by doctor name dan schedule day
-        grouped = filtered_doctor_df.groupby(['name', 'specialization', 'schedule_day_indonesia'])
-        
-        for (name, specialization, day), group in grouped:
-            schedules = group[['start_time', 'end_time', 'room_id']].to_dict('records')
-            grouped_data.append({
-                'name': name,
-                'specialization': specialization,
-                'schedule_day_indonesia': day,
-                'schedules': schedules,  # Semua jadwal dokter di hari itu
-                'first_schedule': schedules[0]  # Jadwal pertama untuk display di tabel
-            })
-
-    # Statistik berdasarkan data grouped
-    total_doctors = len(set([doc['name'] for doc in grouped_data]))
-    total_schedules = len(grouped_data)
-    total_specializations = len(set([doc['specialization'] for doc in grouped_data]))
-    total_doctor_rooms = len(set([doc['first_schedule']['room_id'] for doc in grouped_data]))
-
-    # Data untuk chart (gunakan data asli untuk akurasi)
-    spec_count = filtered_doctor_df['specialization'].value_counts().to_dict() if 'specialization' in filtered_doctor_df.columns else {}
-    day_count = filtered_doctor_df['schedule_day_indonesia'].value_counts().to_dict() if 'schedule_day_indonesia' in filtered_doctor_df.columns else {}
+    with phase('filter') as info:
+        # Semua filter dalam satu mask (semantik sama dengan export, lihat query_builder.py).
+        # Pencarian nama >= 3 huruf dilayani index trigram, bukan str.contains per baris.
+        filters = filter_args('doctor_schedule', request.args)
+        doctor_ids = None
+        if search_doctor.strip():
+            search_indexes['doctors'].sync(df_doctor)
+            doctor_ids = search_indexes['doctors'].search_ids(search_doctor)
+        if doctor_ids is not None:
+            filters = tuple((arg, value) for arg, value in filters if arg != 'search_doctor')
+        filtered_doctor_df = apply_filters(df_doctor, 'doctor_schedule', filters)
+        if doctor_ids is not None:
+            filtered_doctor_df = filtered_doctor_df[filtered_doctor_df['doctor_id'].astype(str).isin(doctor_ids)]
+        info['rows'] = len(filtered_doctor_df)
+
+    with phase('aggregate') as info:
+        # Group data by doctor name dan hari untuk menghindari duplikasi
+        table_data = group_doctor_schedules(filtered_doctor_df)
+
+        # Statistik berdasarkan data grouped
+        total_doctors = len({row['name'] for row in table_data})
+        total_schedules = len(table_data)
+        total_specializations = len({row['specialization'] for row in table_data})
+        total_doctor_rooms = len({row['room_id'] for row in table_data})
+
+        # Data untuk chart (gunakan data asli untuk akurasi)
+        spec_count = count_values(filtered_doctor_df, 'specialization')
+        day_count = count_values(filtered_doctor_df, 'schedule_day_indonesia')
     
-    # Heatmap data
-    if 'schedule_day_indonesia' in filtered_doctor_df.columns and 'specialization' in filtered_doctor_df.columns:
-        heatmap_data = (
-            filtered_doctor_df.groupby(['schedule_day_indonesia', 'specialization'])
-            .size()
-            .reset_index(name='count')
-        )
-    else:
-        heatmap_data = pd.DataFrame(columns=['schedule_day_indonesia', 'specialization', 'count'])
+        # Heatmap data
+        if 'schedule_day_indonesia' in filtered_doctor_df.columns and 'specialization' in filtered_doctor_df.columns:
+            heatmap_data = (
+                filtered_doctor_df.groupby(['schedule_day_indonesia', 'specialization'], observed=True)
+                .size()
+                .reset_index(name='count')
+            )
+        else:
+            heatmap_data = pd.DataFrame(columns=['schedule_day_indonesia', 'specialization', 'count'])
     
-    # Room usage data
-    if 'room_id' in filtered_doctor_df.columns:
-        room_usage = (
-            filtered_doctor_df.groupby('room_id')
-            .size()
-            .reset_index(name='count')
-            .sort_values(by='count', ascending=False)
-            .head(10)
-        )
-    else:
-        room_usage = pd.DataFrame(columns=['room_id', 'count'])
+        # Room usage data
+        if 'room_id' in filtered_doctor_df.columns:
+            room_usage = (
+                filtered_doctor_df.groupby('room_id', observed=True)
+                .size()
+                .reset_index(name='count')
+                .sort_values(by='count', ascending=False)
+                .head(10)
+            )
+        else:
+            room_usage = pd.DataFrame(columns=['room_id', 'count'])
+        info['rows'] = len(filtered_doctor_df)
 
     # Dropdown filter
     specializations = ['All']
@@ -489,23 +584,14 @@ def doctor_tab():
     if 'room_id' in df_doctor.columns:
         room_ids += sorted(df_doctor['room_id'].dropna().unique().tolist())
 
-    # Clean data untuk JSON serialization
-    table_data = []
-    for row in grouped_data:
-        clean_row = {
-            'name': row['name'],
-            'specialization': row['specialization'],
-            'schedule_day_indonesia': row['schedule_day_indonesia'],
-            'start_time': row['first_schedule']['start_time'],
-            'end_time': row['first_schedule']['end_time'],
-            'room_id': row['first_schedule']['room_id'],
-            'all_schedules': row['schedules']  # Simpan semua jadwal untuk modal
-        }
-        table_data.append(clean_row)
-
     # Clean other data untuk JSON
-    clean_heatmap_data = clean_data_for_json(heatmap_data)
-    clean_room_usage_data = clean_data_for_json(room_usage)
+    clean_heatmap_data = to_records(heatmap_data)
+    clean_room_usage_data = to_records(room_usage)
+
+    # Bentrok jadwal untuk hari/ruangan yang sedang difilter
+    conflicts = filter_conflicts(load_schedule_conflicts(), {'day': day, 'room_id': room_id})
+    conflict_stats = conflict_summary(conflicts)
+    conflict_rows = conflicts.head(20).to_dict('records')
 
     return render_template(
         'doctor_tab.html',
@@ -526,6 +612,8 @@ def doctor_tab():
         search_doctor=search_doctor,
         table_data=table_data,
         table_count=len(table_data),
+        conflict_stats=conflict_stats,
+        conflict_rows=conflict_rows,
         now=datetime.now()
     )
 
@@ -541,8 +629,9 @@ def room_tab():
         room_type_data[room_type] = stats['total']
         occupancy_data[room_type] = stats['occupancy_rate']
 
-    # Tabel data
-    room_table_data = df_room.to_dict('records')
+    # Tabel data (satu halaman)
+    page_df, pagination = paginate_frame(df_room, request.args)
+    room_table_data = page_df.to_dict('records')
 
     return render_template(
         'room_tab.html',
@@ -553,47 +642,36 @@ def room_tab():
         room_type_data=room_type_data,
         occupancy_data=occupancy_data,
         room_table_data=room_table_data,
-        room_table_count=len(room_table_data),
+        room_table_count=pagination['total'],
+        pagination=pagination,
         now=datetime.now()
     )
 
 @app.route('/patient')
 def patient_tab():
-    df_patient, total_patients, gender_dist, payment_dist, insurance_dist, city_dist = load_patient_data()
-
-    # Filter data
+    # Filter data (dijalankan di SQL, lihat query_builder.py; pencarian lewat index trigram)
     gender = request.args.get('gender', 'All')
     payment_type = request.args.get('payment_type', 'All')
     age_group = request.args.get('age_group', 'All')
     search_patient = request.args.get('search_patient', '')
 
-    filtered_patient_df = df_patient.copy()
-    if gender != 'All' and 'gender' in filtered_patient_df.columns:
-        filtered_patient_df = filtered_patient_df[filtered_patient_df['gender'] == gender]
-    if payment_type != 'All' and 'payment_type' in filtered_patient_df.columns:
-        filtered_patient_df = filtered_patient_df[filtered_patient_df['payment_type'] == payment_type]
-    if age_group != 'All' and 'age_group' in filtered_patient_df.columns:
-        filtered_patient_df = filtered_patient_df[filtered_patient_df['age_group'] == age_group]
-    if search_patient and 'name' in filtered_patient_df.columns:
-        filtered_patient_df = filtered_patient_df[
-            filtered_patient_df['name'].str.contains(search_patient, case=False, na=False) |
-            filtered_patient_df['patient_id'].astype(str).str.contains(search_patient, case=False, na=False)
-        ]
+    filtered_patient_df = load_searched('patients', request.args, lambda f: load_patient_data(f)[0])
 
     # Update statistics based on filtered data
     total_patients_filtered = len(filtered_patient_df)
-    gender_dist_filtered = filtered_patient_df['gender'].value_counts().to_dict() if 'gender' in filtered_patient_df.columns else {}
-    payment_dist_filtered = filtered_patient_df['payment_type'].value_counts().to_dict() if 'payment_type' in filtered_patient_df.columns else {}
-    insurance_dist_filtered = filtered_patient_df['insurance_provider'].value_counts().to_dict() if 'insurance_provider' in filtered_patient_df.columns else {}
-    city_dist_filtered = filtered_patient_df['city'].value_counts().head(10).to_dict() if 'city' in filtered_patient_df.columns else {}
+    gender_dist_filtered = count_values(filtered_patient_df, 'gender')
+    payment_dist_filtered = count_values(filtered_patient_df, 'payment_type')
+    insurance_dist_filtered = count_values(filtered_patient_df, 'insurance_provider')
+    city_dist_filtered = count_values(filtered_patient_df, 'city', head=10)
 
     # Age group data
-    age_group_count = filtered_patient_df['age_group'].value_counts().to_dict() if 'age_group' in filtered_patient_df.columns else {}
+    age_group_count = count_values(filtered_patient_df, 'age_group')
 
     # Tabel data
     table_columns = ['patient_id', 'name', 'gender', 'age', 'city', 'payment_type', 'insurance_provider']
     available_columns = [col for col in table_columns if col in filtered_patient_df.columns]
-    patient_table_data = filtered_patient_df[available_columns].to_dict('records')
+    page_df, pagination = paginate_frame(filtered_patient_df, request.args, columns=available_columns)
+    patient_table_data = page_df.to_dict('records')
 
     return render_template(
         'patient_tab.html',
@@ -604,7 +682,8 @@ def patient_tab():
         city_dist=city_dist_filtered,
         age_group_count=age_group_count,
         patient_table_data=patient_table_data,
-        patient_table_count=len(patient_table_data),
+        patient_table_count=pagination['total'],
+        pagination=pagination,
         current_gender=gender,
         current_payment_type=payment_type,
         current_age_group=age_group,
@@ -612,33 +691,47 @@ def patient_tab():
         now=datetime.now()
     )
 
+def pharmacy_stock_summary(days=EXPIRY_WINDOW_DAYS, limit=50):
+    """Stok, batch hampir kedaluwarsa dan alert stok rendah dari ledger (lihat pharmacy_ledger.py)"""
+    pharmacy_ledger.sync(load_pharmacy_data()[0])
+    with phase('aggregate'):
+        return pharmacy_ledger.summary(days=days, limit=limit)
+
 @app.route('/pharmacy')
 def pharmacy_tab():
     df_pharmacy, total_medicines, low_stock_medicines, out_of_stock_medicines, pharmacy_categories = load_pharmacy_data()
 
+    # Stok terkini dari ledger, bukan dari frame cache (dispense belum tentu ada di frame)
+    summary = pharmacy_stock_summary()
+    batch_counts = summary['batch_counts']
+    if batch_counts['total']:
+        total_medicines = batch_counts['total']
+        low_stock_medicines = batch_counts['low_stock'] + batch_counts['out_of_stock']
+        out_of_stock_medicines = batch_counts['out_of_stock']
+
     # Data untuk chart
-    category_count = df_pharmacy['category'].value_counts().to_dict() if 'category' in df_pharmacy.columns else {}
+    category_count = count_values(df_pharmacy, 'category')
     
     # Supplier data
-    supplier_count = df_pharmacy['supplier'].value_counts().head(10).to_dict() if 'supplier' in df_pharmacy.columns else {}
+    supplier_count = count_values(df_pharmacy, 'supplier', head=10)
     
-    # Expiry data
-    if 'expiry_date' in df_pharmacy.columns:
-        df_pharmacy['expiry_date'] = pd.to_datetime(df_pharmacy['expiry_date'], errors='coerce')
-        upcoming_expiry = df_pharmacy[df_pharmacy['expiry_date'] <= (datetime.today() + timedelta(days=30))]
-        expiry_data = upcoming_expiry[['drug_name', 'current_stock']].to_dict('records') if 'drug_name' in upcoming_expiry.columns else []
-    else:
-        expiry_data = []
+    # Expiry data: stok per drug yang kedaluwarsa <= 30 hari (index expiry ledger)
+    expiry_data = summary['expiring']
 
     # Stock status
     stock_status = {
-        'In Stock': len(df_pharmacy[df_pharmacy['current_stock'] > 5]),
-        'Low Stock': len(df_pharmacy[(df_pharmacy['current_stock'] <= 5) & (df_pharmacy['current_stock'] > 0)]),
-        'Out of Stock': len(df_pharmacy[df_pharmacy['current_stock'] <= 0])
+        'In Stock': batch_counts['in_stock'],
+        'Low Stock': batch_counts['low_stock'],
+        'Out of Stock': batch_counts['out_of_stock']
     }
 
-    # Tabel data pharmacy
-    pharmacy_table_data = df_pharmacy.to_dict('records')
+    # Tabel data pharmacy (satu halaman)
+    page_df, pagination = paginate_frame(df_pharmacy, request.args)
+    pharmacy_table_data = page_df.to_dict('records')
+    if pharmacy_table_data and 'drug_id' in page_df.columns:
+        for row, stock in zip(pharmacy_table_data, pharmacy_ledger.balances(page_df['drug_id'])):
+            if stock is not None:
+                row['current_stock'] = stock
 
     return render_template(
         'pharmacy_tab.html',
@@ -650,68 +743,97 @@ def pharmacy_tab():
         supplier_count=supplier_count,
         expiry_data=expiry_data,
         stock_status=stock_status,
+        low_stock_drugs=summary['low_stock_drugs'],
         pharmacy_table_data=pharmacy_table_data,
-        pharmacy_table_count=len(pharmacy_table_data),
+        pharmacy_table_count=pagination['total'],
+        pagination=pagination,
         now=datetime.now()
     )
 
+def lab_turnaround_summary(args):
+    """
+    p50/p90/p99 turnaround lab dari sketch kuantil (lihat lab_turnaround.py)
+    untuk ?test_type=&lab_staff_id=&start_date=&end_date=&limit=.
+    ValueError kalau tanggal tidak valid.
+    """
+    bounds = {}
+    for arg in ('start_date', 'end_date'):
+        value = (args.get(arg) or '').strip()
+        if value:
+            try:
+                bounds[arg] = pd.Timestamp(value).date()
+            except ValueError:
+                raise ValueError(f"Tanggal tidak valid untuk {arg}: {value}") from None
+    test_type = args.get('test_type', 'All')
+    lab_staff_id = args.get('lab_staff_id', 'All')
+
+    lab_turnaround.sync(load_lab_tests_data()[0])
+    with phase('aggregate'):
+        return lab_turnaround.summary(
+            start=bounds.get('start_date'),
+            end=bounds.get('end_date'),
+            test_type=None if test_type in ('', 'All') else test_type,
+            lab_staff_id=None if lab_staff_id in ('', 'All') else lab_staff_id,
+            limit=min(max(args.get('limit', 10, type=int), 1), 100),
+        )
+
 @app.route('/lab')
 def lab_tab():
-    df_lab, total_lab_tests, pending_tests, completed_tests, lab_test_types_count = load_lab_tests_data()
+    # Statistik global dari query agregat
+    overview = lab_overview()
 
-    # Filter lab tests
+    # Filter lab tests (dijalankan di SQL, lihat query_builder.py)
     test_type = request.args.get('test_type', 'All')
     result_status = request.args.get('result_status', 'All')
     start_date = request.args.get('start_date', '')
     end_date = request.args.get('end_date', '')
 
-    filtered_lab_df = df_lab.copy()
-    if test_type != 'All' and 'test_type' in filtered_lab_df.columns:
-        filtered_lab_df = filtered_lab_df[filtered_lab_df['test_type'] == test_type]
-    if result_status != 'All' and 'result_status' in filtered_lab_df.columns:
-        filtered_lab_df = filtered_lab_df[filtered_lab_df['result_status'] == result_status]
-    if start_date and 'scheduled_date' in filtered_lab_df.columns:
-        filtered_lab_df = filtered_lab_df[filtered_lab_df['scheduled_date'] >= start_date]
-    if end_date and 'scheduled_date' in filtered_lab_df.columns:
-        filtered_lab_df = filtered_lab_df[filtered_lab_df['scheduled_date'] <= end_date]
+    filtered_lab_df = load_lab_tests_data(filter_args('lab_tests', request.args))[0]
 
     # Data untuk chart
-    test_type_count = filtered_lab_df['test_type'].value_counts().to_dict() if 'test_type' in filtered_lab_df.columns else {}
-    result_status_count = filtered_lab_df['result_status'].value_counts().to_dict() if 'result_status' in filtered_lab_df.columns else {}
+    test_type_count = count_values(filtered_lab_df, 'test_type')
+    result_status_count = count_values(filtered_lab_df, 'result_status')
     
     # Daily tests data
     if 'scheduled_date' in filtered_lab_df.columns:
         daily_tests = filtered_lab_df.groupby('scheduled_date').size().reset_index(name='count')
+        # Frame fallback / hasil query gagal berisi kolom object, bukan datetime64
+        daily_tests['scheduled_date'] = pd.to_datetime(
+            daily_tests['scheduled_date'], errors='coerce').dt.strftime('%Y-%m-%d')
     else:
         daily_tests = pd.DataFrame(columns=['scheduled_date', 'count'])
     
     # Lab staff data
-    lab_staff_count = filtered_lab_df['lab_staff_id'].value_counts().head(10).to_dict() if 'lab_staff_id' in filtered_lab_df.columns else {}
+    lab_staff_count = count_values(filtered_lab_df, 'lab_staff_id', head=10)
+
+    # Turnaround time (SLA) per test type & staff
+    try:
+        turnaround = lab_turnaround_summary(request.args)
+    except ValueError:
+        turnaround = None
 
     # Dropdown filter
-    lab_test_types = ['All']
-    lab_result_statuses = ['All']
-    
-    if 'test_type' in df_lab.columns:
-        lab_test_types += sorted(df_lab['test_type'].dropna().unique().tolist())
-    if 'result_status' in df_lab.columns:
-        lab_result_statuses += sorted(df_lab['result_status'].dropna().unique().tolist())
+    lab_test_types = ['All'] + overview['test_types']
+    lab_result_statuses = ['All'] + overview['result_statuses']
 
-    # Tabel data lab tests
-    lab_table_data = filtered_lab_df.to_dict('records')
+    # Tabel data lab tests (satu halaman)
+    page_df, pagination = paginate_frame(filtered_lab_df, request.args)
+    lab_table_data = page_df.to_dict('records')
 
     return render_template(
         'lab_tab.html',
-        total_lab_tests=total_lab_tests,
-        pending_tests=pending_tests,
-        completed_tests=completed_tests,
-        lab_test_types_count=lab_test_types_count,
+        total_lab_tests=overview['total_lab_tests'],
+        pending_tests=overview['pending_tests'],
+        completed_tests=overview['completed_tests'],
+        lab_test_types_count=overview['lab_test_types_count'],
         test_type_count=test_type_count,
         result_status_count=result_status_count,
         daily_tests_data=daily_tests.to_dict('records'),
         lab_staff_count=lab_staff_count,
+        turnaround=turnaround,
         lab_table_data=lab_table_data,
-        lab_table_count=len(lab_table_data),
+        lab_table_count=pagination['total'],
+        pagination=pagination,
         lab_test_types=lab_test_types,
         lab_result_statuses=lab_result_statuses,
         current_test_type=test_type,
@@ -723,28 +845,20 @@ def lab_tab():
 
 @app.route('/staff')
 def staff_tab():
-    df_staff, total_staff, active_staff, inactive_staff, staff_departments_count = load_staff_data()
+    # Statistik global dari query agregat
+    overview = staff_overview()
 
-    # Filter staff
+    # Filter staff (dijalankan di SQL, lihat query_builder.py; pencarian lewat index trigram)
     staff_role = request.args.get('staff_role', 'All')
     staff_department = request.args.get('staff_department', 'All')
     staff_status = request.args.get('staff_status', 'All')
     search_staff = request.args.get('search_staff', '')
 
-    filtered_staff_df = df_staff.copy()
-    if staff_role != 'All' and 'role' in filtered_staff_df.columns:
-        filtered_staff_df = filtered_staff_df[filtered_staff_df['role'] == staff_role]
-    if staff_department != 'All' and 'department' in filtered_staff_df.columns:
-        filtered_staff_df = filtered_staff_df[filtered_staff_df['department'] == staff_department]
-    if staff_status != 'All' and 'active' in filtered_staff_df.columns:
-        status_filter = 'True' if staff_status == 'Active' else 'False'
-        filtered_staff_df = filtered_staff_df[filtered_staff_df['active'] == status_filter]
-    if search_staff and 'name' in filtered_staff_df.columns:
-        filtered_staff_df = filtered_staff_df[filtered_staff_df['name'].str.contains(search_staff, case=False, na=False)]
+    filtered_staff_df = load_searched('staff', request.args, lambda f: load_staff_data(f)[0]).copy()
 
     # Data untuk chart
-    role_count = filtered_staff_df['role'].value_counts().to_dict() if 'role' in filtered_staff_df.columns else {}
-    dept_count = filtered_staff_df['department'].value_counts().to_dict() if 'department' in filtered_staff_df.columns else {}
+    role_count = count_values(filtered_staff_df, 'role')
+    dept_count = count_values(filtered_staff_df, 'department')
     
     # Hire year data
     if 'hire_date' in filtered_staff_df.columns:
@@ -754,35 +868,32 @@ def staff_tab():
         hire_year_count = {}
     
     # Status data
-    active_count = len(filtered_staff_df[filtered_staff_df['active'] == 'True']) if 'active' in filtered_staff_df.columns else 0
-    inactive_count = len(filtered_staff_df[filtered_staff_df['active'] == 'False']) if 'active' in filtered_staff_df.columns else 0
+    active_count = STAFF_ACTIVE.count(filtered_staff_df['active'], 'True') if 'active' in filtered_staff_df.columns else 0
+    inactive_count = STAFF_ACTIVE.count(filtered_staff_df['active'], 'False') if 'active' in filtered_staff_df.columns else 0
 
     # Dropdown filter
-    staff_roles = ['All']
-    staff_departments = ['All']
+    staff_roles = ['All'] + overview['roles']
+    staff_departments = ['All'] + overview['departments']
     staff_statuses = ['All', 'Active', 'Inactive']
-    
-    if 'role' in df_staff.columns:
-        staff_roles += sorted(df_staff['role'].dropna().unique().tolist())
-    if 'department' in df_staff.columns:
-        staff_departments += sorted(df_staff['department'].dropna().unique().tolist())
 
-    # Tabel data staff
-    staff_table_data = filtered_staff_df.to_dict('records')
+    # Tabel data staff (satu halaman)
+    page_df, pagination = paginate_frame(filtered_staff_df, request.args)
+    staff_table_data = page_df.to_dict('records')
 
     return render_template(
         'staff_tab.html',
-        total_staff=total_staff,
-        active_staff=active_staff,
-        inactive_staff=inactive_staff,
-        staff_departments_count=staff_departments_count,
+        total_staff=overview['total_staff'],
+        active_staff=overview['active_staff'],
+        inactive_staff=overview['inactive_staff'],
+        staff_departments_count=overview['staff_departments_count'],
         role_count=role_count,
         dept_count=dept_count,
         hire_year_count=hire_year_count,
         active_count=active_count,
         inactive_count=inactive_count,
         staff_table_data=staff_table_data,
-        staff_table_count=len(staff_table_data),
+        staff_table_count=pagination['total'],
+        pagination=pagination,
         staff_roles=staff_roles,
         staff_departments=staff_departments,
         staff_statuses=staff_statuses,
@@ -799,218 +910,162 @@ def staff_tab():
 # EXPORT FUNCTIONS
 # ------------------------------
 
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+
+# format=csv (default, streaming) | parquet | arrow
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+def export_table(table, filters, filename_prefix, prepare=None):
+    """
+    Export tabel dalam format yang diminta lewat ?format=.
+    CSV di-stream per chunk dari cursor server-side (atau dari record batch
+    snapshot), jadi memori tetap kecil berapapun ukuran tabel. Parquet/Arrow
+    ditulis per chunk ke file sementara lalu dikirim utuh.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format tidak didukung: {fmt}"}), 400
+
+    # Koneksi diambil sebelum response dimulai supaya error pool/DB masih bisa jadi HTTP 500
+    chunks = open_table_chunks(table, filters, EXPORT_CHUNK_SIZE)
+    filename = f'{filename_prefix}_{datetime.now().strftime("%Y%m%d")}.{fmt}'
+
+    if fmt != 'csv':
+        frames = (prepare(chunk) if prepare is not None else chunk for chunk in chunks)
+        output = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        try:
+            write_frames(frames, output, fmt)
+        except RuntimeError as e:
+            # pyarrow belum terpasang
+            output.close()
+            return jsonify({'error': str(e)}), 501
+        finally:
+            chunks.close()
+        output.seek(0)
+        return send_file(output, mimetype=EXPORT_FORMATS[fmt], as_attachment=True, download_name=filename)
+
+    def generate():
+        try:
+            header = True
+            for chunk in chunks:
+                if prepare is not None:
+                    chunk = prepare(chunk)
+                yield chunk.to_csv(index=False, header=header)
+                header = False
+        except Exception as e:
+            # Header 200 sudah terkirim: re-raise supaya koneksi diputus, bukan
+            # berakhir normal dengan CSV terpotong
+            print(f"[ERROR] Gagal export {table}: {e}")
+            raise
+        finally:
+            chunks.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 @app.route('/export')
 def export_doctor_csv():
-    df_doctor = load_doctor_data()
-    output = io.BytesIO()
-    
-    # Apply filters if any
-    specialization = request.args.get('specialization', 'All')
-    day = request.args.get('day', 'All')
-    search_doctor = request.args.get('search_doctor', '')
-    
-    filtered_df = df_doctor.copy()
-    if specialization != 'All' and 'specialization' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['specialization'] == specialization]
-    if day != 'All' and 'schedule_day' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['schedule_day'] == day]
-    if search_doctor and 'name' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['name'].str.contains(search_doctor, case=False, na=False)]
-    
-    filtered_df.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
+    filters = filter_args('doctor_schedule', request.args)
+    return export_table('doctor_schedule', filters, 'doctor_schedules', prepare_doctor_df)
+
+@app.route('/export_schedule_conflicts')
+def export_schedule_conflicts_csv():
+    conflicts = filter_conflicts(load_schedule_conflicts(), request.args)
+    filename = f'schedule_conflicts_{datetime.now().strftime("%Y%m%d")}.csv'
+    return Response(
+        conflicts.to_csv(index=False),
         mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'doctor_schedules_{datetime.now().strftime("%Y%m%d")}.csv'
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 @app.route('/export_rooms')
 def export_rooms_csv():
-    df_room, _, _, _, _ = load_room_data()
-    output = io.BytesIO()
-    df_room.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'room_data_{datetime.now().strftime("%Y%m%d")}.csv'
-    )
+    return export_table('rooms', (), 'room_data')
 
 @app.route('/export_patients')
 def export_patients_csv():
-    df_patient, _, _, _, _, _ = load_patient_data()
-    output = io.BytesIO()
-    df_patient.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'patient_data_{datetime.now().strftime("%Y%m%d")}.csv'
-    )
+    filters = filter_args('patients', request.args)
+    return export_table('patients', filters, 'patient_data', prepare_patient_df)
 
 @app.route('/export_pharmacy')
 def export_pharmacy_csv():
-    df_pharmacy, _, _, _, _ = load_pharmacy_data()
-    output = io.BytesIO()
-    df_pharmacy.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'pharmacy_data_{datetime.now().strftime("%Y%m%d")}.csv'
-    )
+    return export_table('pharmacy_stock', (), 'pharmacy_data', prepare_pharmacy_df)
 
 @app.route('/export_lab_tests')
 def export_lab_tests_csv():
-    df_lab, _, _, _, _ = load_lab_tests_data()
-    output = io.BytesIO()
-    
-    # Apply filters if any
-    test_type = request.args.get('test_type', 'All')
-    result_status = request.args.get('result_status', 'All')
-    start_date = request.args.get('start_date', '')
-    end_date = request.args.get('end_date', '')
-    
-    filtered_df = df_lab.copy()
-    if test_type != 'All' and 'test_type' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['test_type'] == test_type]
-    if result_status != 'All' and 'result_status' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['result_status'] == result_status]
-    if start_date and 'scheduled_date' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['scheduled_date'] >= start_date]
-    if end_date and 'scheduled_date' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['scheduled_date'] <= end_date]
-    
-    filtered_df.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'lab_tests_{datetime.now().strftime("%Y%m%d")}.csv'
-    )
+    filters = filter_args('lab_tests', request.args)
+    return export_table('lab_tests', filters, 'lab_tests')
 
 @app.route('/export_staff')
 def export_staff_csv():
-    df_staff, _, _, _, _ = load_staff_data()
-    output = io.BytesIO()
-    
-    # Apply filters if any
-    staff_role = request.args.get('role', 'All')
-    staff_department = request.args.get('department', 'All')
-    staff_status = request.args.get('status', 'All')
-    search_staff = request.args.get('search', '')
-    
-    filtered_df = df_staff.copy()
-    if staff_role != 'All' and 'role' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['role'] == staff_role]
-    if staff_department != 'All' and 'department' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['department'] == staff_department]
-    if staff_status != 'All' and 'active' in filtered_df.columns:
-        status_filter = 'True' if staff_status == 'Active' else 'False'
-        filtered_df = filtered_df[filtered_df['active'] == status_filter]
-    if search_staff and 'name' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['name'].str.contains(search_staff, case=False, na=False)]
-    
-    filtered_df.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'staff_data_{datetime.now().strftime("%Y%m%d")}.csv'
-    )
+    # Link export di staff_tab memakai nama argumen pendek
+    filters = filter_args('staff', {
+        'staff_role': request.args.get('role', 'All'),
+        'staff_department': request.args.get('department', 'All'),
+        'staff_status': request.args.get('status', 'All'),
+        'search_staff': request.args.get('search', ''),
+    })
+    return export_table('staff', filters, 'staff_data', prepare_staff_df)
+
+@app.route('/export_finance')
+def export_finance_csv():
+    filters = filter_args('finance', request.args)
+    return export_table('finance', filters, 'finance_data', prepare_finance_df)
+
+@app.route('/export_registrations')
+def export_registrations_csv():
+    filters = filter_args('registrations', request.args)
+    return export_table('registrations', filters, 'registrations_data')
 
 @app.route('/finance')
 def finance_tab():
-    df_finance = load_finance_data()
-
-    # Filter data
+    # Filter data (dijalankan di SQL, lihat query_builder.py)
     entry_type = request.args.get('entry_type', 'All')
     service_type = request.args.get('service_type', 'All')
     payment_type = request.args.get('payment_type', 'All')
     start_date = request.args.get('start_date', '')
     end_date = request.args.get('end_date', '')
 
-    filtered_finance_df = df_finance.copy()
-    if entry_type != 'All' and 'entry_type' in filtered_finance_df.columns:
-        filtered_finance_df = filtered_finance_df[filtered_finance_df['entry_type'] == entry_type]
-    if service_type != 'All' and 'service_type' in filtered_finance_df.columns:
-        filtered_finance_df = filtered_finance_df[filtered_finance_df['service_type'] == service_type]
-    if payment_type != 'All' and 'payment_type' in filtered_finance_df.columns:
-        filtered_finance_df = filtered_finance_df[filtered_finance_df['payment_type'] == payment_type]
-    if start_date and 'transaction_date' in filtered_finance_df.columns:
-        filtered_finance_df = filtered_finance_df[filtered_finance_df['transaction_date'] >= start_date]
-    if end_date and 'transaction_date' in filtered_finance_df.columns:
-        filtered_finance_df = filtered_finance_df[filtered_finance_df['transaction_date'] <= end_date]
-
-    # Statistik
-    total_transactions = len(filtered_finance_df)
-    total_revenue = filtered_finance_df['amount_idr'].sum() if 'amount_idr' in filtered_finance_df.columns else 0
-    average_transaction = filtered_finance_df['amount_idr'].mean() if 'amount_idr' in filtered_finance_df.columns else 0
-    unique_patients = filtered_finance_df['patient_id'].nunique() if 'patient_id' in filtered_finance_df.columns else 0
-
-    # Revenue by payment type
-    bpjs_revenue = filtered_finance_df[filtered_finance_df['payment_type'] == 'BPJS']['amount_idr'].sum() if 'payment_type' in filtered_finance_df.columns else 0
-    umum_revenue = filtered_finance_df[filtered_finance_df['payment_type'] == 'Umum']['amount_idr'].sum() if 'payment_type' in filtered_finance_df.columns else 0
-    bpjs_transactions = len(filtered_finance_df[filtered_finance_df['payment_type'] == 'BPJS']) if 'payment_type' in filtered_finance_df.columns else 0
-    umum_transactions = len(filtered_finance_df[filtered_finance_df['payment_type'] == 'Umum']) if 'payment_type' in filtered_finance_df.columns else 0
-
-    # Data untuk chart
-    revenue_by_service = filtered_finance_df.groupby('service_type')['amount_idr'].sum().to_dict() if 'service_type' in filtered_finance_df.columns else {}
-    
-    # Monthly revenue
-    if 'transaction_date' in filtered_finance_df.columns:
-        filtered_finance_df['month_year'] = filtered_finance_df['transaction_date'].dt.to_period('M').astype(str)
-        revenue_by_month = filtered_finance_df.groupby('month_year')['amount_idr'].sum().to_dict()
-    else:
-        revenue_by_month = {}
-
-    payment_type_dist = filtered_finance_df['payment_type'].value_counts().to_dict() if 'payment_type' in filtered_finance_df.columns else {}
-    entry_type_dist = filtered_finance_df['entry_type'].value_counts().to_dict() if 'entry_type' in filtered_finance_df.columns else {}
+    filters = filter_args('finance', request.args)
+    filtered_finance_df = load_finance_data(filters)
+
+    # Statistik & chart dari rollup harian/bulanan (lihat finance_rollup.py). Rollup
+    # mengikuti frame finance lengkap lewat log delta_loader, jadi setelah cache
+    # habis hanya baris delta yang diproses; baris terfilter hanya untuk
+    # unique_patients dan tabel detail
+    with phase('load'):
+        finance_rollup.sync(load_finance_data())
+    with phase('aggregate') as info:
+        summary = finance_rollup.summary(filters)
+        if summary is None:
+            summary = summarize_frame(filtered_finance_df)
+        unique_patients = count_finance_patients(filters)
+        info['rows'] = len(filtered_finance_df)
 
     # Dropdown filter
-    entry_types = ['All']
-    service_types = ['All']
-    payment_types = ['All']
-    
-    if 'entry_type' in df_finance.columns:
-        entry_types += sorted(df_finance['entry_type'].dropna().unique().tolist())
-    if 'service_type' in df_finance.columns:
-        service_types += sorted(df_finance['service_type'].dropna().unique().tolist())
-    if 'payment_type' in df_finance.columns:
-        payment_types += sorted(df_finance['payment_type'].dropna().unique().tolist())
+    overview = finance_overview()
+    entry_types = ['All'] + overview['entry_types']
+    service_types = ['All'] + overview['service_types']
+    payment_types = ['All'] + overview['payment_types']
 
-    # Tabel data finance
-    finance_table_data = filtered_finance_df.to_dict('records')
+    # Tabel data finance (satu halaman)
+    page_df, pagination = paginate_frame(filtered_finance_df, request.args)
+    finance_table_data = page_df.to_dict('records')
 
     return render_template(
         'finance_tab.html',
-        total_transactions=total_transactions,
-        total_revenue=total_revenue,
-        average_transaction=average_transaction,
+        **summary,
         unique_patients=unique_patients,
-        bpjs_revenue=bpjs_revenue,
-        umum_revenue=umum_revenue,
-        bpjs_transactions=bpjs_transactions,
-        umum_transactions=umum_transactions,
-        revenue_by_service=revenue_by_service,
-        revenue_by_month=revenue_by_month,
-        payment_type_dist=payment_type_dist,
-        entry_type_dist=entry_type_dist,
         finance_table_data=finance_table_data,
-        finance_table_count=len(finance_table_data),
+        finance_table_count=pagination['total'],
+        pagination=pagination,
         entry_types=entry_types,
         service_types=service_types,
         payment_types=payment_types,
@@ -1022,44 +1077,365 @@ def finance_tab():
         now=datetime.now()
     )
 
-@app.route('/export_finance')
-def export_finance_csv():
-    df_finance = load_finance_data()
-    output = io.BytesIO()
-    
-    # Apply filters if any
-    entry_type = request.args.get('entry_type', 'All')
-    service_type = request.args.get('service_type', 'All')
-    payment_type = request.args.get('payment_type', 'All')
+def registration_summary(args):
+    """
+    Ringkasan kunjungan dari index counter registrasi (lihat registration_index.py)
+    untuk ?department=&status=&start_date=&end_date=. ValueError kalau tanggal tidak valid.
+    """
+    bounds = {}
+    for arg in ('start_date', 'end_date'):
+        value = (args.get(arg) or '').strip()
+        if value:
+            try:
+                bounds[arg] = pd.Timestamp(value).date()
+            except ValueError:
+                raise ValueError(f"Tanggal tidak valid untuk {arg}: {value}") from None
+    department = args.get('department', 'All')
+    status = args.get('status', 'All')
+
+    registration_index.sync(load_registration_data())
+    with phase('aggregate'):
+        return registration_index.summary(
+            start=bounds.get('start_date'),
+            end=bounds.get('end_date'),
+            department=None if department in ('', 'All') else department,
+            status=None if status in ('', 'All') else status,
+        )
+
+@app.route('/registrations')
+def registrations_tab():
+    department = request.args.get('department', 'All')
+    status = request.args.get('status', 'All')
     start_date = request.args.get('start_date', '')
     end_date = request.args.get('end_date', '')
-    
-    filtered_df = df_finance.copy()
-    if entry_type != 'All' and 'entry_type' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['entry_type'] == entry_type]
-    if service_type != 'All' and 'service_type' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['service_type'] == service_type]
-    if payment_type != 'All' and 'payment_type' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['payment_type'] == payment_type]
-    if start_date and 'transaction_date' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['transaction_date'] >= start_date]
-    if end_date and 'transaction_date' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['transaction_date'] <= end_date]
-    
-    filtered_df.to_csv(output, index=False)
-    output.seek(0)
-    
-    return send_file(
-        output,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'finance_data_{datetime.now().strftime("%Y%m%d")}.csv'
+
+    try:
+        summary = registration_summary(request.args)
+    except ValueError:
+        # Tanggal tidak valid: tampilkan semua tanggal
+        summary = registration_summary({'department': department, 'status': status})
+
+    # Tabel kunjungan (satu halaman, filter dijalankan di SQL)
+    filtered_df = load_registration_data(filter_args('registrations', request.args))
+    page_df, pagination = paginate_frame(filtered_df, request.args)
+
+    return render_template(
+        'registrations_tab.html',
+        summary=summary,
+        registration_table_data=page_df.to_dict('records'),
+        registration_table_count=pagination['total'],
+        pagination=pagination,
+        departments=['All'] + summary['departments'],
+        statuses=['All'] + summary['statuses'],
+        current_department=department,
+        current_status=status,
+        current_start_date=start_date,
+        current_end_date=end_date,
     )
 
+@app.route('/api/registrations/summary')
+def registrations_summary_api():
+    """
+    Kurva kedatangan per jam/slot, rasio pembatalan dan beban departemen:
+    ?start_date=&end_date=&department=&status=
+    """
+    try:
+        return jsonify(registration_summary(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/forecast')
+def forecast_api():
+    """
+    Prediksi total pasien harian ?horizon=N (1..FORECAST_HORIZON hari).
+    Fit berjalan di background: 202 selama hasil pertama belum ada, hasil
+    versi data lama dikirim dengan status 'stale' sampai fit baru selesai.
+    """
+    horizon = request.args.get('horizon', FORECAST_HORIZON, type=int)
+    horizon = min(max(horizon, 1), FORECAST_HORIZON)
+
+    status, result = forecast_service.get(load_patient_trends())
+    if status == 'pending':
+        return jsonify({'status': status}), 202
+    if status == 'error':
+        return jsonify({'status': status, **result}), 500
+    return jsonify({**result, 'status': status, 'forecast': result['forecast'][:horizon]})
+
+@app.route('/api/lab/turnaround')
+def lab_turnaround_api():
+    """
+    Turnaround time lab (hari) p50/p90/p99 keseluruhan, per test type dan
+    staff paling lambat: ?test_type=&lab_staff_id=&start_date=&end_date=&limit=
+    """
+    try:
+        return jsonify(lab_turnaround_summary(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def refresh_pharmacy_batches(allocations):
+    """
+    stock_out berubah tanpa stock_date baru, jadi delta load tidak melihatnya:
+    baris batch `allocations` diambil ulang ke frame delta lalu cache dibuang.
+    Load berikutnya tetap delta dan ledger.sync hanya me-reconcile batch itu.
+    """
+    refresh_rows('pharmacy_stock', [drug_id for drug_id, _, _ in allocations])
+    invalidate_table('pharmacy_stock')
+
+@app.route('/api/pharmacy/dispense', methods=['POST'])
+def pharmacy_dispense():
+    """
+    Dispense obat secara FEFO: JSON/form drug_name + quantity. Alokasi per batch
+    dicatat di ledger lalu disimpan sebagai stock_out di pharmacy_stock dengan
+    cek stok di UPDATE (mode snapshot: hanya di ledger). 404 drug tidak dikenal,
+    409 stok kurang (di ledger atau di database).
+    """
+    payload = request.get_json(silent=True) or request.form
+    drug_name = (payload.get('drug_name') or '').strip()
+    try:
+        quantity = int(payload.get('quantity', 0))
+    except (TypeError, ValueError):
+        quantity = 0
+    if not drug_name or quantity <= 0:
+        return jsonify({'error': 'drug_name dan quantity (> 0) wajib diisi'}), 400
+
+    pharmacy_ledger.sync(load_pharmacy_data()[0])
+    try:
+        allocations = pharmacy_ledger.dispense(drug_name, quantity)
+    except KeyError:
+        return jsonify({'error': f"Obat tidak dikenal: {drug_name}"}), 404
+    except InsufficientStock as e:
+        return jsonify({'error': str(e)}), 409
+
+    persisted = not use_snapshot()
+    if persisted:
+        # Ledger hanya milik proses ini: stok di DB tetap dicek saat UPDATE, supaya
+        # dua worker tidak bisa sama-sama mengambil unit terakhir
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            for drug_id, qty, _ in allocations:
+                cursor.execute(
+                    "UPDATE pharmacy_stock SET stock_out = stock_out + %s "
+                    "WHERE drug_id = %s AND stock_in - stock_out >= %s",
+                    (qty, drug_id, qty))
+                if cursor.rowcount != 1:
+                    raise InsufficientStock(f"Stok batch {drug_id} di database tidak cukup")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            # Rollback DB + event adjust: ledger dan frame cache kembali sama, tanpa reload
+            pharmacy_ledger.adjust([(drug_id, qty) for drug_id, qty, _ in allocations])
+            if isinstance(e, InsufficientStock):
+                # DB diubah di luar proses ini: ambil ulang hanya batch yang dialokasikan
+                refresh_pharmacy_batches(allocations)
+                return jsonify({'error': f"Stok {drug_name} tidak cukup: {e}"}), 409
+            print(f"[ERROR] Gagal simpan dispense {drug_name}: {e}")
+            return jsonify({'error': 'Gagal menyimpan dispense'}), 500
+        finally:
+            conn.close()
+        refresh_pharmacy_batches(allocations)
+
+    return jsonify({
+        'drug_name': drug_name,
+        'quantity': quantity,
+        'allocations': [{'drug_id': drug_id, 'quantity': qty, 'expiry_date': expiry}
+                        for drug_id, qty, expiry in allocations],
+        'remaining': pharmacy_ledger.summary()['drugs'][drug_name]['usable_stock'],
+        'persisted': persisted,
+    })
+
+@app.route('/api/pharmacy/stock')
+def pharmacy_stock_api():
+    """
+    Stok per drug dari ledger. ?at=<datetime ISO> untuk stok pada waktu lampau
+    (snapshot + replay event, 400 kalau di luar retensi).
+    """
+    at = (request.args.get('at') or '').strip()
+    if not at:
+        summary = pharmacy_stock_summary()
+        return jsonify({'drugs': summary['drugs'], 'low_stock_drugs': summary['low_stock_drugs'],
+                        'reorder_level': summary['reorder_level'], 'batch_counts': summary['batch_counts']})
+    try:
+        when = pd.Timestamp(at).to_pydatetime()
+        pharmacy_ledger.sync(load_pharmacy_data()[0])
+        return jsonify(pharmacy_ledger.stock_at(when))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/pharmacy/expiring')
+def pharmacy_expiring_api():
+    """Batch dengan stok > 0 yang kedaluwarsa dalam ?days= hari (default 30), urut expiry"""
+    days = min(max(request.args.get('days', EXPIRY_WINDOW_DAYS, type=int), 0), 3650)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 1000)
+    summary = pharmacy_stock_summary(days=days, limit=limit)
+    return jsonify({'days': days, 'drugs': summary['expiring'],
+                    'batches': summary['expiring_batches'], 'batch_count': summary['expiring_batch_count']})
+
+# ------------------------------
+# JSON TABLE API
+# ------------------------------
+# Sumber data + filter untuk setiap tabel yang bisa di-fetch per halaman
+TABLE_API_SOURCES = {
+    'patient': lambda args: load_searched('patients', args, lambda f: load_patient_data(f)[0]),
+    'lab': lambda args: load_lab_tests_data(filter_args('lab_tests', args))[0],
+    'staff': lambda args: load_searched('staff', args, lambda f: load_staff_data(f)[0]),
+    'finance': lambda args: load_finance_data(filter_args('finance', args)),
+    'registrations': lambda args: load_registration_data(filter_args('registrations', args)),
+    'pharmacy': lambda args: load_pharmacy_data()[0],
+    'room': lambda args: load_room_data()[0],
+}
+
+@app.route('/api/table/<table_name>')
+def table_api(table_name):
+    """
+    Satu halaman data tabel: ?page=&page_size=&sort=&order= plus filter tab yang sama.
+    ?orient=columns mengembalikan rows sebagai {'columns': [...], 'data': [...]} (lebih ringkas).
+    """
+    if table_name not in TABLE_API_SOURCES:
+        return jsonify({'error': f'Tabel tidak dikenal: {table_name}'}), 404
+
+    df = TABLE_API_SOURCES[table_name](request.args)
+
+    page_df, pagination = paginate_frame(df, request.args)
+    return jsonify({
+        'rows': serialize_frame(page_df, request.args.get('orient', 'records')),
+        'pagination': pagination
+    })
+
+@app.route('/api/schedule_conflicts')
+def schedule_conflicts_api():
+    """Bentrok jadwal: ?kind=doctor|room&day=&key=&room_id= plus paginasi (?orient=columns didukung)"""
+    conflicts = filter_conflicts(load_schedule_conflicts(), request.args)
+    page_df, pagination = paginate_frame(conflicts, request.args)
+    return jsonify({
+        'summary': conflict_summary(conflicts),
+        'conflicts': serialize_frame(page_df, request.args.get('orient', 'records')),
+        'pagination': pagination
+    })
+
+@app.route('/api/doctors/available')
+def doctors_available_api():
+    """
+    Dokter yang sedang praktik: ?day=Rabu&time=10:30&specialization=Anak
+    (default hari dan jam sekarang). Dilayani dari index slot, bukan scan tabel.
+    """
+    now = datetime.now()
+    day = normalize_day(request.args.get('day') or now.strftime('%A'))
+    minute = parse_time(request.args.get('time') or now.strftime('%H:%M'))
+    if day is None or minute is None:
+        return jsonify({'error': 'Parameter day/time tidak valid (contoh: day=Rabu&time=10:30)'}), 400
+    specialization = request.args.get('specialization', 'All')
+    specialization = None if specialization in ('', 'All') else specialization
+
+    slot_index.sync(load_doctor_data())
+    doctors = slot_index.lookup(day, minute, specialization)
+    return jsonify({
+        'day': day,
+        'time': f"{minute // 60:02d}:{minute % 60:02d}",
+        'specialization': specialization,
+        'count': len(doctors),
+        'doctors': doctors
+    })
+
+# Sumber frame (tanpa filter, dari cache) untuk setiap index pencarian
+SEARCH_SOURCES = {
+    'patients': lambda: load_patient_data()[0],
+    'doctors': load_doctor_data,
+    'staff': lambda: load_staff_data()[0],
+}
+
+@app.route('/api/search/<entity>')
+def search_api(entity):
+    """
+    Typeahead nama/ID: /api/search/patients?q=budi&limit=10 (patients, doctors, staff).
+    q >= 3 huruf dicari sebagai substring, 2 huruf sebagai awalan kata.
+    """
+    if entity not in search_indexes:
+        return jsonify({'error': f'Entitas tidak dikenal: {entity}'}), 404
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'Parameter limit harus angka'}), 400
+
+    index = search_indexes[entity]
+    index.sync(SEARCH_SOURCES[entity]())
+    start = time.perf_counter()
+    count, results = index.search(query, limit)
+    return jsonify({
+        'entity': entity,
+        'query': query,
+        'count': count,
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
 # ------------------------------
-# CONTEXT PROCESSORS
+# DIAGNOSTICS
 # ------------------------------
 
+@app.route('/api/pool_stats')
+def pool_stats():
+    """
+    Metrik connection pool MySQL (jumlah koneksi, waktu tunggu checkout, timeout),
+    atau engine dan statistik load database embedded
+    """
+    return jsonify(connection_stats())
+
+@app.route('/api/availability_stats')
+def availability_stats():
+    return jsonify(slot_index.stats())
+
+@app.route('/api/finance_rollup_stats')
+def finance_rollup_stats():
+    return jsonify(finance_rollup.stats())
+
+@app.route('/api/registration_index_stats')
+def registration_index_stats():
+    return jsonify(registration_index.stats())
+
+@app.route('/api/forecast_stats')
+def forecast_stats():
+    return jsonify(forecast_service.stats())
+
+@app.route('/api/lab_turnaround_stats')
+def lab_turnaround_stats():
+    return jsonify(lab_turnaround.stats())
+
+@app.route('/api/pharmacy_ledger_stats')
+def pharmacy_ledger_stats():
+    return jsonify(pharmacy_ledger.stats())
+
+@app.route('/api/search_stats')
+def search_stats():
+    return jsonify({entity: index.stats() for entity, index in search_indexes.items()})
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    """Hit/miss counter, jumlah entry dan pemakaian memori cache DataFrame"""
+    return jsonify(table_cache.stats())
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    """
+    Invalidate cache satu tabel (?table=finance) atau semua tabel.
+    ?reconcile=1 membuat load berikutnya penuh, bukan delta (mis. setelah delete).
+    Hanya untuk akses lokal, sama seperti /metrics.
+    """
+    if not instrumentation.is_local_request(request):
+        return jsonify({'error': 'Invalidate cache hanya untuk akses lokal (METRICS_ALLOW_REMOTE=1)'}), 403
+    table = request.args.get('table') or None
+    removed = invalidate_table(table)
+    reconcile = request.args.get('reconcile') == '1'
+    if reconcile:
+        reconcile_table(table)
+    return jsonify({'table': table or 'all', 'removed_entries': removed, 'reconcile': reconcile})
+
+@app.route('/api/delta_stats')
+def delta_load_stats():
+    """High-water mark dan jumlah load penuh/delta per tabel incremental"""
+    return jsonify(delta_stats())
+
 @app.context_processor
 def inject_now():
     return {'now': datetime.now()}
@@ -1068,48 +1444,12 @@ def inject_now():
 def inject_request():
     return {'request': request}
 
-def clean_data_for_json(data):
-    """
-    Clean data untuk JSON serialization dengan mengkonversi 
-    Timedelta, Timestamp, dan tipe data non-serializable lainnya
-    """
-    if isinstance(data, (pd.DataFrame, pd.Series)):
-        data = data.to_dict('records')
-    
-    if isinstance(data, list):
-        cleaned_data = []
-        for item in data:
-            if isinstance(item, dict):
-                cleaned_item = {}
-                for key, value in item.items():
-                    cleaned_item[key] = clean_value(value)
-                cleaned_data.append(cleaned_item)
-            else:
-                cleaned_data.append(clean_value(item))
-        return cleaned_data
-    elif isinstance(data, dict):
-        cleaned_data = {}
-        for key, value in data.items():
-            cleaned_data[key] = clean_value(value)
-        return cleaned_data
-    else:
-        return clean_value(data)
-
-def clean_value(value):
-    """Clean individual value untuk JSON serialization"""
-    if value is None or isinstance(value, (str, int, float, bool)):
-        return value
-    elif hasattr(value, 'isoformat'):  # Untuk datetime objects
-        return value.isoformat()
-    elif hasattr(value, 'total_seconds'):  # Untuk timedelta objects
-        return str(value)
-    elif isinstance(value, (pd.Timestamp, pd.Timedelta)):
-        return str(value)
-    else:
-        try:
-            return str(value)
-        except:
-            return None
+@app.template_filter('format_date')
+def format_date(value, fmt='%Y-%m-%d'):
+    """Tanggal untuk tabel (kolom date dimuat sebagai datetime64); kosong/NaT -> ''"""
+    if value is None or pd.isna(value):
+        return ''
+    return value.strftime(fmt) if hasattr(value, 'strftime') else value
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,163 @@
+import math
+import os
+import threading
+from collections import defaultdict
+
+from normalize import SCHEDULE_DAY
+from schedule_conflicts import to_minutes
+
+# ------------------------------
+# INDEX SLOT WAKTU KETERSEDIAAN DOKTER
+# ------------------------------
+# Jadwal dokter dipetakan sekali ke slot SLOT_MINUTES menit:
+#   (hari, slot) -> specialization -> {schedule_id: jadwal}
+# Lookup "siapa yang praktik jam 10:30 hari Rabu" cukup membuka satu bucket,
+# tanpa scan tabel. Saat doctor_schedule berubah (frame baru dari cache),
+# hanya jadwal yang ditambah/dihapus/diubah yang dipindah di index.
+
+SLOT_MINUTES = int(os.environ.get('AVAILABILITY_SLOT_MINUTES', 15))
+MINUTES_PER_DAY = 24 * 60
+
+DAYS = SCHEDULE_DAY.categories
+
+ENTRY_COLUMNS = ['schedule_id', 'doctor_id', 'name', 'specialization', 'schedule_day',
+                 'start_time', 'end_time', 'room_id']
+
+
+def normalize_day(day):
+    """'Wednesday' / 'rabu' -> 'Rabu'; None kalau tidak dikenal"""
+    return SCHEDULE_DAY.canonical(day)
+
+
+def parse_time(value):
+    """'10:30' -> 630 (menit sejak 00:00); None kalau format salah"""
+    try:
+        hours, minutes = str(value).strip().split(':')[:2]
+        total = int(hours) * 60 + int(minutes)
+    except (ValueError, AttributeError):
+        return None
+    return total if 0 <= total < MINUTES_PER_DAY else None
+
+
+class SlotIndex:
+    def __init__(self, slot_minutes=SLOT_MINUTES):
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = math.ceil(MINUTES_PER_DAY / slot_minutes)
+        # (hari, slot) -> specialization -> {schedule_id: (jadwal, start, end)}
+        self._buckets = defaultdict(lambda: defaultdict(dict))
+        # schedule_id -> (signature, daftar key bucket)
+        self._entries = {}
+        self._source = None
+        self._lock = threading.Lock()
+        self._stats = {'builds': 0, 'refreshes': 0, 'added': 0, 'removed': 0}
+
+    # ---- pemeliharaan index ----
+
+    def _bucket_keys(self, day, start, end):
+        """Bucket yang disentuh [start, end); bagian lewat tengah malam masuk hari berikutnya"""
+        day_pos = DAYS.index(day)
+        keys = []
+        for slot in range(start // self.slot_minutes, math.ceil(end / self.slot_minutes)):
+            day_offset, day_slot = divmod(slot, self.slots_per_day)
+            keys.append((DAYS[(day_pos + day_offset) % 7], day_slot, day_offset))
+        return keys
+
+    def _add(self, schedule_id, signature, entry):
+        day, start, end = entry['schedule_day'], signature[-2], signature[-1]
+        keys = []
+        for bucket_day, slot, day_offset in self._bucket_keys(day, start, end):
+            # start/end disimpan relatif terhadap hari bucket
+            shift = day_offset * MINUTES_PER_DAY
+            self._buckets[(bucket_day, slot)][entry['specialization']][schedule_id] = (
+                entry, start - shift, end - shift
+            )
+            keys.append((bucket_day, slot))
+        self._entries[schedule_id] = (signature, keys, entry['specialization'])
+        self._stats['added'] += 1
+
+    def _remove(self, schedule_id):
+        _, keys, specialization = self._entries.pop(schedule_id)
+        for key in keys:
+            by_spec = self._buckets[key]
+            by_spec[specialization].pop(schedule_id, None)
+            if not by_spec[specialization]:
+                del by_spec[specialization]
+            if not by_spec:
+                del self._buckets[key]
+        self._stats['removed'] += 1
+
+    def _signatures(self, df):
+        frame = df[[col for col in ENTRY_COLUMNS if col in df.columns]].copy()
+        if 'schedule_id' not in frame.columns:
+            frame['schedule_id'] = frame.index.astype(str)
+        frame['start'] = to_minutes(frame['start_time'])
+        frame['end'] = to_minutes(frame['end_time'])
+        frame = frame.dropna(subset=['schedule_day', 'start', 'end'])
+        frame = frame[frame['schedule_day'].isin(DAYS)]
+        frame.loc[frame['end'] <= frame['start'], 'end'] += MINUTES_PER_DAY
+
+        signatures = {}
+        for row in frame.to_dict('records'):
+            start, end = int(row.pop('start')), int(row.pop('end'))
+            entry = {col: row.get(col) for col in ENTRY_COLUMNS}
+            signature = tuple(entry[col] for col in ENTRY_COLUMNS) + (start, end)
+            signatures[str(row['schedule_id'])] = (signature, entry)
+        return signatures
+
+    def sync(self, df):
+        """
+        Samakan index dengan frame doctor_schedule `df`. Frame yang sama
+        (objek cache yang sama) tidak diproses ulang; frame baru hanya
+        memindahkan jadwal yang berbeda. Return dict jumlah added/removed.
+        """
+        if df is self._source:
+            return {'added': 0, 'removed': 0}
+
+        with self._lock:
+            if df is self._source:
+                return {'added': 0, 'removed': 0}
+            new = self._signatures(df)
+            removed = [sid for sid, (signature, _, _) in self._entries.items()
+                       if sid not in new or new[sid][0] != signature]
+            for sid in removed:
+                self._remove(sid)
+            added = [sid for sid in new if sid not in self._entries]
+            for sid in added:
+                signature, entry = new[sid]
+                self._add(sid, signature, entry)
+
+            self._stats['builds' if self._source is None else 'refreshes'] += 1
+            self._source = df
+            return {'added': len(added), 'removed': len(removed)}
+
+    # ---- query ----
+
+    def lookup(self, day, minute, specialization=None):
+        """Jadwal yang aktif pada `minute` (menit sejak 00:00) di hari `day`"""
+        # sync mengubah dict bucket in-place: baca di bawah lock yang sama
+        with self._lock:
+            by_spec = self._buckets.get((day, minute // self.slot_minutes), {})
+            if specialization:
+                candidates = [by_spec.get(specialization, {})]
+            else:
+                candidates = list(by_spec.values())
+
+            results = []
+            for schedules in candidates:
+                for entry, start, end in schedules.values():
+                    if start <= minute < end:
+                        results.append(entry)
+        results.sort(key=lambda e: (str(e['specialization']), str(e['name']), str(e['start_time'])))
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'schedules': len(self._entries),
+                'buckets': len(self._buckets),
+                'slot_minutes': self.slot_minutes,
+            }
+
+
+slot_index = SlotIndex()
@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from app import group_doctor_schedules, prepare_doctor_df  # noqa: E402
+from schema import apply_dtypes, csv_path, read_csv_chunks  # noqa: E402
+
+# ------------------------------
+# BENCHMARK: pengelompokan jadwal di doctor_tab
+# ------------------------------
+# Loop groupby lama (to_dict per grup + pass kedua) vs group_doctor_schedules.
+#   python benchmarks/bench_doctor_tab.py --rows 50000
+
+
+def make_schedule(rows, seed=0):
+    """doctor_schedule.csv diperbesar: nama dokter diberi sufiks supaya jumlah grup ikut naik"""
+    base = pd.concat(read_csv_chunks('doctor_schedule', csv_path('doctor_schedule', ROOT)), ignore_index=True)
+    reps = -(-rows // len(base))
+    df = pd.concat([base] * reps, ignore_index=True).head(rows)
+    batch = np.repeat(np.arange(reps), len(base))[:rows]
+    rng = np.random.default_rng(seed)
+    df['name'] = df['name'] + ' #' + (batch + rng.integers(0, 3, size=rows)).astype(str)
+    df['schedule_id'] = [f"SC{i:07d}" for i in range(rows)]
+    return prepare_doctor_df(apply_dtypes(df, 'doctor_schedule'))
+
+
+def loop_grouping(df):
+    grouped_data = []
+    if not df.empty:
+        grouped = df.groupby(['name', 'specialization', 'schedule_day_indonesia'], observed=True)
+        for (name, specialization, day), group in grouped:
+            schedules = group[['start_time', 'end_time', 'room_id']].to_dict('records')
+            grouped_data.append({
+                'name': name,
+                'specialization': specialization,
+                'schedule_day_indonesia': day,
+                'schedules': schedules,
+                'first_schedule': schedules[0]
+            })
+    table_data = []
+    for row in grouped_data:
+        table_data.append({
+            'name': row['name'],
+            'specialization': row['specialization'],
+            'schedule_day_indonesia': row['schedule_day_indonesia'],
+            'start_time': row['first_schedule']['start_time'],
+            'end_time': row['first_schedule']['end_time'],
+            'room_id': row['first_schedule']['room_id'],
+            'all_schedules': row['schedules']
+        })
+    return table_data
+
+
+def best_of(fn, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_schedule(args.rows)
+    old_time, old = best_of(loop_grouping, df, args.repeat)
+    new_time, new = best_of(group_doctor_schedules, df, args.repeat)
+    assert old == new, "hasil berbeda"
+
+    print(f"rows:        {len(df)}")
+    print(f"groups:      {len(new)}")
+    print(f"loop:        {old_time:.3f}s")
+    print(f"vectorized:  {new_time:.3f}s")
+    print(f"speedup:     {old_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+from forecast import FORECAST_HORIZON, run_forecast  # noqa: E402
+from schema import csv_path, read_csv_chunks  # noqa: E402
+
+# ------------------------------
+# BENCHMARK: fit forecast patient_trends
+# ------------------------------
+# Waktu fitur + fit semua horizon, serial vs process pool.
+#   python datagen.py --scale 100 --out data_x100
+#   python benchmarks/bench_forecast.py --data data_x100 --workers 4
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=ROOT, help="folder berisi patient_trends.csv")
+    parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    trends = pd.concat(read_csv_chunks('patient_trends', csv_path('patient_trends', args.data)), ignore_index=True)
+    print(f"days:        {len(trends)}")
+
+    serial = []
+    for _ in range(args.repeat):
+        result = run_forecast(trends, args.horizon, None, 1)
+        serial.append(result['fit_seconds'])
+    print(f"serial:      {min(serial):.3f}s  (mean MAE {result['mean_mae']})")
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            start = time.perf_counter()
+            run_forecast(trends, args.horizon, pool, args.workers)
+            print(f"pool warmup: {time.perf_counter() - start:.3f}s")
+            pooled = [run_forecast(trends, args.horizon, pool, args.workers)['fit_seconds']
+                      for _ in range(args.repeat)]
+        print(f"pool x{args.workers}:     {min(pooled):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
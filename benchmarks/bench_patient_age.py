@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import compute_age, categorize_age  # noqa: E402
+
+# ------------------------------
+# MICROBENCHMARK: age & age_group pasien
+# ------------------------------
+# Membandingkan versi lama (apply per baris) dengan versi vektor di app.py.
+#   python benchmarks/bench_patient_age.py --rows 1000000
+
+
+def make_birth_dates(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('1930-01-01')
+    days = rng.integers(0, 365 * 95, size=rows)
+    births = pd.Series(start + days.astype('timedelta64[D]'))
+    # ~1% kosong, seperti data asli
+    births[rng.random(rows) < 0.01] = pd.NaT
+    return births
+
+
+def rowwise(births):
+    today = datetime.today()
+    age = births.apply(
+        lambda x: today.year - x.year - ((today.month, today.day) < (x.month, x.day))
+        if pd.notnull(x) else 0
+    )
+
+    def categorize(age):
+        if age < 18:
+            return 'Anak (<18)'
+        elif 18 <= age < 40:
+            return 'Dewasa Muda (18-39)'
+        elif 40 <= age < 60:
+            return 'Dewasa (40-59)'
+        else:
+            return 'Lansia (60+)'
+
+    return age, age.apply(categorize)
+
+
+def vectorized(births):
+    age = compute_age(births)
+    return age, categorize_age(age)
+
+
+def best_of(fn, births, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(births)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    births = make_birth_dates(args.rows)
+    old_time, (old_age, old_group) = best_of(rowwise, births, 1)
+    new_time, (new_age, new_group) = best_of(vectorized, births, args.repeat)
+
+    assert (old_age.values == new_age.values).all()
+    assert (old_group.values == new_group.astype(str).values).all()
+
+    print(f"rows:        {args.rows}")
+    print(f"apply:       {old_time:.3f}s")
+    print(f"vectorized:  {new_time:.3f}s")
+    print(f"speedup:     {old_time / new_time:.1f}x")
+    print(f"age_group:   {old_group.memory_usage(deep=True) / 1e6:.1f} MB (object) -> "
+          f"{new_group.memory_usage(deep=True) / 1e6:.1f} MB (category)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+from pharmacy_ledger import PharmacyLedger, InsufficientStock  # noqa: E402
+from schema import csv_path, read_csv_chunks  # noqa: E402
+
+# ------------------------------
+# BENCHMARK: ledger stok farmasi
+# ------------------------------
+# Build ledger, throughput dispense FEFO dan ringkasan expiry/stok dari ledger
+# vs scan penuh frame (cara pharmacy_tab lama).
+#   python datagen.py --scale 100 --out data_x100
+#   python benchmarks/bench_pharmacy_ledger.py --data data_x100 --events 20000
+
+
+def full_scan(df):
+    today = pd.Timestamp.today().normalize()
+    expiry = df['expiry_date']
+    stock = df['stock_in'] - df['stock_out']
+    upcoming = df[expiry <= today + pd.Timedelta(days=30)]
+    return {
+        'expiry': upcoming.assign(current_stock=stock)[['drug_name', 'current_stock']].to_dict('records'),
+        'in_stock': int((stock > 5).sum()),
+        'low_stock': int(((stock <= 5) & (stock > 0)).sum()),
+        'out_of_stock': int((stock <= 0).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=ROOT, help="folder berisi pharmacy_stock.csv")
+    parser.add_argument('--events', type=int, default=10000, help="jumlah dispense")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    df = pd.concat(read_csv_chunks('pharmacy_stock', csv_path('pharmacy_stock', args.data)), ignore_index=True)
+    df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')   # seperti prepare_pharmacy_df
+    print(f"batches:     {len(df)}  drugs: {df['drug_name'].nunique()}")
+
+    ledger = PharmacyLedger()
+    start = time.perf_counter()
+    ledger.sync(df)
+    print(f"build:       {time.perf_counter() - start:.3f}s")
+
+    changed = df.copy()
+    rows = np.random.default_rng(0).choice(len(df), max(len(df) // 100, 1), replace=False)
+    changed.loc[rows, 'stock_out'] += 1
+    start = time.perf_counter()
+    result = ledger.sync(changed)
+    print(f"resync 1%:   {time.perf_counter() - start:.3f}s  {result}")
+
+    drugs = list(ledger.summary()['drugs'])
+    rng = np.random.default_rng(1)
+    names = rng.choice(drugs, args.events)
+    quantities = rng.integers(1, 20, args.events)
+    rejected = 0
+    start = time.perf_counter()
+    for name, quantity in zip(names, quantities):
+        try:
+            ledger.dispense(name, quantity)
+        except InsufficientStock:
+            rejected += 1
+    elapsed = time.perf_counter() - start
+    print(f"dispense:    {args.events / elapsed:,.0f} event/s  ({rejected} ditolak)")
+
+    scan = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        full_scan(changed)
+        scan.append(time.perf_counter() - start)
+    print(f"full scan:   {1000 * np.median(scan):.2f}ms")
+
+    cold, warm = [], []
+    for _ in range(args.repeat):
+        ledger.dispense(drugs[0], 1)
+        start = time.perf_counter()
+        ledger.summary()
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        ledger.summary()
+        warm.append(time.perf_counter() - start)
+    print(f"ledger:      {1000 * np.median(cold):.2f}ms setelah dispense, {1000 * np.median(warm):.3f}ms cache")
+    print(f"stats:       {ledger.stats()}")
+
+
+if __name__ == '__main__':
+    main()
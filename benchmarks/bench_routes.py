@@ -0,0 +1,263 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ------------------------------
+# BENCHMARK: semua route, page dan export
+# ------------------------------
+# Menjalankan setiap route lewat Flask test client (in-process, tanpa jaringan)
+# di atas data hasil datagen.py, lalu mencatat per route: p50/p95 latensi,
+# throughput, ukuran response, RSS puncak, dan rata-rata fase Server-Timing.
+#
+#   python datagen.py --scale 100 --out data_x100
+#   python benchmarks/bench_routes.py --data data_x100 --out bench_x100.json
+#   python benchmarks/bench_routes.py --data data_x100 --compare bench_x100.json
+#
+# --backend snapshot (default) membangun snapshot Arrow dari CSV di --data
+# (DATA_SOURCE=snapshot, tanpa server database). --backend embedded memuat CSV
+# ke SQLite/DuckDB in-process (embedded_db.py, --engine). --backend mysql
+# memakai database dari konfigurasi db_pool; load dulu dengan
+#   python ingest.py --create --source data_x100
+# --mode warm: cache dipanaskan dulu; cold: semua cache di-invalidate sebelum
+# setiap request (termasuk waktu load dari sumber data).
+
+# Filter yang umum dipakai di tiap tab (nilai yang ada di data bawaan)
+ROUTES = [
+    ('dashboard', '/dashboard'),
+    ('doctor', '/doctor'),
+    ('doctor_filtered', '/doctor?specialization=Anak&day=Senin'),
+    ('doctor_search', '/doctor?search_doctor=sar'),
+    ('room', '/room'),
+    ('patient', '/patient'),
+    ('patient_filtered', '/patient?gender=P&payment_type=BPJS&search_patient=sar'),
+    ('pharmacy', '/pharmacy'),
+    ('api_pharmacy_expiring', '/api/pharmacy/expiring?days=60&limit=100'),
+    ('lab', '/lab'),
+    ('lab_filtered', '/lab?test_type=Darah+Lengkap&result_status=Selesai'),
+    ('api_lab_turnaround', '/api/lab/turnaround?test_type=Lipid&start_date=2024-01-01&end_date=2024-12-31'),
+    ('staff', '/staff'),
+    ('staff_filtered', '/staff?staff_role=Perawat&staff_status=Active'),
+    ('finance', '/finance'),
+    ('finance_filtered', '/finance?payment_type=BPJS&start_date=2025-01-01&end_date=2025-03-31'),
+    ('registrations', '/registrations'),
+    ('api_registrations_summary', '/api/registrations/summary?department=IGD&start_date=2024-01-01&end_date=2024-12-31'),
+    ('api_table_patient', '/api/table/patient?page=2&page_size=50'),
+    ('api_table_finance', '/api/table/finance?page_size=100&sort=amount_idr&order=desc'),
+    ('api_table_finance_columns', '/api/table/finance?page_size=1000&orient=columns'),
+    ('api_table_lab', '/api/table/lab?page_size=100&result_status=Selesai'),
+    ('api_table_staff', '/api/table/staff?page_size=100'),
+    ('api_table_pharmacy', '/api/table/pharmacy?page_size=100'),
+    ('api_table_room', '/api/table/room?page_size=100'),
+    ('api_schedule_conflicts', '/api/schedule_conflicts?page_size=100'),
+    ('api_doctors_available', '/api/doctors/available?day=Senin&time=10:30'),
+    ('api_search_patients', '/api/search/patients?q=sari'),
+    ('api_search_doctors', '/api/search/doctors?q=an'),
+    ('api_search_staff', '/api/search/staff?q=put'),
+    ('export_doctor', '/export'),
+    ('export_doctor_parquet', '/export?format=parquet'),
+    ('export_schedule_conflicts', '/export_schedule_conflicts'),
+    ('export_rooms', '/export_rooms'),
+    ('export_patients', '/export_patients'),
+    ('export_pharmacy', '/export_pharmacy'),
+    ('export_lab_tests', '/export_lab_tests'),
+    ('export_staff', '/export_staff'),
+    ('export_finance', '/export_finance'),
+    ('export_finance_parquet', '/export_finance?format=parquet'),
+    ('export_registrations', '/export_registrations'),
+]
+
+
+def rss_mb():
+    """RSS saat ini (Linux /proc), fallback ke puncak getrusage"""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux, bytes di macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def parse_server_timing(header):
+    """'db;dur=1.20;desc="..", total;dur=3.4' -> {'db': 1.2, 'total': 3.4}"""
+    phases = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        for field in fields[1:]:
+            if field.startswith('dur='):
+                phases[fields[0]] = phases.get(fields[0], 0.0) + float(field[4:])
+    return phases
+
+
+def prepare_backend(args):
+    """Set env sumber data sebelum app di-import (data_source membaca env saat import)"""
+    data_dir = os.path.abspath(args.data)
+    if args.backend == 'snapshot':
+        snapshot_dir = args.snapshot_dir or os.path.join(data_dir, 'snapshots')
+        os.environ['DATA_SOURCE'] = 'snapshot'
+        os.environ['SNAPSHOT_DIR'] = snapshot_dir
+        from schema import TABLES
+        from snapshot import build_snapshot, has_snapshot
+        for table in TABLES:
+            if args.rebuild or not has_snapshot(table, snapshot_dir):
+                start = time.perf_counter()
+                rows = build_snapshot(table, data_dir, snapshot_dir)
+                print(f"snapshot {table}: {rows} baris ({time.perf_counter() - start:.1f}s)")
+    elif args.backend == 'embedded':
+        os.environ['DATA_SOURCE'] = 'embedded'
+        os.environ['EMBEDDED_ENGINE'] = args.engine
+        os.environ['EMBEDDED_SOURCE'] = data_dir
+        # Snapshot hanya dipakai kalau memang ada; default-nya folder yang tidak ada -> CSV
+        os.environ['SNAPSHOT_DIR'] = args.snapshot_dir or os.path.join(data_dir, 'snapshots')
+    else:
+        os.environ['DATA_SOURCE'] = 'mysql'
+
+
+def table_rows(data_dir):
+    rows = {}
+    from schema import TABLES, csv_path
+    for table in TABLES:
+        path = csv_path(table, data_dir)
+        if os.path.exists(path):
+            with open(path, 'rb') as fh:
+                rows[table] = max(sum(1 for _ in fh) - 1, 0)
+    return rows
+
+
+def run_route(client, invalidate, path, requests, mode):
+    timings, phases, statuses, nbytes = [], [], set(), 0
+    rss_before = rss_mb()
+    # Warm-up tidak dihitung (mode warm) supaya cache dan index sudah terisi
+    if mode == 'warm':
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.get(path).get_data()
+
+    for _ in range(requests):
+        if mode == 'cold':
+            invalidate()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            response = client.get(path)
+            body = response.get_data()  # export streaming dikonsumsi penuh
+            elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        statuses.add(response.status_code)
+        nbytes = len(body)
+        phases.append(parse_server_timing(response.headers.get('Server-Timing')))
+
+    ms = np.array(timings) * 1000
+    names = sorted({name for p in phases for name in p})
+    return {
+        'path': path,
+        'status': sorted(statuses),
+        'requests': requests,
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'throughput_rps': round(requests / sum(timings), 2),
+        'response_bytes': nbytes,
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'phases_ms': {name: round(sum(p.get(name, 0.0) for p in phases) / len(phases), 3) for name in names},
+    }
+
+
+def compare(results, baseline_path, threshold):
+    """Route dengan p95 lebih lambat dari baseline * (1 + threshold%); return list regresi"""
+    with open(baseline_path, encoding='utf-8') as fh:
+        baseline = json.load(fh)
+    for key in ('backend', 'mode', 'rows'):
+        if baseline['meta'].get(key) != results['meta'].get(key):
+            print(f"PERINGATAN: {key} berbeda dengan baseline, perbandingan tidak setara")
+    baseline = baseline['routes']
+    regressions = []
+    print(f"\n{'route':32} {'base p95':>10} {'p95':>10} {'diff':>8}")
+    for name, result in results['routes'].items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['p95_ms'], result['p95_ms']
+        diff = (new - old) / old * 100 if old else 0.0
+        flag = ''
+        if diff > threshold:
+            regressions.append(name)
+            flag = '  REGRESI'
+        print(f"{name:32} {old:>10.1f} {new:>10.1f} {diff:>+7.0f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semua route di atas data datagen.py")
+    parser.add_argument('--data', default=ROOT, help="folder CSV (hasil datagen.py)")
+    parser.add_argument('--backend', choices=['snapshot', 'embedded', 'mysql'], default='snapshot')
+    parser.add_argument('--engine', choices=['auto', 'sqlite', 'duckdb'], default='auto', help="engine --backend embedded")
+    parser.add_argument('--snapshot-dir', default=None, help="default: <data>/snapshots")
+    parser.add_argument('--rebuild', action='store_true', help="bangun ulang snapshot walaupun sudah ada")
+    parser.add_argument('--mode', choices=['warm', 'cold'], default='warm')
+    parser.add_argument('--requests', type=int, default=20, help="request terukur per route")
+    parser.add_argument('--routes', nargs='*', help="nama route (default: semua)")
+    parser.add_argument('--out', default=None, help="tulis hasil JSON ke file ini")
+    parser.add_argument('--compare', default=None, help="JSON baseline untuk deteksi regresi")
+    parser.add_argument('--threshold', type=float, default=20.0, help="batas regresi p95 (persen)")
+    args = parser.parse_args()
+
+    routes = [(name, path) for name, path in ROUTES if not args.routes or name in args.routes]
+    prepare_backend(args)
+
+    import pandas as pd
+    from app import app
+    from cache import invalidate_table
+
+    client = app.test_client()
+    results = {
+        'meta': {
+            'data': os.path.abspath(args.data),
+            'rows': table_rows(args.data),
+            'backend': args.backend if args.backend != 'embedded' else f"embedded-{args.engine}",
+            'mode': args.mode,
+            'requests_per_route': args.requests,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'started': datetime.now().isoformat(timespec='seconds'),
+        },
+        'routes': {},
+    }
+    print(f"{'route':32} {'p50 ms':>10} {'p95 ms':>10} {'req/s':>8} {'RSS MB':>8}")
+    for name, path in routes:
+        result = run_route(client, invalidate_table, path, args.requests, args.mode)
+        results['routes'][name] = result
+        print(f"{name:32} {result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} "
+              f"{result['throughput_rps']:>8.1f} {result['rss_mb']:>8.0f}")
+    results['meta']['peak_rss_mb'] = round(peak_rss_mb(), 1)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"\nHasil: {args.out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} route regresi > {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
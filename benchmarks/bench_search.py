@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+from schema import csv_path, read_csv_chunks  # noqa: E402
+from search_index import TrigramIndex  # noqa: E402
+
+# ------------------------------
+# BENCHMARK: pencarian pasien (typeahead)
+# ------------------------------
+# Scan str.contains di seluruh master pasien vs TrigramIndex.search.
+#   python benchmarks/bench_search.py --rows 1000000
+
+
+def make_patients(rows, seed=0):
+    """patients.csv diperbesar: nama depan/belakang diacak ulang, ID unik"""
+    base = pd.concat(read_csv_chunks('patients', csv_path('patients', ROOT)), ignore_index=True)
+    words = base['name'].str.split()
+    first = words.str[0].unique()
+    last = words.str[-1].unique()
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'patient_id': [f"P{i:07d}" for i in range(rows)],
+        'name': pd.Series(rng.choice(first, rows)) + ' ' + pd.Series(rng.choice(last, rows)),
+        'gender': rng.choice(['L', 'P'], rows),
+    })
+
+
+def scan(df, query):
+    query = query.lower()
+    text = df['name'].str.lower() + ' ' + df['patient_id'].str.lower()
+    return df[text.str.contains(query, regex=False)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    df = make_patients(args.rows)
+    index = TrigramIndex('patient_id', ['name', 'patient_id'], ['patient_id', 'name', 'gender'])
+    start = time.perf_counter()
+    index.sync(df)
+    build = time.perf_counter() - start
+
+    # Query typeahead: potongan nama (2-6 huruf) dan potongan ID
+    rng = np.random.default_rng(1)
+    names = df['name'].sample(args.queries, random_state=1).tolist()
+    queries = [name[:rng.integers(2, 7)] for name in names[: args.queries // 2]]
+    queries += [pid[-rng.integers(4, 8):] for pid in df['patient_id'].sample(args.queries - len(queries), random_state=2)]
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit=10)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+
+    start = time.perf_counter()
+    expected = scan(df, queries[-1])
+    scan_ms = (time.perf_counter() - start) * 1000
+    assert index.search_ids(queries[-1]) == set(expected['patient_id']), "hasil berbeda"
+
+    # Update incremental: 1000 pasien baru/berubah
+    changed = df.copy()
+    changed.loc[:499, 'name'] = 'Pasien Ubah ' + changed.loc[:499, 'patient_id']
+    changed = pd.concat([changed, make_patients(500, seed=9).assign(
+        patient_id=[f"N{i:07d}" for i in range(500)])], ignore_index=True)
+    start = time.perf_counter()
+    delta = index.sync(changed)
+    sync = time.perf_counter() - start
+
+    stats = index.stats()
+    print(f"patients:    {len(df)}")
+    print(f"trigrams:    {stats['trigrams']}  postings: {stats['postings']}")
+    print(f"build:       {build:.2f}s")
+    print(f"sync:        {sync:.2f}s  {delta}")
+    print(f"scan:        {scan_ms:.1f}ms (1 query)")
+    print(f"index p50:   {np.percentile(timings, 50):.2f}ms")
+    print(f"index p95:   {np.percentile(timings, 95):.2f}ms")
+    print(f"index max:   {timings.max():.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, ROOT)
+from schema import apply_dtypes, csv_path, read_csv_chunks  # noqa: E402
+from serializer import dumps, orjson  # noqa: E402
+
+# ------------------------------
+# BENCHMARK: serialisasi JSON tabel finance
+# ------------------------------
+# clean_data_for_json lama (to_dict + clean_value per sel) + json.dumps
+# vs serializer.dumps (konversi per kolom + orjson kalau ada).
+#   python benchmarks/bench_serializer.py --rows 200000
+
+
+def clean_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    elif isinstance(value, pd.Timestamp) and value == value.normalize():
+        return value.date().isoformat()
+    elif hasattr(value, 'isoformat'):
+        return value.isoformat()
+    elif hasattr(value, 'total_seconds'):
+        return str(value)
+    else:
+        try:
+            return str(value)
+        except Exception:
+            return None
+
+
+def clean_data_for_json(df):
+    df = df.astype(object).where(df.notna(), None)
+    return [{key: clean_value(value) for key, value in item.items()} for item in df.to_dict('records')]
+
+
+def make_finance(rows):
+    base = pd.concat(read_csv_chunks('finance', csv_path('finance', ROOT)), ignore_index=True)
+    df = pd.concat([base] * -(-rows // len(base)), ignore_index=True).head(rows)
+    return apply_dtypes(df, 'finance')
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_finance(args.rows)
+    old_time, old = best_of(lambda: json.dumps(clean_data_for_json(df), sort_keys=True), args.repeat)
+    new_time, new = best_of(lambda: dumps(df, sort_keys=True), args.repeat)
+    assert json.loads(old) == json.loads(new), "hasil berbeda"
+
+    print(f"rows:        {len(df)}")
+    print(f"encoder:     {'orjson' if orjson is not None else 'json'}")
+    print(f"per cell:    {old_time:.3f}s")
+    print(f"columnar:    {new_time:.3f}s")
+    print(f"speedup:     {old_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
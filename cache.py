@@ -0,0 +1,194 @@
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import pandas as pd
+
+from instrumentation import phase
+
+# ------------------------------
+# KONFIGURASI CACHE
+# ------------------------------
+CACHE_DEFAULT_TTL = float(os.environ.get('CACHE_TTL', 300))
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 128))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_MB', 512)) * 1024 * 1024
+
+# TTL per tabel (detik). Okupansi ruangan, registrasi dan transaksi berubah
+# lebih cepat dibanding jadwal dokter atau master pasien.
+TABLE_TTLS = {
+    'rooms': 30,
+    'finance': 60,
+    'lab_tests': 60,
+    'pharmacy_stock': 120,
+    'registrations': 60,
+    'patient_trends': 300,
+}
+
+
+def estimate_size(value):
+    """Perkiraan ukuran memori (bytes) hasil loader: DataFrame dihitung deep"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class TableCache:
+    """
+    Cache in-process untuk hasil load_*_data().
+    Setiap entry punya TTL, dibatasi jumlah entry dan total bytes (LRU eviction),
+    dan ditandai dengan nama tabel sumbernya supaya bisa di-invalidate per tabel.
+    Nilai yang dikembalikan dipakai bersama antar request, jadi perlakukan read-only.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 default_ttl=CACHE_DEFAULT_TTL, table_ttls=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.table_ttls = dict(TABLE_TTLS if table_ttls is None else table_ttls)
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, tables, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._local = threading.local()
+        self._counters = {}
+        self._generation = 0  # naik setiap invalidate, mencegah hasil load lama tersimpan
+
+    # --- counters ---
+    def _count(self, table, name):
+        per_table = self._counters.setdefault(table, {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0})
+        per_table[name] += 1
+
+    def ttl_for(self, tables):
+        return min(self.table_ttls.get(t, self.default_ttl) for t in tables)
+
+    # --- get / set ---
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at, tables, size = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, tables, ttl=None):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # terlalu besar untuk di-cache
+        ttl = self.ttl_for(tables) if ttl is None else ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tables), size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                old_key, (_, _, old_tables, _) = next(iter(self._entries.items()))
+                self._remove(old_key)
+                self._count(old_tables[0], 'evictions')
+
+    def _remove(self, key):
+        value, expires_at, tables, size = self._entries.pop(key)
+        self._bytes -= size
+
+    # --- invalidation ---
+    def invalidate(self, table=None):
+        """Hapus semua entry yang bergantung pada `table` (None = semua)"""
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if table is None or table in entry[2]]
+            for key in keys:
+                self._remove(key)
+            self._generation += 1
+            self._count(table or '*', 'invalidations')
+            return len(keys)
+
+    def dont_cache(self):
+        """Dipanggil dari blok except loader: hasil fallback jangan disimpan"""
+        self._local.skip = True
+
+    # --- loader decorator ---
+    def cached(self, *tables, ttl=None):
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                # Argumen dinormalisasi (default diisi): f() dan f(()) memakai entry yang sama
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (fn.__name__, bound.args, tuple(sorted(bound.kwargs.items())))
+                hit, value = self.get(key)
+                if hit:
+                    with self._lock:
+                        self._count(tables[0], 'hits')
+                    return value
+
+                # Satu loader per key: request bersamaan menunggu hasil yang sama
+                with self._lock:
+                    key_lock = self._key_locks.setdefault(key, threading.Lock())
+                try:
+                    with key_lock:
+                        hit, value = self.get(key)
+                        if hit:
+                            with self._lock:
+                                self._count(tables[0], 'hits')
+                            return value
+                        with self._lock:
+                            self._count(tables[0], 'misses')
+                            generation = self._generation
+
+                        self._local.skip = False
+                        try:
+                            with phase('load'):
+                                value = fn(*args, **kwargs)
+                                # Kalau ada invalidate selama loading, hasilnya mungkin sudah basi
+                                if not self._local.skip and generation == self._generation:
+                                    self.set(key, value, tables, ttl)
+                        finally:
+                            self._local.skip = False
+                    return value
+                finally:
+                    # Juga kalau loader raise: lock per key tidak boleh menumpuk
+                    with self._lock:
+                        if self._key_locks.get(key) is key_lock:
+                            self._key_locks.pop(key)
+            wrapper.cache_tables = tables
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            tables = {t: dict(c) for t, c in self._counters.items()}
+            hits = sum(c['hits'] for c in tables.values())
+            misses = sum(c['misses'] for c in tables.values())
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'tables': tables,
+            }
+
+
+table_cache = TableCache()
+
+
+def invalidate_table(table=None):
+    """Hook invalidasi: panggil setelah insert/update/delete ke `table`"""
+    return table_cache.invalidate(table)
@@ -1,5 +1,5 @@
-import chardet
+from schema import TABLES, csv_path, detect_encoding
 
-with open("doctor_schedule.csv", "rb") as f:
-    result = chardet.detect(f.read(10000))  # baca sebagian
-    print(result)
+# Cek encoding semua CSV seed (deteksi yang sama dipakai ingest.py dan snapshot.py)
+for table in TABLES:
+    print(f"{TABLES[table]['csv']}: {detect_encoding(csv_path(table))}")
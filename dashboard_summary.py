@@ -0,0 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import table_cache
+from data_source import get_connection
+from instrumentation import phase, run_in_context
+from normalize import LAB_STATUS, SCHEDULE_DAY, STAFF_ACTIVE, canonical_counts
+
+# ------------------------------
+# DASHBOARD SUMMARY ENGINE
+# ------------------------------
+# Semua angka dashboard dihitung di database (COUNT/SUM/GROUP BY), sehingga
+# yang dikirim ke aplikasi hanya beberapa baris agregat, bukan tabel penuh.
+# Query dijalankan paralel, masing-masing dengan koneksi sendiri (pool MySQL
+# atau database embedded, lihat data_source.get_connection).
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='dashboard')
+
+
+def run_query(sql, params=()):
+    """Jalankan query agregat dan kembalikan list of dict"""
+    with phase('db') as info:
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(params))
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            cursor.close()
+            info['rows'] = len(rows)
+            return rows
+        finally:
+            conn.close()
+
+
+def _num(value, cast=int):
+    # SUM() di MySQL mengembalikan Decimal / None
+    return cast(value) if value is not None else cast(0)
+
+
+def _doctor_summary(today_indonesia):
+    # Semua ejaan hari ini ('Rabu', 'Wednesday', ...) lewat normalize.SCHEDULE_DAY
+    days = SCHEDULE_DAY.spellings(SCHEDULE_DAY.canonical(today_indonesia) or today_indonesia)
+    rows = run_query(
+        "SELECT specialization, COUNT(*) AS count FROM doctor_schedule "
+        f"WHERE schedule_day IN ({', '.join(['%s'] * len(days))}) GROUP BY specialization",
+        days
+    )
+    spec = {r['specialization']: _num(r['count']) for r in rows}
+    return {'today_doctors': sum(spec.values()), 'today_doctors_spec': spec}
+
+
+def _room_summary():
+    rows = run_query(
+        "SELECT room_type, COUNT(*) AS total, SUM(current_occupancy > 0) AS occupied "
+        "FROM rooms GROUP BY room_type"
+    )
+    room_stats = {}
+    for r in rows:
+        total, occupied = _num(r['total']), _num(r['occupied'])
+        room_stats[r['room_type']] = {
+            'total': total,
+            'occupied': occupied,
+            'available': total - occupied,
+            'occupancy_rate': round(occupied / total * 100, 1) if total > 0 else 0
+        }
+    total_rooms = sum(s['total'] for s in room_stats.values())
+    occupied_rooms = sum(s['occupied'] for s in room_stats.values())
+    return {
+        'total_rooms': total_rooms,
+        'occupied_rooms': occupied_rooms,
+        'available_rooms': total_rooms - occupied_rooms,
+        'occupancy_rate': round(occupied_rooms / total_rooms * 100, 1) if total_rooms > 0 else 0,
+        'room_stats': room_stats,
+    }
+
+
+def _patient_summary():
+    rows = run_query("SELECT COUNT(*) AS total FROM patients")
+    return {'total_patients': _num(rows[0]['total'])}
+
+
+def _today_patient_summary(today):
+    # Pasien hari ini = registrasi kunjungan hari ini (patients tidak punya registration_date)
+    rows = run_query(
+        "SELECT COUNT(*) AS count FROM registrations WHERE visit_date = %s",
+        [today]
+    )
+    return {'today_patients': _num(rows[0]['count'])}
+
+
+def _pharmacy_summary():
+    rows = run_query(
+        "SELECT COUNT(*) AS total, "
+        "SUM(stock_in - stock_out <= 5) AS low_stock, "
+        "SUM(stock_in - stock_out <= 0) AS out_of_stock "
+        "FROM pharmacy_stock"
+    )
+    r = rows[0]
+    return {
+        'total_medicines': _num(r['total']),
+        'low_stock_medicines': _num(r['low_stock']),
+        'out_of_stock_medicines': _num(r['out_of_stock']),
+    }
+
+
+def _lab_summary(today):
+    rows = run_query(
+        "SELECT result_status, COUNT(*) AS total, "
+        "SUM(scheduled_date = %s) AS today "
+        "FROM lab_tests GROUP BY result_status",
+        [today]
+    )
+    # Status mentah ('Selesai', 'Pending', ...) digabung per nilai kanonik
+    by_status = canonical_counts(LAB_STATUS, [(r['result_status'], _num(r['total'])) for r in rows])
+    today_status = canonical_counts(LAB_STATUS, [(r['result_status'], _num(r['today'])) for r in rows])
+    today_status = {status: count for status, count in today_status.items() if count > 0}
+    return {
+        'total_lab_tests': sum(by_status.values()),
+        'pending_tests': by_status.get('Pending', 0),
+        'today_tests': sum(today_status.values()),
+        'today_tests_status': today_status,
+    }
+
+
+def _staff_summary():
+    rows = run_query("SELECT active, COUNT(*) AS total FROM staff GROUP BY active")
+    by_active = canonical_counts(STAFF_ACTIVE, [(r['active'], _num(r['total'])) for r in rows])
+    return {'total_staff': sum(_num(r['total']) for r in rows), 'active_staff': by_active.get('True', 0)}
+
+
+def _finance_summary(today):
+    rows = run_query(
+        "SELECT SUM(amount_idr) AS total_revenue, "
+        "SUM(CASE WHEN transaction_date = %s THEN amount_idr ELSE 0 END) AS today_revenue "
+        "FROM finance",
+        [today]
+    )
+    r = rows[0]
+    return {
+        'total_revenue': _num(r['total_revenue'], float),
+        'today_revenue': _num(r['today_revenue'], float),
+    }
+
+
+# Nilai default kalau satu query gagal: dashboard tetap tampil dengan angka 0
+_FALLBACKS = {
+    _doctor_summary: {'today_doctors': 0, 'today_doctors_spec': {}},
+    _room_summary: {'total_rooms': 0, 'occupied_rooms': 0, 'available_rooms': 0,
+                    'occupancy_rate': 0, 'room_stats': {}},
+    _patient_summary: {'total_patients': 0},
+    _today_patient_summary: {'today_patients': 0},
+    _pharmacy_summary: {'total_medicines': 0, 'low_stock_medicines': 0, 'out_of_stock_medicines': 0},
+    _lab_summary: {'total_lab_tests': 0, 'pending_tests': 0, 'today_tests': 0, 'today_tests_status': {}},
+    _staff_summary: {'total_staff': 0, 'active_staff': 0},
+    _finance_summary: {'total_revenue': 0, 'today_revenue': 0},
+}
+
+
+@table_cache.cached('rooms', 'doctor_schedule', 'patients', 'pharmacy_stock',
+                    'lab_tests', 'staff', 'finance', 'registrations')
+def compute_dashboard_summary(today, today_indonesia):
+    """
+    Ringkasan dashboard untuk tanggal `today` (date).
+    Return dict berisi semua key `stats` ditambah room_stats,
+    today_doctors_spec dan today_tests_status untuk chart.
+    """
+    today_str = today.strftime('%Y-%m-%d')
+    jobs = [
+        (_doctor_summary, (today_indonesia,)),
+        (_room_summary, ()),
+        (_patient_summary, ()),
+        (_today_patient_summary, (today_str,)),
+        (_pharmacy_summary, ()),
+        (_lab_summary, (today_str,)),
+        (_staff_summary, ()),
+        (_finance_summary, (today_str,)),
+    ]
+    futures = [(fn, run_in_context(_executor, fn, *args)) for fn, args in jobs]
+
+    summary = {}
+    for fn, future in futures:
+        try:
+            summary.update(future.result())
+        except Exception as e:
+            print(f"[ERROR] Dashboard summary {fn.__name__}: {e}")
+            summary.update(_FALLBACKS[fn])
+            table_cache.dont_cache()
+    return summary
+
+
+# ------------------------------
+# TAB OVERVIEW
+# ------------------------------
+# Angka global dan isi dropdown untuk tab yang datanya sudah difilter di SQL,
+# sehingga tab tidak perlu memuat tabel penuh hanya untuk menghitung total.
+
+@table_cache.cached('lab_tests')
+def lab_overview():
+    try:
+        rows = run_query(
+            "SELECT test_type, result_status, COUNT(*) AS count "
+            "FROM lab_tests GROUP BY test_type, result_status"
+        )
+    except Exception as e:
+        print(f"[ERROR] Gagal load ringkasan lab: {e}")
+        table_cache.dont_cache()
+        rows = []
+    counts = [(r['test_type'], LAB_STATUS.canonical(r['result_status']) or r['result_status'], _num(r['count']))
+              for r in rows]
+    test_types = sorted({t for t, _, _ in counts if t is not None})
+    return {
+        'total_lab_tests': sum(c for _, _, c in counts),
+        'pending_tests': sum(c for _, s, c in counts if s == 'Pending'),
+        'completed_tests': sum(c for _, s, c in counts if s == 'Completed'),
+        'lab_test_types_count': len(test_types),
+        'test_types': test_types,
+        'result_statuses': sorted({s for _, s, _ in counts if s is not None}),
+    }
+
+
+@table_cache.cached('staff')
+def staff_overview():
+    try:
+        rows = run_query(
+            "SELECT role, department, active, COUNT(*) AS count "
+            "FROM staff GROUP BY role, department, active"
+        )
+    except Exception as e:
+        print(f"[ERROR] Gagal load ringkasan staff: {e}")
+        table_cache.dont_cache()
+        rows = []
+    counts = [(r['role'], r['department'], STAFF_ACTIVE.canonical(r['active']), _num(r['count'])) for r in rows]
+    total_staff = sum(c for _, _, _, c in counts)
+    active_staff = sum(c for _, _, a, c in counts if a == 'True')
+    departments = sorted({d for _, d, _, _ in counts if d is not None})
+    return {
+        'total_staff': total_staff,
+        'active_staff': active_staff,
+        'inactive_staff': total_staff - active_staff,
+        'staff_departments_count': len(departments),
+        'roles': sorted({r for r, _, _, _ in counts if r is not None}),
+        'departments': departments,
+    }
+
+
+@table_cache.cached('finance')
+def finance_overview():
+    try:
+        rows = run_query(
+            "SELECT entry_type, service_type, payment_type, COUNT(*) AS count "
+            "FROM finance GROUP BY entry_type, service_type, payment_type"
+        )
+    except Exception as e:
+        print(f"[ERROR] Gagal load ringkasan finance: {e}")
+        table_cache.dont_cache()
+        rows = []
+    return {
+        'entry_types': sorted({r['entry_type'] for r in rows if r['entry_type'] is not None}),
+        'service_types': sorted({r['service_type'] for r in rows if r['service_type'] is not None}),
+        'payment_types': sorted({r['payment_type'] for r in rows if r['payment_type'] is not None}),
+    }
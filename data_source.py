@@ -0,0 +1,154 @@
+import os
+
+import pandas as pd
+
+from db_pool import get_pool
+from delta_loader import INCREMENTAL_LOAD, delta_tables
+from embedded_db import get_database
+from instrumentation import phase, frame_bytes
+from query_builder import build_select, build_delta_select, build_key_select, apply_filters
+from schema import apply_dtypes
+from normalize import normalize_frame
+from snapshot import read_snapshot, iter_snapshot_batches
+
+# ------------------------------
+# SUMBER DATA TABEL
+# ------------------------------
+# Loader dan export membaca tabel lewat modul ini, sehingga sumbernya bisa
+# diganti tanpa menyentuh route:
+#   DATA_SOURCE=mysql     (default) query ke MySQL dengan filter di WHERE
+#   DATA_SOURCE=snapshot  baca snapshot Arrow di SNAPSHOT_DIR (lihat snapshot.py),
+#                         filter diterapkan di DataFrame dengan semantik yang sama
+#   DATA_SOURCE=embedded  SQLite/DuckDB in-process yang dimuat dari snapshot/CSV
+#                         (lihat embedded_db.py), query sama dengan MySQL
+# Query agregat (dashboard, overview tab) memakai get_connection(): MySQL untuk
+# mysql, database embedded untuk embedded dan snapshot.
+# Untuk mysql/embedded, load tanpa filter tabel di query_builder.DELTA_COLUMNS
+# hanya mengambil baris yang berubah (lihat delta_loader.py, INCREMENTAL_LOAD=0
+# untuk mematikan).
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'mysql')
+
+
+def use_snapshot():
+    return DATA_SOURCE == 'snapshot'
+
+
+def use_embedded():
+    return DATA_SOURCE == 'embedded'
+
+
+def get_connection():
+    """Koneksi DB-API untuk query SQL bergaya MySQL (%s); conn.close() wajib dipanggil"""
+    if DATA_SOURCE == 'mysql':
+        return get_pool().connection()
+    return get_database().connection()
+
+
+def connection_stats():
+    """Statistik pool MySQL atau database embedded, sesuai DATA_SOURCE"""
+    if DATA_SOURCE == 'mysql':
+        return get_pool().stats()
+    return get_database().stats()
+
+
+def _join_patient_names(df):
+    # Padanan LEFT JOIN patients di BASE_QUERIES['lab_tests']
+    names = read_snapshot('patients', columns=['patient_id', 'name'])
+    names = names.rename(columns={'name': 'patient_name'}).drop_duplicates('patient_id')
+    return df.merge(names, on='patient_id', how='left')
+
+
+def _from_snapshot(table, df, filters):
+    if table == 'lab_tests':
+        df = _join_patient_names(df)
+    return apply_filters(df, table, filters).reset_index(drop=True)
+
+
+def _read_sql(table, query, params):
+    with phase('db') as info:
+        if use_embedded():
+            df = get_database().read_frame(query, params)
+        else:
+            conn = get_pool().connection()
+            try:
+                df = pd.read_sql(query, conn, params=params)
+            finally:
+                conn.close()
+        df = normalize_frame(apply_dtypes(df, table), table)
+        info['rows'], info['bytes'] = len(df), frame_bytes(df)
+    return df
+
+
+def use_delta(table, filters=()):
+    return INCREMENTAL_LOAD and not use_snapshot() and not filters and table in delta_tables
+
+
+def read_table(table, filters=()):
+    """
+    Baca seluruh baris `table` yang lolos `filters` (lihat query_builder.filter_args),
+    dengan dtype ringkas dari schema.apply_dtypes (category, str, datetime64) dan
+    kolom status/hari/boolean yang sudah kanonik (normalize.normalize_frame).
+    """
+    if use_delta(table, filters):
+        return delta_tables[table].read(
+            lambda: _read_sql(table, *build_select(table)),
+            lambda marks: _read_sql(table, *build_delta_select(table, marks)),
+        )
+    if not use_snapshot():
+        return _read_sql(table, *build_select(table, filters))
+
+    with phase('db') as info:
+        df = normalize_frame(apply_dtypes(_from_snapshot(table, read_snapshot(table), filters), table), table)
+        info['rows'], info['bytes'] = len(df), frame_bytes(df)
+    return df
+
+
+def refresh_rows(table, keys):
+    """
+    Ambil ulang baris `keys` (primary key) yang baru ditulis proses ini dan upsert
+    ke frame delta `table`, untuk perubahan yang tidak terlihat dari kolom tanggal
+    delta. Load berikutnya tetap delta, bukan penuh. Return jumlah baris.
+    """
+    if not keys or not use_delta(table):
+        return 0
+    delta = delta_tables[table]
+    return delta.upsert(lambda: _read_sql(table, *build_key_select(table, delta.key, keys)))
+
+
+def reconcile_table(table=None):
+    """Load berikutnya `table` (None = semua tabel delta) diambil penuh"""
+    for name, delta in delta_tables.items():
+        if table is None or name == table:
+            delta.reset()
+
+
+def delta_stats():
+    return {
+        'enabled': INCREMENTAL_LOAD and not use_snapshot(),
+        'tables': {table: delta.stats() for table, delta in delta_tables.items()},
+    }
+
+
+def open_table_chunks(table, filters=(), chunksize=5000):
+    """
+    Iterator DataFrame per chunk untuk export streaming.
+    Koneksi diambil saat fungsi ini dipanggil (bukan saat iterasi pertama),
+    jadi error pool/DB masih bisa dilaporkan sebelum response dimulai.
+    Panggil .close() pada iterator kalau berhenti sebelum habis.
+    """
+    if use_snapshot():
+        batches = iter_snapshot_batches(table)
+        return (_from_snapshot(table, batch, filters) for batch in batches)
+    if use_embedded():
+        return get_database().iter_frames(*build_select(table, filters), chunksize=chunksize)
+
+    query, params = build_select(table, filters)
+    conn = get_pool().connection()
+
+    def generate():
+        try:
+            yield from pd.read_sql(query, conn, params=params, chunksize=chunksize)
+        finally:
+            conn.close()
+
+    return generate()
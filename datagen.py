@@ -0,0 +1,267 @@
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import TABLES, apply_dtypes, csv_path, read_csv_chunks
+
+# ------------------------------
+# GENERATOR DATA SINTETIS
+# ------------------------------
+# Memperbesar CSV bawaan `scale` kali dengan skema dan distribusi yang sama:
+#   - tabel induk (patients, staff, rooms) disalin utuh per "clone" k, ID baru
+#     = nomor ID asli + k * nomor maksimum, nama depan diacak ulang, tanggal
+#     digeser acak; clone 0 = data asli (ID dilebarkan kalau perlu digit lebih)
+#   - tabel lain di-bootstrap per baris (sampling dengan pengembalian), jadi
+#     distribusi gabungan payment_type/service_type/test_type/status/... tetap;
+#     ID baru berurutan, foreign key diarahkan ke clone induk yang acak
+#   - semua kolom tanggal dalam satu baris digeser dengan offset yang sama
+#     (result_date tetap >= scheduled_date), dibatasi rentang tanggal asli
+#   - patient_trends (satu baris per hari) diperpanjang ke depan, maksimal
+#     sampai TREND_MAX_DATE
+# Output ditulis per blok (~BLOCK_ROWS baris) sehingga memori tetap kecil
+# walaupun 1000x.
+#
+#   python datagen.py --scale 100 --out data_x100
+#   python datagen.py --scale 10 --out data_x10 patients finance
+
+BLOCK_ROWS = 200000
+DATE_JITTER_DAYS = 30
+FLOAT_NOISE = 0.15
+TREND_MAX_DATE = '2199-12-31'
+
+PARENT_TABLES = ['patients', 'staff', 'rooms']
+FOREIGN_KEYS = {
+    'doctor_schedule': {'doctor_id': 'staff', 'room_id': 'rooms'},
+    'finance': {'patient_id': 'patients'},
+    'lab_tests': {'patient_id': 'patients', 'lab_staff_id': 'staff'},
+    'registrations': {'patient_id': 'patients'},
+}
+# Nama yang diacak ulang per entitas; doctor_schedule memakai kunci doctor_id
+NAME_COLUMNS = {'patients': 'patient_id', 'staff': 'staff_id', 'doctor_schedule': 'doctor_id'}
+
+_ID_PATTERN = re.compile(r'^(\D*)(\d+)$')
+
+
+def load_table(table, source_dir='.'):
+    df = pd.concat(read_csv_chunks(table, csv_path(table, source_dir)), ignore_index=True)
+    return apply_dtypes(df, table)
+
+
+def id_format(values):
+    """'P00521' -> ('P', 5, 521 = nomor maksimum)"""
+    parsed = values.dropna().astype(str).str.extract(_ID_PATTERN.pattern)
+    prefix = parsed[0].mode().iat[0] if not parsed.empty else ''
+    numbers = pd.to_numeric(parsed[1])
+    return prefix, int(parsed[1].str.len().max()), int(numbers.max())
+
+
+def format_ids(prefix, width, numbers):
+    return (prefix + pd.Series(numbers, dtype=object).astype(str).str.zfill(width)).to_numpy(dtype=object)
+
+
+def id_numbers(values):
+    """Nomor ID sebagai float (NaN untuk nilai kosong)"""
+    return pd.to_numeric(values.astype(str).str.extract(_ID_PATTERN.pattern)[1]).to_numpy(dtype=float)
+
+
+class Generator:
+    def __init__(self, scale, source_dir='.', seed=0):
+        self.scale = scale
+        self.source_dir = source_dir
+        self.rng = np.random.default_rng(seed)
+        self.sources = {}
+        self.parent_ids = {}  # tabel induk -> (prefix, width, nomor maksimum)
+        self.numbers = {}  # (tabel, kolom) -> nomor ID per baris sumber
+        self.given_names = self._given_names()
+
+    def source(self, table):
+        if table not in self.sources:
+            self.sources[table] = load_table(table, self.source_dir)
+        return self.sources[table]
+
+    def _given_names(self):
+        # Nama depan (kata pertama yang bukan gelar) dari pasien dan staff
+        names = pd.concat([self.source('patients')['name'].astype(str), self.source('staff')['name'].astype(str)])
+        words = names.str.extract(r'(?:^|\s)([A-Z][a-z]+)(?:\s|$)')[0].dropna()
+        return words.unique()
+
+    def _numbers(self, table, column):
+        # Parsing regex cukup sekali per kolom sumber; blok mengambil lewat indeks baris
+        if (table, column) not in self.numbers:
+            self.numbers[(table, column)] = id_numbers(self.source(table)[column])
+        return self.numbers[(table, column)]
+
+    def _parent_format(self, table):
+        if table not in self.parent_ids:
+            prefix, width, max_number = id_format(self.source(table)[TABLES[table]['primary_key']])
+            width = max(width, len(str(max_number * self.scale)))
+            self.parent_ids[table] = (prefix, width, max_number)
+        return self.parent_ids[table]
+
+    # ---- transformasi per blok ----
+
+    def _rename(self, names, numbers, max_number):
+        """Ganti nama depan untuk entitas clone (nomor ID > max_number); ID sama -> nama sama"""
+        names = names.astype(str).to_numpy(dtype=object)
+        changed = numbers > max_number
+        if not changed.any():
+            return names
+        # Deterministik per nomor ID: hash nomor -> indeks nama depan
+        picks = pd.util.hash_array(numbers[changed].astype(np.int64)) % len(self.given_names)
+        given = self.given_names[picks.astype(np.int64)]
+        pattern = re.compile(r'(^|\s)[A-Z][a-z]+(?=\s|$)')
+        names[changed] = [pattern.sub(lambda m, g=g: m.group(1) + g, name, count=1)
+                          for name, g in zip(names[changed], given)]
+        return names
+
+    def _shift_dates(self, df, table, clone):
+        dates = [col for col, kind in TABLES[table]['columns'].items() if kind == 'date']
+        if not dates:
+            return
+        source = self.source(table)
+        # Tanggal lahir digeser sampai ~3 tahun, tanggal transaksi DATE_JITTER_DAYS
+        jitter = 365 * 3 if table == 'patients' else DATE_JITTER_DAYS
+        offset = self.rng.integers(-jitter, jitter + 1, len(df)) * (clone > 0)
+        # Offset (hari) tidak boleh membawa tanggal keluar rentang asli tabel
+        low = min(source[col].min() for col in dates)
+        high = max(source[col].max() for col in dates)
+        earliest = (df[dates].min(axis=1) - low).dt.days.fillna(0).to_numpy()
+        latest = (high - df[dates].max(axis=1)).dt.days.fillna(0).to_numpy()
+        # Dipantulkan dulu (supaya tidak menumpuk di batas), baru di-clip
+        offset = np.where((offset < -earliest) | (offset > latest), -offset, offset)
+        offset = np.clip(offset, -earliest, latest)
+        for col in dates:
+            df[col] = df[col] + pd.to_timedelta(offset, unit='D')
+
+    def _noise(self, df, table, clone):
+        for col, kind in TABLES[table]['columns'].items():
+            if kind == 'float' and col in df.columns:
+                factor = np.where(clone > 0, self.rng.uniform(1 - FLOAT_NOISE, 1 + FLOAT_NOISE, len(df)), 1.0)
+                df[col] = (df[col] * factor).round(2)
+
+    def _remap_foreign_keys(self, df, table, rows, clone):
+        """Foreign key diarahkan ke clone induk acak; return {kolom: nomor ID baru}"""
+        remapped = {}
+        for col, parent in FOREIGN_KEYS.get(table, {}).items():
+            prefix, width, max_number = self._parent_format(parent)
+            parent_clone = np.where(clone > 0, self.rng.integers(0, self.scale, len(df)), 0)
+            numbers = self._numbers(table, col)[rows] + parent_clone * max_number
+            valid = ~np.isnan(numbers)
+            new = np.full(len(df), None, dtype=object)
+            new[valid] = format_ids(prefix, width, numbers[valid].astype(np.int64))
+            df[col] = new
+            remapped[col] = numbers
+        return remapped
+
+    # ---- tabel ----
+
+    def blocks(self, table):
+        """Yield DataFrame per blok untuk `table`, total len(source) * scale baris"""
+        source = self.source(table)
+        n = len(source)
+        key = TABLES[table]['primary_key']
+        clones_per_block = max(1, BLOCK_ROWS // max(n, 1))
+
+        if table == 'patient_trends':
+            yield from self._trend_blocks(source, clones_per_block)
+            return
+
+        prefix, width, max_number = id_format(source[key])
+        if table in PARENT_TABLES:
+            prefix, width, max_number = self._parent_format(table)
+        else:
+            width = max(width, len(str(n * self.scale)))
+
+        for first in range(0, self.scale, clones_per_block):
+            clones = np.arange(first, min(first + clones_per_block, self.scale))
+            clone = np.repeat(clones, n)
+            if table in PARENT_TABLES:
+                rows = np.tile(np.arange(n), len(clones))
+            else:
+                # Clone 0 = data asli, clone lain bootstrap per baris
+                rows = np.where(clone == 0, np.tile(np.arange(n), len(clones)), self.rng.integers(0, n, len(clone)))
+            df = source.iloc[rows].reset_index(drop=True)
+
+            if table in PARENT_TABLES:
+                numbers = self._numbers(table, key)[rows] + clone * max_number
+                df[key] = format_ids(prefix, width, numbers.astype(np.int64))
+            else:
+                df[key] = np.where(
+                    clone == 0, df[key].astype(str).to_numpy(),
+                    format_ids(prefix, width, np.arange(first * n, first * n + len(df)) + 1),
+                )
+            remapped = self._remap_foreign_keys(df, table, rows, clone)
+            if table in NAME_COLUMNS:
+                column = NAME_COLUMNS[table]
+                if column in remapped:
+                    numbers = remapped[column]
+                df['name'] = self._rename(df['name'], numbers, np.nanmax(self._numbers(table, column)))
+            self._shift_dates(df, table, clone)
+            self._noise(df, table, clone)
+            yield df
+
+    def _trend_blocks(self, source, clones_per_block):
+        source = source.sort_values('date').reset_index(drop=True)
+        n = len(source)
+        # datetime64[ns] berhenti di tahun 2262; seri dipotong di TREND_MAX_DATE
+        scale = min(self.scale, (pd.Timestamp(TREND_MAX_DATE) - source['date'].min()).days // n)
+        for first in range(0, scale, clones_per_block):
+            clones = np.arange(first, min(first + clones_per_block, scale))
+            clone = np.repeat(clones, n)
+            df = source.iloc[np.tile(np.arange(n), len(clones))].reset_index(drop=True)
+            # Seri diperpanjang: clone k mulai setelah clone k-1 berakhir
+            df['date'] = df['date'] + pd.to_timedelta(clone * n, unit='D')
+            factor = np.where(clone > 0, self.rng.normal(1.0, 0.08, len(df)), 1.0)
+            df['total_patients'] = (df['total_patients'] * factor).round().astype('Int64')
+            df['population_density'] = (df['population_density'] * np.where(clone > 0, 1 + clone * 0.001, 1.0)).round(2)
+            yield df
+
+
+def write_csv(blocks, path, table):
+    dates = [col for col, kind in TABLES[table]['columns'].items() if kind == 'date']
+    rows = 0
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='') as fh:
+        for i, df in enumerate(blocks):
+            df = df[list(TABLES[table]['columns'])].copy()
+            for col in dates:
+                df[col] = df[col].dt.strftime('%Y-%m-%d')
+            df.to_csv(fh, header=(i == 0), index=False)
+            rows += len(df)
+    os.replace(tmp, path)
+    return rows
+
+
+def generate(scale, out_dir, tables=None, source_dir='.', seed=0):
+    """Tulis CSV `scale` kali lipat ke `out_dir`; return {tabel: jumlah baris}"""
+    os.makedirs(out_dir, exist_ok=True)
+    generator = Generator(scale, source_dir, seed)
+    counts = {}
+    for table in tables or list(TABLES):
+        start = time.perf_counter()
+        counts[table] = write_csv(generator.blocks(table), csv_path(table, out_dir), table)
+        print(f"{table}: {counts[table]} baris ({time.perf_counter() - start:.1f}s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate data sintetis N kali CSV bawaan")
+    parser.add_argument('tables', nargs='*', help="tabel yang dibuat (default: semua)")
+    parser.add_argument('--scale', type=int, default=10, help="kelipatan jumlah baris (10-1000)")
+    parser.add_argument('--out', default=None, help="folder output (default: data_x<scale>)")
+    parser.add_argument('--source', default='.', help="folder CSV bawaan")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    unknown = [t for t in args.tables if t not in TABLES]
+    if unknown:
+        parser.error(f"tabel tidak dikenal: {unknown}")
+    generate(args.scale, args.out or f"data_x{args.scale}", args.tables or None, args.source, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+# ------------------------------
+# KONFIGURASI DATABASE
+# ------------------------------
+# Semua nilai bisa di-override lewat environment variable,
+# default-nya sama dengan koneksi lama (localhost/hospital).
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', 3306)),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', ''),
+    'database': os.environ.get('DB_NAME', 'hospital'),
+}
+
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))     # detik menunggu koneksi kosong
+POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', 1800))   # umur maksimum koneksi (detik)
+POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'  # health check sebelum dipakai
+
+
+class PoolTimeout(Exception):
+    """Tidak ada koneksi yang bebas dalam batas waktu checkout"""
+
+
+class PooledConnection:
+    """
+    Proxy tipis di atas koneksi asli. close() tidak menutup koneksi,
+    tapi mengembalikannya ke pool supaya kode lama (conn.close()) tetap jalan.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, self._created_at)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._raw is None:
+            raise AttributeError(f"Koneksi sudah dikembalikan ke pool ({name})")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Jaga-jaga kalau caller lupa close() (misal exception sebelum conn.close())
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, pre_ping=POOL_PRE_PING):
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # (raw_conn, created_at)
+        self._open = 0        # jumlah koneksi yang sedang hidup (idle + dipakai)
+        self._cond = threading.Condition()
+
+        self._metrics = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def connection(self):
+        """Ambil koneksi dari pool, tunggu maksimal `timeout` detik"""
+        start = time.perf_counter()
+        deadline = start + self.timeout
+
+        while True:
+            raw, created_at = self._checkout(deadline)
+            if raw is None:
+                raw, created_at = self._create()
+            elif not self._is_healthy(raw, created_at):
+                self._discard(raw)
+                continue
+
+            waited = time.perf_counter() - start
+            with self._cond:
+                self._metrics['checkouts'] += 1
+                self._metrics['wait_time_total'] += waited
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+            return PooledConnection(self, raw, created_at)
+
+    def _checkout(self, deadline):
+        # Return (raw, created_at) dari idle list, atau (None, None) kalau boleh membuat koneksi baru
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1  # reservasi slot, koneksi dibuat di luar lock
+                    return None, None
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"Tidak ada koneksi bebas setelah {self.timeout}s (pool size {self.size})"
+                    )
+                self._cond.wait(remaining)
+
+    def _create(self):
+        try:
+            raw = self._factory()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics['created'] += 1
+        return raw, time.monotonic()
+
+    def _is_healthy(self, raw, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._metrics['recycled'] += 1
+            return False
+        if self.pre_ping:
+            try:
+                if not raw.is_connected():
+                    raise ConnectionError("ping gagal")
+            except Exception:
+                with self._cond:
+                    self._metrics['failed_health_checks'] += 1
+                return False
+        return True
+
+    def _release(self, raw, created_at):
+        try:
+            # Akhiri transaksi baca supaya query berikutnya tidak melihat snapshot lama
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, created_at))
+            self._cond.notify()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def dispose(self):
+        """Tutup semua koneksi idle (dipakai saat shutdown / ganti konfigurasi)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._metrics)
+            stats['size'] = self.size
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool global, dibuat saat pertama kali dipakai"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(lambda: mysql.connector.connect(**DB_CONFIG))
+    return _pool
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import weakref
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, union_categoricals
+
+from query_builder import DELTA_COLUMNS, _frame_column
+from schema import TABLES
+
+# ------------------------------
+# LOAD INCREMENTAL (DELTA) PER TABEL
+# ------------------------------
+# Tabel di DELTA_COLUMNS (rooms, finance, lab_tests, pharmacy_stock) tidak
+# di-SELECT penuh setiap cache habis. Frame lengkap terakhir disimpan di sini
+# bersama high-water mark per kolom tanggal; load berikutnya hanya mengambil
+# baris dengan kolom tanggal >= mark, lalu baris itu di-upsert ke frame lama
+# berdasarkan primary key (baris yang ada diganti di posisinya, baris baru
+# ditambahkan di belakang).
+#
+# Mark = min(nilai maksimum kolom, hari ini): baris bertanggal masa depan
+# (jadwal lab minggu depan) tidak membuat baris hari ini terlewat. Kolom
+# bertipe DATE jadi baris hari mark ikut terambil ulang; upsert membuatnya
+# idempoten.
+#
+# Yang tidak terlihat dari kolom tanggal (baris dihapus, edit tanpa mengubah
+# tanggal, insert bertanggal mundur, nama pasien hasil JOIN berubah) dibereskan
+# oleh reconcile penuh setiap DELTA_RECONCILE_SECONDS, atau lewat
+# POST /api/cache/invalidate?table=...&reconcile=1.
+#
+# Hanya untuk sumber database (mysql/embedded) dan load tanpa filter; snapshot
+# tidak berubah selama proses berjalan.
+#
+# Setiap perubahan frame menaikkan versi dan mencatat posisi baris yang diganti;
+# changes(old, new) memberi index turunan (incremental.py) baris yang berbeda
+# antara dua frame hasil read() tanpa membandingkan seluruh isi frame.
+
+INCREMENTAL_LOAD = os.environ.get('INCREMENTAL_LOAD', '1') == '1'
+DELTA_RECONCILE_SECONDS = float(os.environ.get('DELTA_RECONCILE_SECONDS', 900))
+MAX_CHANGES = 64  # versi yang masih bisa ditelusuri changes()
+
+
+def _concat(frame, delta):
+    """concat yang mempertahankan kolom category (union kategori, tetap terurut)"""
+    columns = {}
+    for col in frame.columns:
+        old = frame[col]
+        new = delta[col] if col in delta.columns else pd.Series(None, index=delta.index, dtype=old.dtype)
+        if isinstance(old.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(union_categoricals([old, new], sort_categories=True, ignore_order=True))
+        else:
+            columns[col] = pd.concat([old, new], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def changed_rows(frame, delta, key, keys=None):
+    """
+    Baris `delta` yang key-nya baru atau isinya berbeda dari baris `frame` dengan
+    key yang sama (baris hari mark selalu terambil ulang, biasanya tanpa perubahan).
+    `keys` = pd.Index(frame[key]) kalau sudah ada.
+    """
+    delta = delta.drop_duplicates(key, keep='last')
+    keys = pd.Index(frame[key]) if keys is None else keys
+    positions = keys.get_indexer(delta[key])
+    existing = positions >= 0
+    if not existing.any():
+        return delta
+    columns = [col for col in delta.columns if col in frame.columns]
+    old = pd.util.hash_pandas_object(frame.iloc[positions[existing]][columns], index=False).to_numpy()
+    new = pd.util.hash_pandas_object(delta[columns][existing], index=False).to_numpy()
+    same = np.zeros(len(delta), dtype=bool)
+    same[existing] = old == new
+    return delta[~same]
+
+
+def merge_delta(frame, delta, key, keys=None):
+    """
+    Upsert `delta` ke `frame` berdasarkan kolom `key`: baris dengan key yang
+    sama diganti di posisinya, key baru ditambahkan di belakang.
+    Return (frame baru, posisi baris `frame` yang diganti).
+    """
+    delta = delta.drop_duplicates(key, keep='last')
+    keys = pd.Index(frame[key]) if keys is None else keys
+    positions = keys.get_indexer(delta[key])
+    updated = positions >= 0
+
+    take = np.arange(len(frame))
+    take[positions[updated]] = len(frame) + np.flatnonzero(updated)
+    take = np.concatenate([take, len(frame) + np.flatnonzero(~updated)])
+    return _concat(frame, delta).take(take).reset_index(drop=True), positions[updated]
+
+
+class DeltaTable:
+    def __init__(self, table, reconcile_seconds=DELTA_RECONCILE_SECONDS):
+        self.table = table
+        self.key = TABLES[table]['primary_key']
+        self.columns = [_frame_column(col) for col in DELTA_COLUMNS[table]]
+        self.reconcile_seconds = reconcile_seconds
+        self._frame = None
+        self._keys = None      # pd.Index primary key _frame, dibangun saat dibutuhkan
+        self._marks = None
+        self._full_at = 0.0
+        self._version = 0
+        self._epoch = 0        # versi load penuh terakhir
+        self._changes = []     # [(versi, posisi diganti)] sejak load penuh terakhir
+        self._outputs = {}     # id(frame hasil read) -> (weakref, versi)
+        self._lock = threading.Lock()
+        self._stats = {'full_loads': 0, 'delta_loads': 0, 'delta_rows': 0, 'updated_rows': 0,
+                       'appended_rows': 0}
+
+    def _high_water(self, frame):
+        """Mark per kolom; None kalau ada kolom tanpa nilai (load berikutnya penuh)"""
+        today = pd.Timestamp(date.today())
+        marks = []
+        for col in self.columns:
+            if col not in frame.columns:
+                return None
+            values = frame[col]
+            latest = (values if is_datetime64_any_dtype(values) else pd.to_datetime(values, errors='coerce')).max()
+            if pd.isna(latest):
+                return None
+            marks.append(min(latest, today).strftime('%Y-%m-%d'))
+        return marks
+
+    def _key_index(self):
+        if self._keys is None:
+            self._keys = pd.Index(self._frame[self.key])
+        return self._keys
+
+    def _needs_full(self):
+        return (self._frame is None or self._marks is None
+                or time.monotonic() - self._full_at >= self.reconcile_seconds
+                or not self._key_index().is_unique)
+
+    def _merge(self, delta):
+        """Upsert baris `delta` yang berubah ke frame tersimpan dan catat versinya (di bawah lock)"""
+        delta = changed_rows(self._frame, delta, self.key, self._key_index())
+        if not len(delta):
+            return
+        frame, replaced = merge_delta(self._frame, delta, self.key, self._key_index())
+        self._version += 1
+        self._changes = self._changes[-(MAX_CHANGES - 1):] + [(self._version, replaced)]
+        self._stats['updated_rows'] += len(replaced)
+        self._stats['appended_rows'] += len(frame) - len(self._frame)
+        self._frame, self._keys = frame, None
+
+    def read(self, fetch_full, fetch_delta):
+        """
+        Frame lengkap tabel: penuh lewat fetch_full() saat pertama/reconcile,
+        selain itu frame lama + fetch_delta(marks). Hasilnya salinan dangkal,
+        jadi loader boleh mengubah kolom tanpa menyentuh frame yang disimpan.
+        """
+        with self._lock:
+            if self._needs_full():
+                self._frame, self._keys = fetch_full(), None
+                self._version += 1
+                self._epoch, self._changes = self._version, []
+                self._full_at = time.monotonic()
+                self._stats['full_loads'] += 1
+            else:
+                delta = fetch_delta(self._marks)
+                if len(delta):
+                    self._merge(delta)
+                self._stats['delta_loads'] += 1
+                self._stats['delta_rows'] += len(delta)
+            self._marks = self._high_water(self._frame)
+            out = self._frame.copy(deep=False)
+            key = id(out)
+            self._outputs[key] = (weakref.ref(out, lambda _, key=key: self._outputs.pop(key, None)), self._version)
+            return out
+
+    def upsert(self, fetch_rows):
+        """
+        Upsert baris hasil fetch_rows() (baris lengkap, mis. SELECT per primary
+        key setelah UPDATE) ke frame tersimpan, tanpa load ulang. Tidak apa-apa
+        kalau belum ada frame: load berikutnya memang penuh.
+        """
+        with self._lock:
+            if self._frame is None:
+                return 0
+            rows = fetch_rows()
+            if len(rows):
+                self._merge(rows)
+                self._marks = self._high_water(self._frame)
+            return len(rows)
+
+    def _version_of(self, frame):
+        entry = self._outputs.get(id(frame))
+        return entry[1] if entry is not None and entry[0]() is frame else None
+
+    def changes(self, old, new):
+        """
+        Baris yang berbeda antara frame `old` dan `new` (keduanya hasil read()):
+        (posisi di `old` yang diganti, posisi baru di belakang `new`). None kalau
+        tidak bisa ditelusuri: ada load penuh di antaranya, log sudah terpotong,
+        atau frame bukan hasil read().
+        """
+        with self._lock:
+            start, end = self._version_of(old), self._version_of(new)
+            if start is None or end is None or start < self._epoch or end < start:
+                return None
+            steps = [replaced for version, replaced in self._changes if start < version <= end]
+            if len(steps) != end - start:
+                return None
+        replaced = np.unique(np.concatenate([np.array([], dtype=np.intp)] + steps))
+        # Posisi >= len(old) adalah baris yang baru ditambahkan di versi tengah
+        return replaced[replaced < len(old)], np.arange(len(old), len(new))
+
+    def reset(self):
+        """Load berikutnya penuh (reconcile)"""
+        with self._lock:
+            self._frame, self._keys, self._marks = None, None, None
+
+    def stats(self):
+        age = time.monotonic() - self._full_at if self._frame is not None else None
+        return {
+            **self._stats,
+            'rows': len(self._frame) if self._frame is not None else 0,
+            'version': self._version,
+            'high_water': dict(zip(self.columns, self._marks)) if self._marks else None,
+            'seconds_since_full': round(age, 1) if age is not None else None,
+            'reconcile_seconds': self.reconcile_seconds,
+        }
+
+
+delta_tables = {table: DeltaTable(table) for table in DELTA_COLUMNS}
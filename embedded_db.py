@@ -0,0 +1,359 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+from query_builder import INDEXES
+from schema import TABLES, csv_path, read_csv_chunks
+from snapshot import SNAPSHOT_DIR, has_snapshot, iter_snapshot_batches
+
+try:
+    import duckdb
+except ImportError:  # SQLite (stdlib) sebagai engine default
+    duckdb = None
+
+# ------------------------------
+# DATABASE EMBEDDED (SQLITE / DUCKDB)
+# ------------------------------
+# Pengganti MySQL untuk dev, CI dan klinik kecil: tabel dimuat dari snapshot
+# Arrow (kalau ada di SNAPSHOT_DIR) atau langsung dari CSV, lalu query yang
+# sama dengan MySQL (loader, agregat dashboard, overview tab) dijalankan di
+# engine embedded. Dipakai saat DATA_SOURCE=embedded, dan untuk query agregat
+# saat DATA_SOURCE=snapshot.
+#   EMBEDDED_ENGINE  auto (duckdb kalau ter-install, selain itu sqlite) | duckdb | sqlite
+#   EMBEDDED_DB      file database; kosong = in-memory, dimuat saat pertama dipakai.
+#                    File yang sudah berisi semua tabel dipakai ulang tanpa load.
+#   EMBEDDED_SOURCE  folder CSV (default folder kerja)
+# SQL ditulis bergaya MySQL (placeholder %s); Dialect menerjemahkan placeholder,
+# LIKE (DuckDB case-sensitive -> ILIKE) dan parameter tanggal.
+#
+#   python embedded_db.py --db hospital.duckdb     # bangun file database sekali
+
+EMBEDDED_ENGINE = os.environ.get('EMBEDDED_ENGINE', 'auto')
+EMBEDDED_DB = os.environ.get('EMBEDDED_DB', '')
+EMBEDDED_SOURCE = os.environ.get('EMBEDDED_SOURCE', '.')
+
+SQL_TYPES = {
+    'sqlite': {'string': 'TEXT', 'category': 'TEXT', 'time': 'TEXT',
+               'int': 'INTEGER', 'float': 'REAL', 'date': 'TEXT'},
+    'duckdb': {'string': 'VARCHAR', 'category': 'VARCHAR', 'time': 'VARCHAR',
+               'int': 'BIGINT', 'float': 'DOUBLE', 'date': 'DATE'},
+}
+
+_PLACEHOLDER = re.compile(r'%s')
+_LIKE = re.compile(r'\bLIKE\b')
+_DML = re.compile(r'\s*(UPDATE|INSERT|DELETE)\b', re.IGNORECASE)
+
+
+class Dialect:
+    """Terjemahan SQL bergaya MySQL ke engine embedded"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._translated = {}
+
+    def translate(self, sql):
+        if sql not in self._translated:
+            translated = _PLACEHOLDER.sub('?', sql)
+            if self.engine == 'duckdb':
+                # LIKE di MySQL (collation *_ci) tidak membedakan huruf besar/kecil
+                translated = _LIKE.sub('ILIKE', translated)
+            self._translated[sql] = translated
+        return self._translated[sql]
+
+    def params(self, params):
+        if self.engine == 'sqlite':
+            # Tanggal disimpan sebagai teks 'YYYY-MM-DD' di SQLite
+            return [value.strftime('%Y-%m-%d') if isinstance(value, (date, datetime)) else value
+                    for value in params or ()]
+        return list(params or ())
+
+
+class EmbeddedCursor:
+    def __init__(self, raw, dialect, shared=False):
+        self._raw = raw
+        self._dialect = dialect
+        self._shared = shared   # cursor DuckDB = koneksinya sendiri, ditutup oleh connection
+        self.rowcount = -1
+
+    def execute(self, sql, params=()):
+        self._raw.execute(self._dialect.translate(sql), self._dialect.params(params))
+        # DuckDB tidak mengisi rowcount; jumlah baris DML dikembalikan sebagai hasil query
+        if self._dialect.engine == 'duckdb' and _DML.match(sql):
+            self.rowcount = self._raw.fetchone()[0]
+        else:
+            self.rowcount = getattr(self._raw, 'rowcount', -1)
+        return self
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchmany(self, size=1):
+        return self._raw.fetchmany(size)
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def close(self):
+        if not self._shared:
+            self._raw.close()
+
+
+class EmbeddedConnection:
+    """Koneksi DB-API tipis, dipakai seperti koneksi pool MySQL (cursor(), close())"""
+
+    def __init__(self, raw, dialect):
+        self._raw = raw
+        self.dialect = dialect
+        self._begin()
+
+    def _begin(self):
+        # DuckDB autocommit per statement; sqlite3/pymysql membuka transaksi implisit
+        # sampai commit()/rollback(), jadi samakan supaya rollback() tetap berarti
+        if self.dialect.engine == 'duckdb':
+            self._raw.begin()
+
+    def cursor(self):
+        # DuckDB: raw.cursor() membuka koneksi (dan transaksi) baru, jadi pakai raw sendiri
+        if self.dialect.engine == 'duckdb':
+            return EmbeddedCursor(self._raw, self.dialect, shared=True)
+        return EmbeddedCursor(self._raw.cursor(), self.dialect)
+
+    def commit(self):
+        self._raw.commit()
+        self._begin()
+
+    def rollback(self):
+        self._raw.rollback()
+        self._begin()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _pick_engine(engine):
+    if engine == 'auto':
+        return 'duckdb' if duckdb is not None else 'sqlite'
+    if engine == 'duckdb' and duckdb is None:
+        raise RuntimeError("duckdb belum terpasang; jalankan `pip install duckdb` atau pakai EMBEDDED_ENGINE=sqlite")
+    if engine not in SQL_TYPES:
+        raise ValueError(f"engine embedded tidak dikenal: {engine}")
+    return engine
+
+
+def _sql_rows(df, table):
+    # Tanggal -> 'YYYY-MM-DD', NaN/NaT/pd.NA -> None, nilai numpy -> tipe Python
+    df = df[list(TABLES[table]['columns'])].copy()
+    for col, col_type in TABLES[table]['columns'].items():
+        if col_type == 'date':
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+class EmbeddedDatabase:
+    def __init__(self, engine=EMBEDDED_ENGINE, path=EMBEDDED_DB, source_dir=EMBEDDED_SOURCE,
+                 snapshot_dir=None):
+        self.engine = _pick_engine(engine)
+        self.dialect = Dialect(self.engine)
+        self.path = path
+        self.source_dir = source_dir
+        self.snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._load_stats = {}
+        if self.engine == 'sqlite':
+            # In-memory dibagi antar koneksi lewat shared cache; _keeper menjaga database tetap hidup
+            self._uri = f"file:{path}" if path else f"file:hospital_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._keeper = self._connect_raw()
+        else:
+            self._duck = duckdb.connect(path or ':memory:')
+
+    # ---- koneksi ----
+
+    def _connect_raw(self):
+        if self.engine == 'sqlite':
+            return sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        # Cursor DuckDB = koneksi terpisah ke database yang sama (aman per thread)
+        return self._duck.cursor()
+
+    def connection(self):
+        """Koneksi baru (murah); tabel dimuat dulu kalau belum"""
+        self.ensure_loaded()
+        return EmbeddedConnection(self._connect_raw(), self.dialect)
+
+    # ---- load ----
+
+    def _existing_tables(self, raw):
+        if self.engine == 'sqlite':
+            rows = raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        else:
+            rows = raw.execute("SELECT table_name FROM information_schema.tables").fetchall()
+        return {row[0] for row in rows}
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            raw = self._connect_raw()
+            try:
+                existing = self._existing_tables(raw)
+                for table in TABLES:
+                    if table not in existing:
+                        self._load_table(raw, table)
+            finally:
+                raw.close()
+            self._loaded = True
+
+    def _source_chunks(self, table):
+        if has_snapshot(table, self.snapshot_dir):
+            return 'snapshot', iter_snapshot_batches(table, self.snapshot_dir)
+        return 'csv', read_csv_chunks(table, csv_path(table, self.source_dir))
+
+    def _load_table(self, raw, table):
+        spec = TABLES[table]
+        types = SQL_TYPES[self.engine]
+        columns = list(spec['columns'])
+        ddl = ', '.join(f'"{col}" {types[col_type]}' for col, col_type in spec['columns'].items())
+        raw.execute(f'DROP TABLE IF EXISTS "{table}"')
+        raw.execute(f'CREATE TABLE "{table}" ({ddl}, PRIMARY KEY ("{spec["primary_key"]}"))')
+
+        start, rows = time.perf_counter(), 0
+        source, chunks = self._source_chunks(table)
+        for chunk in chunks:
+            if self.engine == 'sqlite':
+                placeholders = ', '.join(['?'] * len(columns))
+                raw.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', _sql_rows(chunk, table))
+            else:
+                frame = pd.DataFrame(_sql_rows(chunk, table), columns=columns, dtype=object)
+                raw.register('chunk', frame)
+                casts = ', '.join(f'CAST("{col}" AS {types[spec["columns"][col]]})' for col in columns)
+                raw.execute(f'INSERT INTO "{table}" SELECT {casts} FROM chunk')
+                raw.unregister('chunk')
+            rows += len(chunk)
+
+        if self.engine == 'sqlite':
+            # DuckDB tidak perlu index (zonemap kolumnar); di SQLite index = WHERE cepat
+            for ddl in INDEXES:
+                if f" ON {table} " in ddl:
+                    raw.execute(ddl.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS'))
+            raw.execute(f'ANALYZE "{table}"')
+        raw.commit()
+        self._load_stats[table] = {'rows': rows, 'source': source,
+                                   'seconds': round(time.perf_counter() - start, 3)}
+
+    def reload(self, tables=None):
+        """Muat ulang tabel dari snapshot/CSV (mis. setelah CSV diperbarui)"""
+        with self._lock:
+            raw = self._connect_raw()
+            try:
+                for table in tables or list(TABLES):
+                    self._load_table(raw, table)
+            finally:
+                raw.close()
+            self._loaded = True
+
+    # ---- DataFrame ----
+
+    def read_frame(self, sql, params=()):
+        """Hasil query sebagai DataFrame (jalur native engine, tanpa fetch per baris)"""
+        self.ensure_loaded()
+        sql, params = self.dialect.translate(sql), self.dialect.params(params)
+        raw = self._connect_raw()
+        try:
+            if self.engine == 'sqlite':
+                return pd.read_sql(sql, raw, params=params)
+            return raw.execute(sql, params).df()
+        finally:
+            raw.close()
+
+    def iter_frames(self, sql, params=(), chunksize=5000):
+        """
+        Iterator DataFrame per chunk untuk export streaming. Query dijalankan
+        saat fungsi ini dipanggil, jadi error muncul sebelum response dimulai.
+        """
+        self.ensure_loaded()
+        sql, params = self.dialect.translate(sql), self.dialect.params(params)
+        raw = self._connect_raw()
+        try:
+            if self.engine == 'sqlite':
+                frames = pd.read_sql(sql, raw, params=params, chunksize=chunksize)
+            else:
+                reader = raw.execute(sql, params).fetch_record_batch(chunksize)
+                frames = (batch.to_pandas() for batch in reader)
+        except Exception:
+            raw.close()
+            raise
+
+        def generate():
+            try:
+                yield from frames
+            finally:
+                raw.close()
+
+        return generate()
+
+    def stats(self):
+        return {
+            'engine': self.engine,
+            'path': self.path or ':memory:',
+            'loaded': self._loaded,
+            'tables': dict(self._load_stats),
+        }
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """Database embedded global, dibuat saat pertama kali dipakai"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = EmbeddedDatabase()
+    return _database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun database embedded dari snapshot/CSV")
+    parser.add_argument('tables', nargs='*', help="tabel yang dimuat ulang (default: semua)")
+    parser.add_argument('--db', required=True, help="file database (.sqlite / .duckdb)")
+    parser.add_argument('--engine', default=EMBEDDED_ENGINE, choices=['auto', 'sqlite', 'duckdb'])
+    parser.add_argument('--source', default=EMBEDDED_SOURCE, help="folder CSV")
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR, help="folder snapshot Arrow (dipakai kalau ada)")
+    args = parser.parse_args()
+
+    unknown = [t for t in args.tables if t not in TABLES]
+    if unknown:
+        parser.error(f"tabel tidak dikenal: {unknown}")
+
+    database = EmbeddedDatabase(args.engine, args.db, args.source, args.snapshots)
+    database.reload(args.tables or None)
+    for table, info in database.stats()['tables'].items():
+        print(f"✅ {table}: {info['rows']} baris dari {info['source']} ({info['seconds']}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalIndex
+from query_builder import FILTER_SPECS
+
+# ------------------------------
+# ROLLUP FINANCE HARIAN & BULANAN
+# ------------------------------
+# Chart dan statistik tab finance dihitung dari dua tabel agregat, bukan dari
+# baris transaksi mentah:
+#   harian   (day,   service_type, payment_type, entry_type, insurance_provider)
+#   bulanan  (month, service_type, payment_type, entry_type, insurance_provider)
+# masing-masing berisi rows (jumlah transaksi), cents (total amount_idr x 100,
+# integer supaya tambah/kurang delta tidak menumpuk error float) dan amounts
+# (jumlah amount_idr yang tidak NULL, untuk rata-rata).
+#
+# Range start_date..end_date dijawab dari bulan yang tercakup penuh (tabel
+# bulanan) ditambah hari-hari di ujung range (tabel harian), jadi view
+# multi-tahun hanya membaca puluhan sel bulanan per kombinasi filter.
+#
+# Rollup mengikuti frame finance dari cache (lihat incremental.py): setelah load
+# delta hanya transaksi baru/berubah yang ditambah/dikurangkan ke sel.
+# Distinct count (unique_patients) tidak bisa di-rollup; itu tetap dari baris.
+
+DIMENSIONS = ['service_type', 'payment_type', 'entry_type', 'insurance_provider']
+MEASURES = ['rows', 'cents', 'amounts']
+
+
+def _month_key(days):
+    """datetime64 -> 'YYYY-MM' ('NaT' untuk tanggal kosong, sama dengan to_period('M').astype(str))"""
+    return days.dt.to_period('M').astype(str).astype(object)
+
+
+def _row_cells(df):
+    """Baris transaksi -> sel harian (sudah di-group)"""
+    cells = pd.DataFrame({
+        'day': pd.to_datetime(df['transaction_date'], errors='coerce').dt.normalize()
+        if 'transaction_date' in df.columns else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]'),
+    })
+    for col in DIMENSIONS:
+        cells[col] = df[col].astype(object) if col in df.columns else None
+    amount = (pd.to_numeric(df['amount_idr'], errors='coerce') if 'amount_idr' in df.columns
+              else pd.Series(np.nan, index=df.index))
+    cells['rows'] = 1
+    cells['cents'] = (amount * 100).round().fillna(0).astype('int64')
+    cells['amounts'] = amount.notna().astype('int64')
+    return _group(cells, ['day'])
+
+
+def _group(cells, keys, drop_empty=True):
+    keys = keys + DIMENSIONS
+    grouped = cells.groupby(keys, dropna=False, sort=False)[MEASURES].sum().reset_index()
+    # Delta boleh berisi sel dengan rows 0 (baris diubah di sel yang sama), sel tersimpan tidak
+    return grouped[grouped['rows'] != 0] if drop_empty else grouped
+
+
+def _to_monthly(daily, drop_empty=True):
+    monthly = daily.drop(columns='day').assign(month=_month_key(daily['day']))
+    return _group(monthly, ['month'], drop_empty)
+
+
+def _merge(cells, delta, keys):
+    if delta.empty:
+        return cells
+    return _group(pd.concat([cells, delta], ignore_index=True), keys)
+
+
+def _sort_daily(daily):
+    # Urut per hari (NaT di akhir) untuk searchsorted saat query range
+    return daily.sort_values('day', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def _day_bounds(filters):
+    """
+    (start, end) hari inklusif dari filter start_date/end_date, atau None
+    kalau ada filter yang tidak bisa dijawab rollup (kolom di luar dimensi,
+    tanggal tidak valid).
+    """
+    specs = {arg: (column, op) for arg, column, op in FILTER_SPECS['finance']}
+    start = end = None
+    for arg, value in filters:
+        column, op = specs[arg]
+        if op == '=':
+            if column not in DIMENSIONS:
+                return None
+            continue
+        if column != 'transaction_date' or op not in ('>=', '<='):
+            return None
+        try:
+            bound = pd.Timestamp(value)
+        except (ValueError, TypeError):
+            return None
+        if bound is pd.NaT:
+            return None
+        if op == '>=':
+            # transaction_date bertipe DATE: '>= 2025-01-15 12:00' mulai hari berikutnya
+            day = bound.ceil('D')
+            start = day if start is None else max(start, day)
+        else:
+            day = bound.floor('D')
+            end = day if end is None else min(end, day)
+    return start, end
+
+
+class FinanceRollup(IncrementalIndex):
+    TABLE = 'finance'
+    HASH_COLUMNS = ['transaction_id', 'transaction_date', 'amount_idr'] + DIMENSIONS
+
+    def __init__(self):
+        super().__init__()
+        # (harian urut per hari, bulanan); diganti utuh supaya query tidak perlu lock
+        self._tables = None
+        self._stats['queries'] = 0
+
+    # ---- pemeliharaan rollup ----
+
+    def _reset(self, df):
+        daily = _row_cells(df)
+        self._tables = (_sort_daily(daily), _to_monthly(daily))
+
+    def _update(self, removed, added):
+        plus = _row_cells(added)
+        minus = _row_cells(removed)
+        minus[MEASURES] = -minus[MEASURES]
+        delta = _group(pd.concat([plus, minus], ignore_index=True), ['day'], drop_empty=False)
+
+        daily, monthly = self._tables
+        self._tables = (
+            _sort_daily(_merge(daily, delta, ['day'])),
+            _merge(monthly, _to_monthly(delta, drop_empty=False), ['month']),
+        )
+
+    # ---- query ----
+
+    def _cells(self, start, end):
+        """Sel (month + dimensi + measures) untuk range hari [start, end] (None = terbuka)"""
+        daily, monthly = self._tables
+        if start is None and end is None:
+            return monthly
+
+        # Bulan yang tercakup penuh oleh range
+        first = None if start is None else start.to_period('M') + (0 if start.day == 1 else 1)
+        last = None if end is None else end.to_period('M') - (0 if end.is_month_end else 1)
+        months = monthly['month']
+        in_full = months != 'NaT'
+        if first is not None:
+            in_full &= months >= str(first)
+        if last is not None:
+            in_full &= months <= str(last)
+
+        # NaT ada di akhir tabel harian dan tidak pernah masuk range
+        days = daily['day'].to_numpy()
+        days = days[:len(days) - int(np.isnat(days).sum())]
+
+        def day_slice(lo, hi):
+            # [lo, hi] inklusif
+            left = 0 if lo is None else int(np.searchsorted(days, np.datetime64(lo), 'left'))
+            right = len(days) if hi is None else int(np.searchsorted(days, np.datetime64(hi), 'right'))
+            return daily.iloc[left:max(left, right)]
+
+        if first is not None and last is not None and first > last:
+            edges = [day_slice(start, end)]
+        else:
+            edges = []
+            if start is not None and start.day != 1:
+                edges.append(day_slice(start, first.start_time - pd.Timedelta(days=1)))
+            if end is not None and not end.is_month_end:
+                edges.append(day_slice(last.end_time.normalize() + pd.Timedelta(days=1), end))
+
+        parts = [monthly[in_full]]
+        for edge in edges:
+            if len(edge):
+                parts.append(edge.drop(columns='day').assign(month=_month_key(edge['day'])))
+        return pd.concat(parts, ignore_index=True)
+
+    def summary(self, filters):
+        """
+        Statistik dan data chart tab finance untuk `filters` (tuple filter_args),
+        atau None kalau rollup belum ada / filter tidak bisa dijawab dari rollup.
+        """
+        tables = self._tables
+        bounds = _day_bounds(filters)
+        if tables is None or bounds is None:
+            return None
+        self._stats['queries'] += 1
+
+        cells = self._cells(*bounds)
+        specs = {arg: (column, op) for arg, column, op in FILTER_SPECS['finance']}
+        for arg, value in filters:
+            column, op = specs[arg]
+            if op == '=':
+                cells = cells[cells[column] == value]
+        return summarize_cells(cells)
+
+    def stats(self):
+        daily, monthly = self._tables if self._tables is not None else ((), ())
+        return {
+            **self._stats,
+            'rows': len(self._source) if self._source is not None else 0,
+            'daily_cells': len(daily),
+            'monthly_cells': len(monthly),
+        }
+
+
+def _totals(cells, column):
+    """
+    rows & cents per nilai `column` (NULL dibuang, urut nilai seperti groupby).
+    factorize + bincount: tabel sel kecil, overhead groupby pandas lebih mahal dari hitungannya.
+    """
+    codes, uniques = pd.factorize(cells[column], sort=True)
+    valid = codes >= 0
+    totals = pd.DataFrame({
+        measure: np.bincount(codes[valid], weights=cells[measure].to_numpy()[valid], minlength=len(uniques))
+        for measure in ('rows', 'cents')
+    }, index=uniques).astype('int64')
+    return totals[totals['rows'] > 0]
+
+
+def _rupiah(cents):
+    return int(cents) / 100
+
+
+def summarize_cells(cells):
+    """Sel rollup (sudah difilter) -> dict statistik tab finance"""
+    cents = int(cells['cents'].sum())
+    amounts = int(cells['amounts'].sum())
+    by_payment = _totals(cells, 'payment_type')
+    by_entry = _totals(cells, 'entry_type')
+
+    def payment(value, measure):
+        return by_payment[measure].get(value, 0)
+
+    def dist(totals):
+        # Padanan count_values: jumlah transaksi terbanyak dulu
+        counts = totals['rows'].sort_values(ascending=False, kind='stable')
+        return {key: int(value) for key, value in counts.items()}
+
+    return {
+        'total_transactions': int(cells['rows'].sum()),
+        'total_revenue': _rupiah(cents),
+        'average_transaction': _rupiah(cents) / amounts if amounts else float('nan'),
+        'bpjs_revenue': _rupiah(payment('BPJS', 'cents')),
+        'umum_revenue': _rupiah(payment('Umum', 'cents')),
+        'bpjs_transactions': int(payment('BPJS', 'rows')),
+        'umum_transactions': int(payment('Umum', 'rows')),
+        'revenue_by_service': {key: _rupiah(value) for key, value in _totals(cells, 'service_type')['cents'].items()},
+        'revenue_by_month': {key: _rupiah(value) for key, value in _totals(cells, 'month')['cents'].items()},
+        'payment_type_dist': dist(by_payment),
+        'entry_type_dist': dist(by_entry),
+    }
+
+
+def summarize_frame(df):
+    """
+    Statistik yang sama dengan summarize_cells langsung dari baris transaksi
+    (fallback kalau filter tidak bisa dijawab rollup)
+    """
+    return summarize_cells(_to_monthly(_row_cells(df)) if len(df) else
+                           pd.DataFrame(columns=['month'] + DIMENSIONS + MEASURES))
+
+
+finance_rollup = FinanceRollup()
@@ -0,0 +1,242 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------
+# FORECAST VOLUME PASIEN (patient_trends)
+# ------------------------------
+# Model direct multi-horizon: untuk setiap h = 1..FORECAST_HORIZON satu ridge
+# regression memprediksi total_patients hari t+h dari fitur hari t:
+#   - lag total_patients (LAGS) dan rata-rata/std rolling (WINDOWS)
+#   - one-hot external_event, weather, top_disease hari t
+#   - population_density, tren waktu, one-hot hari dalam minggu target (t+h)
+# Fitur dibangun vektor sekali (shift/rolling pandas); tiap horizon hanya
+# memilih baris yang target-nya diketahui. Fit per horizon tidak saling
+# bergantung, jadi dibagi ke process pool (tidak memegang GIL worker Flask).
+#
+# Akurasi dilaporkan dari holdout HOLDOUT_DAYS origin terakhir (MAE per horizon);
+# interval prediksi = prediksi +/- 1.96 x RMSE holdout horizon itu.
+#
+# ForecastService menyimpan hasil per versi data. Request tidak pernah menunggu
+# fit: kalau hasil belum ada, fit dijadwalkan di background dan request
+# mendapat status 'pending'; kalau data berubah, hasil lama tetap dikirim
+# (status 'stale') sampai fit baru selesai.
+
+FORECAST_HORIZON = int(os.environ.get('FORECAST_HORIZON', 30))
+FORECAST_WORKERS = int(os.environ.get('FORECAST_WORKERS', min(4, os.cpu_count() or 1)))
+HOLDOUT_DAYS = int(os.environ.get('FORECAST_HOLDOUT_DAYS', 28))
+RIDGE_ALPHA = float(os.environ.get('FORECAST_RIDGE_ALPHA', 1.0))
+HISTORY_DAYS = 90  # jumlah hari aktual yang ikut dikirim untuk chart
+RETRY_SECONDS = 60
+
+LAGS = (1, 2, 7, 14, 28)
+WINDOWS = (7, 28)
+CATEGORY_COLUMNS = ('external_event', 'weather', 'top_disease')
+
+
+def build_features(trends):
+    """
+    patient_trends -> (dates, y, X, nama kolom). Baris di-reindex per hari
+    (tanggal yang hilang diisi interpolasi), X[t] hanya memakai data <= t.
+    """
+    df = trends.dropna(subset=['date']).copy()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.normalize()
+    df = df.dropna(subset=['date']).drop_duplicates('date', keep='last').set_index('date').sort_index()
+    df = df.reindex(pd.date_range(df.index.min(), df.index.max(), freq='D'))
+
+    y = pd.to_numeric(df['total_patients'], errors='coerce').interpolate(limit_direction='both')
+    features = {'trend': np.arange(len(df), dtype=float) / 365.0}
+    features['y'] = y
+    for lag in LAGS[1:]:
+        features[f'lag_{lag}'] = y.shift(lag - 1)
+    for window in WINDOWS:
+        rolling = y.rolling(window, min_periods=1)
+        features[f'mean_{window}'] = rolling.mean()
+        features[f'std_{window}'] = rolling.std().fillna(0.0)
+    if 'population_density' in df.columns:
+        features['population_density'] = pd.to_numeric(df['population_density'], errors='coerce').ffill().bfill()
+
+    X = pd.DataFrame(features, index=df.index)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            values = df[col].astype(object).where(df[col].notna(), 'Tidak ada')
+            X = X.join(pd.get_dummies(values, prefix=col, dtype=float))
+    X = X.fillna(0.0)
+    return df.index, y.to_numpy(dtype=float), X.to_numpy(dtype=float), list(X.columns)
+
+
+def _design(X, dates, h):
+    """Fitur origin + one-hot hari dalam minggu tanggal target (t + h)"""
+    weekday = (dates.dayofweek.to_numpy() + h) % 7
+    return np.hstack([X, np.eye(7)[weekday]])
+
+
+def _ridge(A, b, alpha):
+    """Ridge dengan standardisasi kolom; intercept tidak di-penalti. Return fungsi prediksi"""
+    mean, std = A.mean(axis=0), A.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (A - mean) / std
+    b_mean = b.mean()
+    coef = np.linalg.solve(Z.T @ Z + alpha * np.eye(Z.shape[1]), Z.T @ (b - b_mean))
+    return lambda A_new: ((A_new - mean) / std) @ coef + b_mean
+
+
+def fit_horizons(horizons, dates, y, X, alpha=RIDGE_ALPHA, holdout=HOLDOUT_DAYS):
+    """
+    Fit model untuk setiap h di `horizons` (dijalankan di process pool).
+    Return list dict: h, prediksi dari origin terakhir, MAE/RMSE holdout.
+    """
+    results = []
+    n = len(y)
+    for h in horizons:
+        A = _design(X, dates, h)
+        rows = n - h  # origin dengan target diketahui
+        if rows < 2:
+            results.append({'h': h, 'predicted': float(y[-1]), 'mae': None, 'rmse': None})
+            continue
+
+        # Holdout: latih sampai origin rows - holdout, uji pada holdout origin terakhir
+        split = rows - min(holdout, rows // 4)
+        mae = rmse = None
+        if split >= 2 and split < rows:
+            predict = _ridge(A[:split], y[h:split + h], alpha)
+            errors = predict(A[split:rows]) - y[split + h:rows + h]
+            mae, rmse = float(np.abs(errors).mean()), float(np.sqrt((errors ** 2).mean()))
+
+        predict = _ridge(A[:rows], y[h:rows + h], alpha)
+        results.append({'h': h, 'predicted': float(predict(A[-1:])[0]), 'mae': mae, 'rmse': rmse})
+    return results
+
+
+def run_forecast(trends, horizon=FORECAST_HORIZON, executor=None, workers=FORECAST_WORKERS):
+    """Fitur + fit semua horizon (dibagi ke `executor` kalau ada). Return dict hasil"""
+    start = time.perf_counter()
+    dates, y, X, columns = build_features(trends)
+    if len(y) == 0:
+        raise ValueError("patient_trends kosong")
+
+    chunks = [list(range(1, horizon + 1))[i::max(workers, 1)] for i in range(max(workers, 1))]
+    chunks = [chunk for chunk in chunks if chunk]
+    if executor is None:
+        fitted = [fit_horizons(chunk, dates, y, X) for chunk in chunks]
+    else:
+        futures = [executor.submit(fit_horizons, chunk, dates, y, X) for chunk in chunks]
+        fitted = [future.result() for future in futures]
+    by_h = sorted((r for chunk in fitted for r in chunk), key=lambda r: r['h'])
+
+    last = dates[-1]
+    forecast = []
+    for r in by_h:
+        predicted = max(r['predicted'], 0.0)
+        band = 1.96 * r['rmse'] if r['rmse'] is not None else None
+        forecast.append({
+            'date': (last + pd.Timedelta(days=r['h'])).strftime('%Y-%m-%d'),
+            'predicted': round(predicted, 1),
+            'lower': round(max(predicted - band, 0.0), 1) if band is not None else None,
+            'upper': round(predicted + band, 1) if band is not None else None,
+        })
+    maes = [r['mae'] for r in by_h if r['mae'] is not None]
+    history = slice(max(len(y) - HISTORY_DAYS, 0), len(y))
+    return {
+        'history': {d.strftime('%Y-%m-%d'): round(float(v), 1) for d, v in zip(dates[history], y[history])},
+        'forecast': forecast,
+        'mae_by_horizon': {r['h']: round(r['mae'], 2) for r in by_h if r['mae'] is not None},
+        'mean_mae': round(float(np.mean(maes)), 2) if maes else None,
+        'model': {
+            'type': 'ridge direct multi-horizon',
+            'features': len(columns) + 7,
+            'training_days': len(y),
+            'last_date': last.strftime('%Y-%m-%d'),
+            'alpha': RIDGE_ALPHA,
+            'holdout_days': HOLDOUT_DAYS,
+        },
+        'fit_seconds': round(time.perf_counter() - start, 3),
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+class ForecastService:
+    def __init__(self, horizon=FORECAST_HORIZON, workers=FORECAST_WORKERS):
+        self.horizon = horizon
+        self.workers = workers
+        self._pool = None
+        # Satu thread koordinator: bangun fitur lalu bagi fit ke process pool
+        self._coordinator = ThreadPoolExecutor(max_workers=1, thread_name_prefix='forecast')
+        self._lock = threading.Lock()
+        self._source = None       # frame patient_trends terakhir yang dilihat
+        self._version = None      # hash isi frame itu
+        self._result = None       # (version, hasil)
+        self._job = None          # future fit yang sedang berjalan
+        self._failure = None      # (version, waktu, pesan) fit terakhir yang gagal
+        self._stats = {'fits': 0, 'failures': 0, 'last_fit_seconds': None}
+
+    def _executor(self):
+        if self._pool is None and self.workers > 1:
+            # spawn: jangan fork proses Flask yang multi-thread
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _fit(self, version, trends):
+        try:
+            result = run_forecast(trends, self.horizon, self._executor(), self.workers)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Worker mati (OOM/kill): pool dibuat ulang di fit berikutnya
+                self._pool = None
+            with self._lock:
+                self._failure = (version, time.monotonic(), f"{type(e).__name__}: {e}")
+                self._stats['failures'] += 1
+                self._job = None
+            raise
+        with self._lock:
+            self._result = (version, result)
+            self._failure = None
+            self._stats['fits'] += 1
+            self._stats['last_fit_seconds'] = result['fit_seconds']
+            self._job = None
+
+    def get(self, trends):
+        """
+        Hasil forecast untuk frame `trends` tanpa menunggu fit.
+        Return (status, hasil): 'ready', 'stale' (hasil versi lama, fit baru
+        berjalan), 'pending' (belum ada hasil) atau 'error'.
+        """
+        with self._lock:
+            if trends is not self._source:
+                self._version = int(pd.util.hash_pandas_object(trends, index=False).sum())
+                self._source = trends
+            version = self._version
+
+            if self._result is not None and self._result[0] == version:
+                return 'ready', self._result[1]
+            # Fit yang gagal untuk data yang sama baru dicoba lagi setelah RETRY_SECONDS
+            failed = (self._failure is not None and self._failure[0] == version
+                      and time.monotonic() - self._failure[1] < RETRY_SECONDS)
+            if self._job is None and not failed:
+                self._job = self._coordinator.submit(self._fit, version, trends)
+            if self._result is not None:
+                return 'stale', self._result[1]
+            if failed:
+                return 'error', {'error': self._failure[2]}
+            return 'pending', None
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'horizon': self.horizon,
+                'workers': self.workers,
+                'running': self._job is not None,
+                'has_result': self._result is not None,
+                'error': self._failure[2] if self._failure else None,
+            }
+
+
+forecast_service = ForecastService()
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from delta_loader import delta_tables
+
+# ------------------------------
+# SINKRON INDEX TURUNAN DENGAN FRAME CACHE
+# ------------------------------
+# finance_rollup, registration_index, lab_turnaround dan pharmacy_ledger
+# mengikuti frame tabelnya dari cache tanpa dibangun ulang setiap frame berganti.
+# Frame yang sama (objek cache yang sama) dilewati. Untuk frame baru, baris yang
+# berubah dicari lewat:
+#   1. log perubahan delta_loader (DeltaTable.changes): posisi baris yang diganti
+#      dan baris yang ditambahkan sejak frame lama, jadi biayanya sebanding
+#      dengan delta, bukan ukuran tabel;
+#   2. selain itu (snapshot, load penuh/reconcile): diff hash isi baris, dengan
+#      jalur cepat kalau frame lama adalah prefix frame baru.
+# Baris lama yang berubah/hilang dikurangkan, baris baru ditambahkan. Kalau
+# perubahan melebihi REBUILD_RATIO dari ukuran frame, index dibangun ulang.
+
+
+class IncrementalIndex:
+    """
+    Basis index yang mengikuti frame tabel TABLE. Subclass mengisi HASH_COLUMNS,
+    _reset(df) (bangun dari nol) dan _update(removed, added) (terapkan baris lama
+    yang dikurangkan dan baris baru yang ditambahkan).
+    """
+
+    TABLE = None
+    HASH_COLUMNS = ()
+    REBUILD_RATIO = 0.5
+
+    def __init__(self):
+        self._source = None
+        self._hashes = None   # hash baris _source; None = belum dihitung (setelah sync lewat delta)
+        self._lock = threading.Lock()
+        self._stats = {'builds': 0, 'refreshes': 0, 'delta_refreshes': 0, 'added': 0, 'removed': 0,
+                       'last_build_seconds': 0.0}
+
+    def _reset(self, df):
+        raise NotImplementedError
+
+    def _update(self, removed, added):
+        raise NotImplementedError
+
+    def _row_hashes(self, df):
+        columns = [col for col in self.HASH_COLUMNS if col in df.columns]
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+    def _delta_diff(self, df):
+        delta = delta_tables.get(self.TABLE)
+        changes = delta.changes(self._source, df) if delta is not None else None
+        if changes is None:
+            return None
+        replaced, appended = changes
+        # Baris di hari high-water mark selalu terambil ulang; yang isinya sama dilewati
+        same = self._row_hashes(self._source.iloc[replaced]) == self._row_hashes(df.iloc[replaced])
+        changed = replaced[~same]
+        self._hashes = None
+        return np.concatenate([changed, appended]), changed
+
+    def _hash_diff(self, df):
+        hashes = self._row_hashes(df)
+        old = self._hashes if self._hashes is not None else self._row_hashes(self._source)
+        self._hashes = hashes
+        if len(np.unique(hashes)) != len(hashes):
+            # Baris kembar (tanpa primary key) tidak bisa di-diff
+            return None
+        if len(hashes) >= len(old) and np.array_equal(hashes[:len(old)], old):
+            # Kasus umum: baris baru hanya ditambahkan di belakang
+            return np.arange(len(old), len(hashes)), np.array([], dtype=np.intp)
+        return np.flatnonzero(~np.isin(hashes, old)), np.flatnonzero(~np.isin(old, hashes))
+
+    def sync(self, df):
+        """
+        Samakan index dengan frame `df`. Return dict jumlah baris added/removed,
+        atau rebuild=True dan rows kalau index dibangun ulang.
+        """
+        if df is self._source:
+            return {'added': 0, 'removed': 0}
+        with self._lock:
+            if df is self._source:
+                return {'added': 0, 'removed': 0}
+
+            diff = via_delta = None
+            if self._source is not None:
+                diff = self._delta_diff(df)
+                via_delta = diff is not None
+                if diff is None:
+                    diff = self._hash_diff(df)
+
+            if diff is None or len(diff[0]) + len(diff[1]) > self.REBUILD_RATIO * max(len(df), 1):
+                start = time.perf_counter()
+                self._reset(df)
+                self._source = df
+                self._stats['builds'] += 1
+                self._stats['last_build_seconds'] = round(time.perf_counter() - start, 3)
+                return {'rebuild': True, 'rows': len(df)}
+
+            added, removed = diff
+            self._update(self._source.iloc[removed], df.iloc[added])
+            self._source = df
+            self._stats['refreshes'] += 1
+            self._stats['delta_refreshes'] += int(via_delta)
+            self._stats['added'] += len(added)
+            self._stats['removed'] += len(removed)
+            return {'added': len(added), 'removed': len(removed)}
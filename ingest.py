@@ -0,0 +1,139 @@
+import argparse
+import sys
+import time
+
+from db_pool import get_pool
+from query_builder import ensure_indexes
+from schema import TABLES, SchemaError, csv_path, detect_encoding, read_csv_chunks
+
+# ------------------------------
+# BULK INGESTION CSV -> MySQL
+# ------------------------------
+# Memuat CSV export HIS ke database `hospital`:
+#   - CSV dibaca per chunk (BOM/encoding dideteksi otomatis, tipe divalidasi)
+#   - ditulis dengan INSERT multi-row ... ON DUPLICATE KEY UPDATE, sehingga
+#     reload berulang (nightly) idempotent dan tidak menduplikasi baris
+#   - commit per chunk, progres & throughput dicetak per chunk
+# Cache aplikasi yang sedang jalan bisa dikosongkan lewat POST /api/cache/invalidate.
+#
+#   python ingest.py                       # semua tabel dari folder ini
+#   python ingest.py --create patients     # buat tabel kalau belum ada, lalu load
+
+INGEST_CHUNK_SIZE = 20000
+INGEST_BATCH_SIZE = 1000
+
+MYSQL_TYPES = {
+    'string': 'VARCHAR(255)',
+    'category': 'VARCHAR(255)',
+    'time': 'VARCHAR(8)',
+    'int': 'BIGINT',
+    'float': 'DOUBLE',
+    'date': 'DATE',
+}
+
+
+def create_table_sql(table):
+    spec = TABLES[table]
+    columns = [f"`{col}` {MYSQL_TYPES[col_type]}" for col, col_type in spec['columns'].items()]
+    columns.append(f"PRIMARY KEY (`{spec['primary_key']}`)")
+    return f"CREATE TABLE IF NOT EXISTS `{table}` (\n  " + ",\n  ".join(columns) + "\n)"
+
+
+def upsert_sql(table):
+    spec = TABLES[table]
+    columns = list(spec['columns'])
+    placeholders = ', '.join(['%s'] * len(columns))
+    updates = ', '.join(
+        f"`{col}` = VALUES(`{col}`)" for col in columns if col != spec['primary_key']
+    )
+    return (
+        f"INSERT INTO `{table}` ({', '.join(f'`{col}`' for col in columns)}) "
+        f"VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
+    )
+
+
+def _rows(df):
+    # NaN / NaT / pd.NA -> None (NULL), nilai numpy -> tipe Python
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def ingest_table(conn, table, source_dir='.', chunksize=INGEST_CHUNK_SIZE, batch_size=INGEST_BATCH_SIZE):
+    """
+    Load satu CSV ke tabelnya. Return (jumlah baris, detik).
+    executemany pada INSERT dikirim mysql.connector sebagai INSERT multi-row,
+    jadi satu round-trip per `batch_size` baris.
+    """
+    path = csv_path(table, source_dir)
+    encoding = detect_encoding(path)
+    sql = upsert_sql(table)
+    cursor = conn.cursor()
+    rows_done = 0
+    start = time.perf_counter()
+
+    print(f"📥 {table}: {path} (encoding {encoding})")
+    try:
+        for chunk in read_csv_chunks(table, path, chunksize=chunksize, encoding=encoding):
+            rows = _rows(chunk)
+            for i in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[i:i + batch_size])
+            conn.commit()
+
+            rows_done += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"   {rows_done:>10} baris  {rows_done / elapsed if elapsed else 0:>10.0f} baris/detik")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return rows_done, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load CSV seed/HIS export ke database hospital")
+    parser.add_argument('tables', nargs='*', help="tabel yang di-load (default: semua)")
+    parser.add_argument('--source', default='.', help="folder CSV")
+    parser.add_argument('--create', action='store_true', help="buat tabel (dan index) kalau belum ada")
+    parser.add_argument('--chunksize', type=int, default=INGEST_CHUNK_SIZE, help="baris per chunk/commit")
+    parser.add_argument('--batch', type=int, default=INGEST_BATCH_SIZE, help="baris per INSERT multi-row")
+    args = parser.parse_args()
+
+    tables = args.tables or list(TABLES)
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        parser.error(f"tabel tidak dikenal: {unknown}")
+
+    conn = get_pool().connection()
+    failed = []
+    try:
+        if args.create:
+            cursor = conn.cursor()
+            for table in tables:
+                cursor.execute(create_table_sql(table))
+            cursor.close()
+            ensure_indexes(conn)
+
+        total_rows, total_start = 0, time.perf_counter()
+        for table in tables:
+            try:
+                rows, seconds = ingest_table(conn, table, args.source, args.chunksize, args.batch)
+            except SchemaError as e:
+                print(f"[ERROR] {e}")
+                failed.append(table)
+                continue
+            total_rows += rows
+            print(f"✅ {table}: {rows} baris dalam {seconds:.2f}s")
+
+        elapsed = time.perf_counter() - total_start
+        print(f"Selesai: {total_rows} baris dalam {elapsed:.2f}s")
+    finally:
+        conn.close()
+
+    if failed:
+        print(f"⚠️ Gagal validasi: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
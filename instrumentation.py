@@ -0,0 +1,314 @@
+import bisect
+import contextvars
+import cProfile
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# ------------------------------
+# INSTRUMENTASI PER REQUEST
+# ------------------------------
+# Setiap request mencatat waktu per fase:
+#   db         read_table / query agregat dashboard (termasuk tunggu pool)
+#   load       olah hasil loader (prepare_*, statistik) + simpan ke cache
+#   filter     filter DataFrame di route
+#   aggregate  groupby/hitung chart di route
+#   render     render_template (Jinja)
+#   serialize  encode JSON (jsonify dan |tojson)
+#   app        sisa waktu request (kode route lain, Flask)
+# Waktu fase eksklusif: fase di dalam fase lain (db di dalam load, serialize di
+# dalam render) tidak dihitung dua kali. Fase di thread lain (query paralel
+# dashboard) dijumlahkan dan tidak dipotong dari fase yang menunggunya, jadi db
+# bisa lebih besar dari waktu total.
+#
+# Hasilnya dikirim lewat header Server-Timing dan diakumulasi sebagai histogram
+# di /metrics (format Prometheus, ?format=json untuk ringkasan).
+# PROFILE_REQUESTS=1 mengaktifkan ?profile=1 / header X-Profile: 1 yang menulis
+# dump cProfile per request ke PROFILE_DIR.
+# Response streaming (export CSV) hanya tercatat sampai response dimulai.
+
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+METRICS_ALLOW_REMOTE = os.environ.get('METRICS_ALLOW_REMOTE', '0') == '1'
+
+# Batas bucket histogram (detik)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASE_ORDER = ['db', 'load', 'filter', 'aggregate', 'render', 'serialize', 'app']
+
+_request = contextvars.ContextVar('perf_request', default=None)
+_parent = contextvars.ContextVar('perf_parent', default=None)
+
+
+class RequestTimings:
+    """Akumulasi fase untuk satu request (bisa diisi dari beberapa thread)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.rows = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.render_stack = []
+        self.thread = threading.get_ident()
+        self.background = 0.0  # detik fase yang berjalan di thread lain
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, rows=None, nbytes=None, background=False):
+        with self._lock:
+            self.seconds[name] += max(seconds, 0.0)
+            if background:
+                self.background += max(seconds, 0.0)
+            self.calls[name] += 1
+            if rows is not None:
+                self.rows[name] += int(rows)
+            if nbytes is not None:
+                self.bytes[name] += int(nbytes)
+
+    def add_child_time(self, frame, seconds):
+        with self._lock:
+            frame['children'] += seconds
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+
+class _Phase:
+    """Satu fase yang sedang berjalan; waktu anak dikurangkan saat stop()"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frame = {'children': 0.0, 'rows': None, 'bytes': None, 'thread': threading.get_ident()}
+
+    def start(self):
+        self.timings = _request.get()
+        if self.timings is not None:
+            self.token = _parent.set(self.frame)
+            self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        if self.timings is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        _parent.reset(self.token)
+        parent = _parent.get()
+        if parent is not None and parent['thread'] == self.frame['thread']:
+            self.timings.add_child_time(parent, elapsed)
+        self.timings.add(self.name, elapsed - self.frame['children'], self.frame['rows'], self.frame['bytes'],
+                         background=self.frame['thread'] != self.timings.thread)
+
+
+@contextmanager
+def phase(name):
+    """
+    with phase('filter') as info: ...
+    info['rows'] / info['bytes'] boleh diisi untuk dicatat bersama waktunya.
+    Di luar request (CLI, thread tanpa context) tidak mencatat apa-apa.
+    """
+    current = _Phase(name).start()
+    try:
+        yield current.frame
+    finally:
+        current.stop()
+
+
+def frame_bytes(df):
+    """Ukuran DataFrame tanpa deep=True (murah, cukup untuk perbandingan antar request)"""
+    return int(df.memory_usage(index=False).sum())
+
+
+def run_in_context(executor, fn, *args):
+    """executor.submit yang membawa context request, supaya fase di thread worker ikut tercatat"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+# ------------------------------
+# HISTOGRAM
+# ------------------------------
+class Metrics:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (route, fase) -> [count per bucket (+Inf terakhir), sum, count]
+        self._histograms = {}
+        self._rows = defaultdict(int)
+        self._requests = defaultdict(int)  # (route, status) -> count
+        self._response_bytes = defaultdict(int)
+
+    def observe(self, route, name, seconds):
+        histogram = self._histograms.setdefault((route, name), [[0] * (len(self.buckets) + 1), 0.0, 0])
+        histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+    def record(self, route, status, timings, total, response_bytes):
+        """Masukkan satu RequestTimings yang sudah selesai"""
+        with timings._lock:
+            seconds, rows = dict(timings.seconds), dict(timings.rows)
+        with self._lock:
+            for name, value in seconds.items():
+                self.observe(route, name, value)
+            self.observe(route, 'total', total)
+            for name, count in rows.items():
+                self._rows[(route, name)] += count
+            self._requests[(route, status)] += 1
+            if response_bytes is not None:
+                self._response_bytes[route] += response_bytes
+
+    def _quantile(self, counts, count, q):
+        # Perkiraan dari bucket: batas atas bucket tempat kuantil jatuh
+        target, seen = q * count, 0
+        for upper, n in zip(self.buckets + (float('inf'),), counts):
+            seen += n
+            if seen >= target:
+                return upper
+        return float('inf')
+
+    def summary(self):
+        with self._lock:
+            routes = defaultdict(dict)
+            for (route, name), (counts, total, count) in sorted(self._histograms.items()):
+                routes[route][name] = {
+                    'count': count,
+                    'mean_ms': round(total / count * 1000, 3) if count else 0.0,
+                    'p50_ms_le': self._quantile(counts, count, 0.5) * 1000,
+                    'p95_ms_le': self._quantile(counts, count, 0.95) * 1000,
+                    'rows': self._rows.get((route, name), 0),
+                }
+            requests = defaultdict(dict)
+            for (route, status), count in self._requests.items():
+                requests[route][str(status)] = count
+            return {
+                'routes': dict(routes),
+                'requests': dict(requests),
+                'response_bytes': dict(self._response_bytes),
+            }
+
+    def prometheus(self):
+        """Format teks Prometheus (histogram per route dan fase)"""
+        lines = [
+            '# HELP hospital_request_phase_seconds Waktu per fase request',
+            '# TYPE hospital_request_phase_seconds histogram',
+        ]
+        with self._lock:
+            for (route, name), (counts, total, count) in sorted(self._histograms.items()):
+                labels = f'route="{route}",phase="{name}"'
+                cumulative = 0
+                for upper, n in zip(self.buckets, counts):
+                    cumulative += n
+                    lines.append(f'hospital_request_phase_seconds_bucket{{{labels},le="{upper}"}} {cumulative}')
+                lines.append(f'hospital_request_phase_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'hospital_request_phase_seconds_sum{{{labels}}} {total:.6f}')
+                lines.append(f'hospital_request_phase_seconds_count{{{labels}}} {count}')
+
+            lines += ['# HELP hospital_phase_rows_total Baris yang diproses per fase',
+                      '# TYPE hospital_phase_rows_total counter']
+            for (route, name), rows in sorted(self._rows.items()):
+                lines.append(f'hospital_phase_rows_total{{route="{route}",phase="{name}"}} {rows}')
+
+            lines += ['# HELP hospital_requests_total Jumlah request per status',
+                      '# TYPE hospital_requests_total counter']
+            for (route, status), count in sorted(self._requests.items()):
+                lines.append(f'hospital_requests_total{{route="{route}",status="{status}"}} {count}')
+
+            lines += ['# HELP hospital_response_bytes_total Bytes body response (non-streaming)',
+                      '# TYPE hospital_response_bytes_total counter']
+            for route, nbytes in sorted(self._response_bytes.items()):
+                lines.append(f'hospital_response_bytes_total{{route="{route}"}} {nbytes}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+# ------------------------------
+# INTEGRASI FLASK
+# ------------------------------
+def _route_label(request):
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def server_timing(timings, total):
+    """Header Server-Timing: fase dengan desc jumlah panggilan/baris"""
+    parts = []
+    for name in sorted(timings.seconds, key=lambda n: PHASE_ORDER.index(n) if n in PHASE_ORDER else len(PHASE_ORDER)):
+        desc = f"{timings.calls[name]}x"
+        if timings.rows.get(name):
+            desc += f", {timings.rows[name]} rows"
+        if timings.bytes.get(name):
+            desc += f", {timings.bytes[name]} B"
+        parts.append(f'{name};dur={timings.seconds[name] * 1000:.2f};desc="{desc}"')
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def is_local_request(request):
+    """True untuk request dari localhost (atau semua request jika METRICS_ALLOW_REMOTE=1)"""
+    return METRICS_ALLOW_REMOTE or request.remote_addr in ('127.0.0.1', '::1')
+
+
+def init_app(app):
+    """Pasang hook timing, signal render, /metrics, dan profiler opt-in ke `app`"""
+    from flask import Response, before_render_template, g, jsonify, request, template_rendered
+
+    @app.before_request
+    def _start_timing():
+        g.perf_token = _request.set(RequestTimings())
+        g.profiler = None
+        wants_profile = request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+        if PROFILE_REQUESTS and wants_profile and is_local_request(request):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _finish_timing(response):
+        timings = _request.get()
+        if timings is None:
+            return response
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{request.endpoint or 'unmatched'}.prof"
+            profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+            response.headers['X-Profile-File'] = name
+
+        total = timings.total()
+        # Sisa waktu yang tidak masuk fase mana pun
+        timings.add('app', total - (sum(timings.seconds.values()) - timings.background))
+        response_bytes = None if response.is_streamed else response.calculate_content_length()
+        metrics.record(_route_label(request), response.status_code, timings, total, response_bytes)
+        response.headers['Server-Timing'] = server_timing(timings, total)
+        return response
+
+    @app.teardown_request
+    def _reset_timing(exc):
+        token = g.pop('perf_token', None)
+        if token is not None:
+            _request.reset(token)
+
+    def _render_started(sender, template, context, **extra):
+        timings = _request.get()
+        if timings is not None:
+            timings.render_stack.append(_Phase('render').start())
+
+    def _render_finished(sender, template, context, **extra):
+        timings = _request.get()
+        if timings is not None and timings.render_stack:
+            timings.render_stack.pop().stop()
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Histogram waktu per route/fase; format Prometheus atau ?format=json"""
+        if not is_local_request(request):
+            return jsonify({'error': 'Metrics hanya untuk akses lokal (METRICS_ALLOW_REMOTE=1)'}), 403
+        if request.args.get('format') == 'json':
+            return jsonify(metrics.summary())
+        return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
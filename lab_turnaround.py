@@ -0,0 +1,254 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalIndex
+
+# ------------------------------
+# TURNAROUND TIME LAB (result_date - scheduled_date) DENGAN SKETCH KUANTIL
+# ------------------------------
+# Setiap tes dimasukkan ke sketch log-bucket (gaya DDSketch): turnaround x hari
+# masuk bucket ceil(log_gamma(x)), gamma = (1 + a) / (1 - a), jadi kuantil yang
+# dibaca dari bucket punya error relatif maksimal a (TURNAROUND_ACCURACY).
+# Sketch cukup berisi jumlah tes per bucket, jadi bisa digabung (merge = jumlah
+# counter) dan dikurangi (tes berubah/hilang = counter -1) tanpa menyimpan atau
+# mengurutkan nilai mentah.
+#
+# Counter disimpan per sel (hari jadwal, test_type, lab_staff_id, bucket). Query
+# memilih sel sesuai range tanggal / filter, menggabungkan sketch per test_type
+# atau per staff, lalu membaca p50/p90/p99 dari cumsum bucket. Tes yang belum
+# ada result_date dihitung di bucket PENDING (jumlah tes terbuka, tidak ikut
+# kuantil). Turnaround negatif (hasil sebelum jadwal) dilewati ('invalid').
+#
+# Sinkron dengan frame lab_tests dari cache lewat incremental.py.
+
+TURNAROUND_ACCURACY = float(os.environ.get('TURNAROUND_ACCURACY', 0.01))
+LAB_SLA_DAYS = float(os.environ.get('LAB_SLA_DAYS', 2))
+QUANTILES = (0.5, 0.9, 0.99)
+
+GAMMA = (1 + TURNAROUND_ACCURACY) / (1 - TURNAROUND_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MIN_DAYS = 1 / 1440           # di bawah 1 menit dianggap 0 (bucket ZERO)
+ZERO_BUCKET = np.iinfo(np.int16).min
+PENDING_BUCKET = np.iinfo(np.int16).max
+
+CELL_KEYS = ['day', 'test', 'staff', 'bucket']
+QUERY_CACHE_SIZE = 64
+
+
+def bucket_of(days):
+    """Turnaround (hari, array float) -> index bucket sketch"""
+    days = np.asarray(days, dtype=float)
+    buckets = np.full(days.shape, ZERO_BUCKET, dtype=np.int16)
+    positive = days >= MIN_DAYS
+    buckets[positive] = np.ceil(np.log(days[positive]) / LOG_GAMMA)
+    return buckets
+
+
+def bucket_value(buckets):
+    """Nilai wakil bucket (hari); error relatif <= TURNAROUND_ACCURACY"""
+    buckets = np.asarray(buckets)
+    values = 2 * np.power(GAMMA, buckets.astype(float)) / (GAMMA + 1)
+    return np.where(buckets == ZERO_BUCKET, 0.0, values)
+
+
+def _group_quantiles(cells, key):
+    """
+    Gabungkan sketch per nilai `key` (sel sudah tanpa PENDING) -> DataFrame
+    index kode `key` berisi count, mean, within_sla dan p50/p90/p99 (hari)
+    """
+    merged = cells.groupby([key, 'bucket'], sort=True)['n'].sum()
+    merged = merged[merged > 0].reset_index()
+    if merged.empty:
+        return pd.DataFrame(columns=['count', 'mean', 'within_sla'] + [f"p{round(q * 100)}" for q in QUANTILES])
+
+    groups = merged.groupby(key, sort=False)
+    cum = groups['n'].cumsum().to_numpy()
+    total = groups['n'].transform('sum').to_numpy()
+    values = bucket_value(merged['bucket'].to_numpy())
+    sla = merged['bucket'].to_numpy() <= bucket_of([LAB_SLA_DAYS])[0]
+
+    out = pd.DataFrame({
+        'count': groups['n'].sum(),
+        'mean': (merged['n'] * values).groupby(merged[key]).sum() / groups['n'].sum(),
+        'within_sla': merged['n'].where(sla, 0).groupby(merged[key]).sum() / groups['n'].sum() * 100,
+    })
+    for q in QUANTILES:
+        # Rank kuantil seperti DDSketch: bucket pertama dengan cumsum > q * (n - 1)
+        hit = merged[cum > q * (total - 1)]
+        out[f"p{round(q * 100)}"] = pd.Series(bucket_value(hit['bucket'].to_numpy()), index=hit[key]).groupby(level=0).first()
+    return out
+
+
+def _format_row(row, pending):
+    return {
+        'count': int(row['count']),
+        'pending': int(pending),
+        **{f"p{round(q * 100)}": round(float(row[f'p{round(q * 100)}']), 2) for q in QUANTILES},
+        'mean': round(float(row['mean']), 2),
+        'within_sla': round(float(row['within_sla']), 1),
+    }
+
+
+class LabTurnaroundIndex(IncrementalIndex):
+    TABLE = 'lab_tests'
+    HASH_COLUMNS = ['test_id', 'test_type', 'scheduled_date', 'result_date', 'lab_staff_id']
+
+    def __init__(self):
+        super().__init__()
+        self._cells = self._empty_cells()
+        self._index = None           # MultiIndex sel (dibangun saat upsert)
+        self._tests = {}             # nama test_type -> kode
+        self._staff = {}             # lab_staff_id -> kode
+        self._version = 0
+        self._queries = {}           # (version, argumen) -> hasil summary
+        self._stats.update({'skipped': 0, 'invalid': 0, 'queries': 0, 'query_cache_hits': 0})
+
+    @staticmethod
+    def _empty_cells():
+        return pd.DataFrame({
+            'day': pd.Series(dtype=np.int32), 'test': pd.Series(dtype=np.int32),
+            'staff': pd.Series(dtype=np.int32), 'bucket': pd.Series(dtype=np.int16),
+            'n': pd.Series(dtype=np.int64),
+        })
+
+    # ---- pemeliharaan index ----
+
+    def _codes(self, values, mapping):
+        """Kode kategori untuk Series `values`; nilai baru ditambahkan ke `mapping`"""
+        filled = values.astype(object).where(values.notna(), '-')
+        for value in pd.unique(filled):
+            mapping.setdefault(value, len(mapping))
+        return filled.map(mapping).to_numpy(dtype=np.int32)
+
+    def _cell_rows(self, df, sign):
+        """Baris sel (day, test, staff, bucket, n=sign) untuk tes di `df`"""
+        scheduled = pd.to_datetime(df['scheduled_date'], errors='coerce')
+        result = pd.to_datetime(df['result_date'], errors='coerce')
+        days = (result - scheduled).dt.total_seconds().to_numpy() / 86400
+        pending = result.isna().to_numpy()
+        invalid = ~pending & (days < 0)
+        valid = scheduled.notna().to_numpy() & ~invalid
+        self._stats['skipped'] += int(scheduled.isna().sum()) * sign
+        self._stats['invalid'] += int((invalid & scheduled.notna().to_numpy()).sum()) * sign
+
+        buckets = np.where(pending, PENDING_BUCKET, bucket_of(np.nan_to_num(days)))
+        return pd.DataFrame({
+            'day': scheduled.to_numpy().astype('datetime64[D]').astype(np.int64).astype(np.int32),
+            'test': self._codes(df['test_type'], self._tests),
+            'staff': self._codes(df['lab_staff_id'], self._staff),
+            'bucket': buckets.astype(np.int16),
+            'n': np.full(len(df), sign, dtype=np.int64),
+        })[valid]
+
+    def _apply(self, delta):
+        """
+        Upsert counter sel `delta` (n bertanda): sel yang sudah ada ditambah di
+        tempatnya, sel baru ditambahkan di belakang, sel yang jadi 0 dibuang.
+        """
+        delta = delta.groupby(CELL_KEYS, sort=False, as_index=False)['n'].sum()
+        delta = delta[delta['n'] != 0]
+        if delta.empty:
+            return
+        if self._index is None:
+            self._index = pd.MultiIndex.from_frame(self._cells[CELL_KEYS])
+        positions = self._index.get_indexer(pd.MultiIndex.from_frame(delta[CELL_KEYS]))
+        found = positions >= 0
+
+        counts = self._cells['n'].to_numpy().copy()
+        counts[positions[found]] += delta['n'].to_numpy()[found]
+        cells = self._cells.assign(n=counts)
+        if not found.all():
+            cells = pd.concat([cells, delta[~found]], ignore_index=True)
+        if (counts == 0).any() or not found.all():
+            self._index = None
+        self._cells = cells[cells['n'] != 0].reset_index(drop=True) if (counts == 0).any() else cells
+
+    def _reset(self, df):
+        self._cells, self._index = self._empty_cells(), None
+        self._tests, self._staff = {}, {}
+        self._stats['skipped'] = self._stats['invalid'] = 0
+        self._apply(self._cell_rows(df, 1))
+        self._version += 1
+        self._queries = {}
+
+    def _update(self, removed, added):
+        self._apply(pd.concat([self._cell_rows(removed, -1), self._cell_rows(added, 1)], ignore_index=True))
+        self._version += 1
+        self._queries = {}
+
+    # ---- query ----
+
+    def summary(self, start=None, end=None, test_type=None, lab_staff_id=None, limit=10):
+        """
+        p50/p90/p99 turnaround (hari) keseluruhan, per test_type dan per staff
+        lab untuk tes yang dijadwalkan di [start, end] (inklusif, None = terbuka).
+        by_staff diurutkan dari p90 terlama, dibatasi `limit` staff.
+        """
+        key = (start, end, test_type, lab_staff_id, limit)
+        with self._lock:
+            self._stats['queries'] += 1
+            cached = self._queries.get((self._version, key))
+            if cached is not None:
+                self._stats['query_cache_hits'] += 1
+                return cached
+            version, cells = self._version, self._cells
+            tests = {code: name for name, code in self._tests.items()}
+            staff = {code: name for name, code in self._staff.items()}
+            test_code = self._tests.get(test_type, -1) if test_type is not None else None
+            staff_code = self._staff.get(lab_staff_id, -1) if lab_staff_id is not None else None
+
+        mask = np.ones(len(cells), dtype=bool)
+        if start is not None:
+            mask &= cells['day'].to_numpy() >= np.datetime64(start, 'D').astype(np.int64)
+        if end is not None:
+            mask &= cells['day'].to_numpy() <= np.datetime64(end, 'D').astype(np.int64)
+        if test_code is not None:
+            mask &= cells['test'].to_numpy() == test_code
+        if staff_code is not None:
+            mask &= cells['staff'].to_numpy() == staff_code
+        selected = cells[mask]
+        open_mask = selected['bucket'] == PENDING_BUCKET
+        done, pending = selected[~open_mask], selected[open_mask]
+
+        overall = _group_quantiles(done.assign(all=0), 'all')
+        by_test = _group_quantiles(done, 'test')
+        by_staff = _group_quantiles(done, 'staff')
+        pending_test = pending.groupby('test')['n'].sum()
+        pending_staff = pending.groupby('staff')['n'].sum()
+
+        by_staff = by_staff.sort_values(['p90', 'count'], ascending=[False, False]).head(limit)
+        result = {
+            'overall': _format_row(overall.iloc[0], pending['n'].sum()) if len(overall) else None,
+            'by_test_type': {tests[code]: _format_row(row, pending_test.get(code, 0))
+                             for code, row in by_test.sort_index().iterrows()},
+            'slowest_staff': {staff[code]: _format_row(row, pending_staff.get(code, 0))
+                              for code, row in by_staff.iterrows()},
+            'pending_tests': int(pending['n'].sum()),
+            'sla_days': LAB_SLA_DAYS,
+            'relative_accuracy': TURNAROUND_ACCURACY,
+        }
+        with self._lock:
+            if version == self._version:
+                if len(self._queries) >= QUERY_CACHE_SIZE:
+                    self._queries.pop(next(iter(self._queries)))
+                self._queries[(version, key)] = result
+        return result
+
+    def stats(self):
+        with self._lock:
+            cells = self._cells
+            return {
+                **self._stats,
+                'tests': int(cells['n'].sum()),
+                'cells': len(cells),
+                'test_types': len(self._tests),
+                'lab_staff': len(self._staff),
+                'cells_bytes': int(cells.memory_usage(index=False).sum()),
+                'relative_accuracy': TURNAROUND_ACCURACY,
+            }
+
+
+lab_turnaround = LabTurnaroundIndex()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# ------------------------------
+# NORMALISASI NILAI STATUS / HARI / BOOLEAN
+# ------------------------------
+# Sumber data tidak konsisten menulis nilai yang artinya sama: result_status
+# lab berisi 'Selesai' padahal app membandingkan 'Completed', active staff bisa
+# 'True' / '1' / 1 tergantung driver, hari jadwal bisa 'Rabu' atau 'Wednesday'.
+# Setiap kolom seperti itu punya Vocabulary: daftar nilai kanonik + alias.
+#
+# normalize() memetakan kolom ke categorical dengan kategori tetap (kode int8):
+# lookup hanya dijalankan sekali per nilai unik (kategori / hasil factorize),
+# lalu kode baris diambil lewat satu indexing numpy. Nilai yang tidak dikenal
+# tidak dibuang, tapi ditambahkan sebagai kategori ekstra di belakang.
+#
+# mask() membandingkan kode integer, bukan string, dan tetap benar walaupun
+# urutan kategori berubah (mis. setelah union_categoricals di delta_loader).
+# Filter SQL memakai spellings(): semua ejaan mentah yang dipetakan ke satu
+# nilai kanonik, untuk klausa IN (...).
+
+
+class Vocabulary:
+    def __init__(self, name, canonical, aliases=None):
+        self.name = name
+        self.categories = list(canonical)
+        self.dtype = pd.CategoricalDtype(self.categories)
+        self._lookup = {value.lower(): value for value in self.categories}
+        self._spellings = {value: {value, value.lower()} for value in self.categories}
+        for raw, value in (aliases or {}).items():
+            self._lookup[raw.lower()] = value
+            self._spellings[value].update({raw, raw.lower(), raw.capitalize()})
+
+    def canonical(self, value):
+        """Nilai mentah -> nilai kanonik; None kalau tidak dikenal / kosong"""
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return None
+        return self._lookup.get(str(value).strip().lower())
+
+    def spellings(self, value):
+        """Semua ejaan mentah untuk nilai kanonik `value` (untuk SQL IN)"""
+        return sorted(self._spellings.get(value, {value}))
+
+    def normalize(self, values):
+        """Series mentah -> categorical berkategori tetap (+ nilai tak dikenal di belakang)"""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values, use_na_sentinel=True)
+
+        categories = list(self.categories)
+        lookup = np.empty(len(uniques) + 1, dtype=np.int64)
+        lookup[-1] = -1  # kode -1 (NaN) tetap NaN
+        for i, raw in enumerate(uniques):
+            value = self.canonical(raw)
+            if value is None:
+                value = str(raw).strip()
+                if value not in categories:
+                    categories.append(value)
+            lookup[i] = categories.index(value)
+
+        dtype = self.dtype if len(categories) == len(self.categories) else pd.CategoricalDtype(categories)
+        return pd.Series(pd.Categorical.from_codes(lookup[codes], dtype=dtype),
+                         index=values.index, name=values.name)
+
+    def mask(self, values, value):
+        """Boolean mask values == nilai kanonik `value`, dibandingkan lewat kode kategori"""
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = self.normalize(values)
+        code = values.cat.categories.get_indexer([value])[0]
+        if code < 0:
+            return np.zeros(len(values), dtype=bool)
+        return values.cat.codes.to_numpy() == code
+
+    def count(self, values, value):
+        return int(self.mask(values, value).sum())
+
+
+LAB_STATUS = Vocabulary('result_status', ['Pending', 'Completed', 'Cancelled'], {
+    'Selesai': 'Completed', 'Done': 'Completed', 'Finished': 'Completed',
+    'Menunggu': 'Pending', 'Proses': 'Pending', 'Diproses': 'Pending', 'In Progress': 'Pending',
+    'Batal': 'Cancelled', 'Dibatalkan': 'Cancelled', 'Canceled': 'Cancelled',
+})
+
+SCHEDULE_DAY = Vocabulary('schedule_day', ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu'], {
+    'Monday': 'Senin', 'Tuesday': 'Selasa', 'Wednesday': 'Rabu', 'Thursday': 'Kamis',
+    'Friday': 'Jumat', 'Saturday': 'Sabtu', 'Sunday': 'Minggu', "Jum'at": 'Jumat',
+})
+
+# active staff disimpan sebagai 'True'/'False' (lihat schema.py); 'Active'/'Inactive'
+# adalah nilai filter staff_status di UI
+STAFF_ACTIVE = Vocabulary('active', ['True', 'False'], {
+    '1': 'True', 'Yes': 'True', 'Ya': 'True', 'Aktif': 'True', 'Active': 'True',
+    '0': 'False', 'No': 'False', 'Tidak': 'False', 'Nonaktif': 'False', 'Inactive': 'False',
+})
+
+# Kolom yang dinormalisasi setiap kali tabel dimuat (data_source.read_table)
+NORMALIZED_COLUMNS = {
+    'lab_tests': {'result_status': LAB_STATUS},
+    'doctor_schedule': {'schedule_day': SCHEDULE_DAY},
+    'staff': {'active': STAFF_ACTIVE},
+}
+
+
+def normalize_frame(df, table):
+    """Ganti kolom NORMALIZED_COLUMNS[table] di `df` dengan nilai kanonik"""
+    for col, vocabulary in NORMALIZED_COLUMNS.get(table, {}).items():
+        if col in df.columns:
+            df[col] = vocabulary.normalize(df[col])
+    return df
+
+
+def canonical_counts(vocabulary, pairs):
+    """[(nilai mentah, jumlah)] hasil GROUP BY -> {nilai kanonik: jumlah}"""
+    counts = {}
+    for raw, count in pairs:
+        if raw is None:
+            continue
+        value = vocabulary.canonical(raw) or str(raw).strip()
+        counts[value] = counts.get(value, 0) + count
+    return counts
@@ -0,0 +1,111 @@
+import math
+import threading
+import weakref
+
+import numpy as np
+
+from flask import request, url_for
+
+# ------------------------------
+# SERVER-SIDE PAGINATION
+# ------------------------------
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+# Urutan sort disimpan per frame: frame dari loader ber-cache adalah objek yang
+# sama antar-request, jadi sort_values cukup sekali per (frame, kolom, arah).
+# Entry hilang bersama frame-nya (weakref), batas jumlah hanya untuk jaga-jaga.
+MAX_SORT_ORDERS = 64
+
+_sort_orders = {}  # id(df) -> (weakref df, {(kolom, ascending): posisi})
+_sort_lock = threading.Lock()
+
+
+def _int_arg(args, name, default):
+    try:
+        return int(args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_page_args(args, columns, default_sort=None):
+    """Baca page, page_size, sort dan order dari query string (sort hanya kolom yang dikenal)"""
+    page = max(_int_arg(args, 'page', 1), 1)
+    page_size = min(max(_int_arg(args, 'page_size', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    sort = args.get('sort') or default_sort
+    if sort not in columns:
+        sort = default_sort if default_sort in columns else None
+    order = 'desc' if args.get('order') == 'desc' else 'asc'
+    return page, page_size, sort, order
+
+
+def _page_url(page):
+    args = request.args.to_dict()
+    args['page'] = page
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def _forget(key):
+    with _sort_lock:
+        _sort_orders.pop(key, None)
+
+
+def sort_positions(df, sort, ascending):
+    """Posisi baris `df` terurut menurut kolom `sort` (stable, NaN di akhir); di-memo per frame"""
+    key = id(df)
+    with _sort_lock:
+        entry = _sort_orders.get(key)
+        if entry is not None and entry[0]() is df:
+            positions = entry[1].get((sort, ascending))
+            if positions is not None:
+                return positions
+
+    column = df[sort].reset_index(drop=True)
+    positions = column.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy(np.intp)
+
+    with _sort_lock:
+        entry = _sort_orders.get(key)
+        if entry is None or entry[0]() is not df:
+            if len(_sort_orders) >= MAX_SORT_ORDERS:
+                _sort_orders.pop(next(iter(_sort_orders)))
+            entry = (weakref.ref(df, lambda _, key=key: _forget(key)), {})
+            _sort_orders[key] = entry
+        entry[1][(sort, ascending)] = positions
+    return positions
+
+
+def paginate_frame(df, args, default_sort=None, columns=None):
+    """
+    Ambil satu halaman dari DataFrame yang sudah difilter.
+    `columns` membatasi kolom halaman (dan kolom yang boleh di-sort) tanpa membuat
+    frame baru, supaya urutan sort frame cache tetap bisa dipakai ulang.
+    Return (page_df, pagination) -- pagination berisi page, page_size, total,
+    total_pages, sort, order, serta prev_url/next_url untuk navigasi template.
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+    page, page_size, sort, order = get_page_args(args, columns, default_sort)
+
+    total = len(df)
+    total_pages = max(math.ceil(total / page_size), 1)
+    page = min(page, total_pages)
+
+    start = (page - 1) * page_size
+    if sort:
+        rows = sort_positions(df, sort, order == 'asc')[start:start + page_size]
+    else:
+        rows = slice(start, start + page_size)
+    page_df = df.iloc[rows][columns]
+
+    pagination = {
+        'page': page,
+        'page_size': page_size,
+        'total': total,
+        'total_pages': total_pages,
+        'sort': sort,
+        'order': order,
+        'has_prev': page > 1,
+        'has_next': page < total_pages,
+        'prev_url': _page_url(page - 1) if page > 1 else None,
+        'next_url': _page_url(page + 1) if page < total_pages else None,
+    }
+    return page_df, pagination
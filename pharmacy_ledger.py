@@ -0,0 +1,354 @@
+import os
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalIndex
+
+# ------------------------------
+# LEDGER STOK FARMASI + INDEX KEDALUWARSA FEFO
+# ------------------------------
+# Setiap baris pharmacy_stock adalah satu batch (drug_id) milik satu drug_name.
+# Stok batch tidak lagi dihitung ulang dari frame setiap request, tapi dari
+# ledger event-sourced:
+#   - balance[batch]   saldo terkini (int64), diubah hanya lewat event
+#   - log event        append-only (seq, waktu, batch, qty bertanda, jenis):
+#                      'reconcile' (selisih dengan tabel), 'dispense', 'adjust'
+#   - snapshot         salinan balance setiap SNAPSHOT_EVENTS event; stok pada
+#                      waktu lampau = snapshot terakhir sebelum waktu itu + replay
+#                      event sesudahnya. Hanya SNAPSHOTS_KEPT snapshot disimpan,
+#                      event yang lebih tua dari snapshot tertua dibuang.
+#
+# Index FEFO (first-expiry-first-out): urutan batch per (drug, expiry_date),
+# dengan offset awal tiap drug. Dispense mengambil dari batch belum kedaluwarsa
+# dengan expiry paling dekat (alokasi cumsum vektor, bukan loop per batch).
+# Urutan global per expiry_date membuat daftar "kedaluwarsa <= N hari" cukup
+# satu searchsorted.
+#
+# sync(frame) mengikuti frame pharmacy_stock dari cache (lihat incremental.py):
+# saldo batch yang barisnya berubah disamakan dengan stock_in - stock_out di
+# tabel lewat event 'reconcile' (tabel tetap sumber kebenaran; dispense yang
+# sudah tersimpan ke DB menghasilkan selisih 0). Build ulang juga hanya
+# reconcile; log event tidak pernah dikosongkan.
+
+LOW_STOCK_UNITS = int(os.environ.get('PHARMACY_LOW_STOCK_UNITS', 5))   # per batch, sama dengan load_pharmacy_data
+REORDER_LEVEL = int(os.environ.get('PHARMACY_REORDER_LEVEL', 100))     # stok layak pakai per drug
+EXPIRY_WINDOW_DAYS = int(os.environ.get('PHARMACY_EXPIRY_WINDOW_DAYS', 30))
+SNAPSHOT_EVENTS = int(os.environ.get('PHARMACY_SNAPSHOT_EVENTS', 5000))
+SNAPSHOTS_KEPT = int(os.environ.get('PHARMACY_SNAPSHOTS_KEPT', 24))
+
+EVENT_KINDS = ('reconcile', 'dispense', 'adjust')
+RECONCILE, DISPENSE, ADJUST = range(len(EVENT_KINDS))
+NO_EXPIRY = np.iinfo(np.int64).max
+
+
+class InsufficientStock(ValueError):
+    """Stok layak pakai drug tidak cukup untuk dispense"""
+
+
+def _day(value=None):
+    """date/Timestamp -> hari sejak epoch (int); None = hari ini"""
+    return int(np.datetime64(value or date.today(), 'D').astype(np.int64))
+
+
+def _format_day(days):
+    return None if days == NO_EXPIRY else str(np.datetime64(int(days), 'D'))
+
+
+class PharmacyLedger(IncrementalIndex):
+    TABLE = 'pharmacy_stock'
+    HASH_COLUMNS = ['drug_id', 'drug_name', 'stock_in', 'stock_out', 'expiry_date']
+
+    def __init__(self):
+        super().__init__()
+        self._ids = pd.Index([], dtype=object)   # drug_id per batch
+        self._drug = np.array([], dtype=np.int32)
+        self._expiry = np.array([], dtype=np.int64)
+        self._balance = np.array([], dtype=np.int64)
+        self._active = np.array([], dtype=bool)   # batch masih ada di tabel
+        self._drugs = {}                           # drug_name -> kode
+        self._fefo = self._offsets = self._by_expiry = None
+
+        # log event (kolom numpy, tumbuh 2x) mulai dari seq self._base
+        self._events = {name: np.empty(1024, dtype=dtype) for name, dtype in (
+            ('time', np.float64), ('batch', np.int32), ('qty', np.int64), ('kind', np.int8))}
+        self._base = 0
+        self._seq = 0
+        self._snapshots = []                       # [(seq, waktu, balance)]
+
+        self._summaries = {}
+        self._stats.update({'reconciled_batches': 0, 'added_batches': 0, 'removed_batches': 0,
+                            'dispenses': 0, 'dispensed_units': 0, 'rejected': 0})
+
+    # ---- log event & snapshot ----
+
+    def _append(self, batches, qtys, kind, now=None):
+        """Catat event (batch, qty) lalu terapkan ke balance"""
+        batches = np.asarray(batches, dtype=np.int32)
+        qtys = np.asarray(qtys, dtype=np.int64)
+        keep = qtys != 0
+        batches, qtys = batches[keep], qtys[keep]
+        if not len(batches):
+            return
+        start, end = self._seq - self._base, self._seq - self._base + len(batches)
+        if end > len(self._events['time']):
+            size = max(end, 2 * len(self._events['time']))
+            for name, column in self._events.items():
+                grown = np.empty(size, dtype=column.dtype)
+                grown[:start] = column[:start]
+                self._events[name] = grown
+        self._events['time'][start:end] = now or time.time()
+        self._events['batch'][start:end] = batches
+        self._events['qty'][start:end] = qtys
+        self._events['kind'][start:end] = kind
+        np.add.at(self._balance, batches, qtys)
+        self._seq += len(batches)
+        self._summaries = {}
+
+        if self._seq - self._snapshots[-1][0] >= SNAPSHOT_EVENTS:
+            self._snapshot()
+
+    def _snapshot(self):
+        self._snapshots.append((self._seq, time.time(), self._balance.copy()))
+        if len(self._snapshots) > SNAPSHOTS_KEPT:
+            self._snapshots.pop(0)
+            # Event sebelum snapshot tertua tidak bisa di-replay lagi: buang
+            oldest = self._snapshots[0][0]
+            for column in self._events.values():
+                column[:self._seq - oldest] = column[oldest - self._base:self._seq - self._base].copy()
+            self._base = oldest
+
+    # ---- sinkron dengan tabel ----
+
+    def _rebuild_order(self):
+        # FEFO: per drug, expiry terdekat dulu (tanpa expiry paling akhir), lalu urutan batch
+        self._fefo = np.lexsort((np.arange(len(self._drug)), self._expiry, self._drug))
+        self._offsets = np.searchsorted(self._drug[self._fefo], np.arange(len(self._drugs) + 1))
+        self._by_expiry = np.argsort(self._expiry, kind='stable')
+
+    def _batch_columns(self, df):
+        names = df['drug_name'].astype(object).where(df['drug_name'].notna(), '-')
+        for name in pd.unique(names):
+            self._drugs.setdefault(name, len(self._drugs))
+        expiry = pd.to_datetime(df['expiry_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+        expiry_days = np.where(np.isnat(expiry), NO_EXPIRY, expiry.astype(np.int64))
+        stock = (pd.to_numeric(df['stock_in'], errors='coerce').fillna(0)
+                 - pd.to_numeric(df['stock_out'], errors='coerce').fillna(0)).to_numpy(dtype=np.int64)
+        return names.map(self._drugs).to_numpy(dtype=np.int32), expiry_days, stock
+
+    def _reconcile(self, df, gone):
+        """
+        Samakan saldo batch di `df` dengan stok tabel lewat event 'reconcile'
+        (batch baru ditambahkan dengan saldo awal 0). Batch aktif di posisi
+        `gone` yang tidak ada di `df` dianggap hilang dari tabel: saldo jadi 0.
+        """
+        df = df.drop_duplicates('drug_id', keep='last')
+        positions = self._ids.get_indexer(df['drug_id'].astype(object))
+        new = positions < 0
+        if new.any():
+            n, count = len(self._ids), int(new.sum())
+            self._ids = self._ids.append(pd.Index(df['drug_id'][new].astype(object)))
+            self._drug = np.concatenate([self._drug, np.zeros(count, dtype=np.int32)])
+            self._expiry = np.concatenate([self._expiry, np.zeros(count, dtype=np.int64)])
+            self._balance = np.concatenate([self._balance, np.zeros(count, dtype=np.int64)])
+            self._active = np.concatenate([self._active, np.zeros(count, dtype=bool)])
+            positions[new] = np.arange(n, n + count)
+        if not self._snapshots:
+            self._snapshots.append((self._seq, time.time(), self._balance.copy()))
+
+        drug, expiry, stock = self._batch_columns(df)
+        reorder = new.any() or not np.array_equal(self._expiry[positions], expiry) \
+            or not np.array_equal(self._drug[positions], drug)
+        self._drug[positions], self._expiry[positions] = drug, expiry
+        self._active[positions] = True
+        reconciled = int((~new & (stock != self._balance[positions])).sum())
+        self._append(positions, stock - self._balance[positions], RECONCILE)
+
+        gone = np.setdiff1d(gone, positions)
+        gone = gone[self._active[gone]]
+        self._active[gone] = False
+        self._append(gone, -self._balance[gone], RECONCILE)
+
+        if reorder or self._fefo is None:
+            self._rebuild_order()
+        self._summaries = {}
+        self._stats['added_batches'] += int(new.sum())
+        self._stats['reconciled_batches'] += reconciled
+        self._stats['removed_batches'] += len(gone)
+
+    def _reset(self, df):
+        self._reconcile(df, np.flatnonzero(self._active))
+
+    def _update(self, removed, added):
+        gone = self._ids.get_indexer(removed['drug_id'].astype(object))
+        self._reconcile(added, gone[gone >= 0])
+
+    # ---- dispense ----
+
+    def dispense(self, drug_name, quantity, today=None):
+        """
+        Keluarkan `quantity` unit `drug_name` secara FEFO dari batch yang belum
+        kedaluwarsa. Return list (drug_id, qty, expiry) per batch yang dipakai.
+        KeyError kalau drug tidak dikenal, InsufficientStock kalau stok kurang.
+        """
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise ValueError("quantity harus > 0")
+        with self._lock:
+            if drug_name not in self._drugs:
+                raise KeyError(drug_name)
+            code = self._drugs[drug_name]
+            batches = self._fefo[self._offsets[code]:self._offsets[code + 1]]
+            # Batch sudah urut expiry di dalam drug: lewati yang kedaluwarsa
+            batches = batches[np.searchsorted(self._expiry[batches], _day(today)):]
+            balance = np.maximum(self._balance[batches], 0)
+            taken_before = np.cumsum(balance) - balance
+            take = np.clip(quantity - taken_before, 0, balance)
+            if take.sum() < quantity:
+                self._stats['rejected'] += 1
+                raise InsufficientStock(
+                    f"Stok {drug_name} tidak cukup: diminta {quantity}, tersedia {int(balance.sum())}")
+
+            used = np.flatnonzero(take)
+            self._append(batches[used], -take[used], DISPENSE)
+            self._stats['dispenses'] += 1
+            self._stats['dispensed_units'] += quantity
+            return [(self._ids[b], int(q), _format_day(self._expiry[b]))
+                    for b, q in zip(batches[used], take[used])]
+
+    def adjust(self, allocations):
+        """Event koreksi (mis. kembalikan dispense yang gagal disimpan): [(drug_id, qty)]"""
+        with self._lock:
+            batches = self._ids.get_indexer([drug_id for drug_id, _ in allocations])
+            qtys = np.array([qty for _, qty in allocations], dtype=np.int64)
+            self._append(batches[batches >= 0], qtys[batches >= 0], ADJUST)
+
+    # ---- query ----
+
+    def balances(self, drug_ids):
+        """Saldo ledger untuk daftar drug_id (None kalau tidak dikenal)"""
+        with self._lock:
+            positions = self._ids.get_indexer(pd.Index(drug_ids).astype(object))
+            balance = self._balance[np.maximum(positions, 0)] if len(self._balance) else np.zeros(len(positions))
+        return [int(b) if p >= 0 else None for p, b in zip(positions, balance)]
+
+    def summary(self, days=EXPIRY_WINDOW_DAYS, today=None, limit=50):
+        """
+        Stok per drug (total, layak pakai, batch, expiry terdekat), batch yang
+        kedaluwarsa <= `days` hari lagi (termasuk yang sudah lewat, saldo > 0)
+        dan alert stok rendah. Di-cache sampai event berikutnya.
+        """
+        today = _day(today)
+        key = (days, today, limit)
+        with self._lock:
+            cached = self._summaries.get(key)
+            if cached is not None:
+                return cached
+            seq = self._seq
+            # sync mengubah array ini in-place: salin di bawah lock
+            drug, expiry, balance = self._drug.copy(), self._expiry.copy(), self._balance.copy()
+            active, ids, by_expiry = self._active.copy(), self._ids, self._by_expiry
+            names = list(self._drugs)
+
+        held = active & (balance > 0)
+        usable = held & (expiry >= today)
+        n = len(names)
+        total = np.bincount(drug[held], weights=balance[held], minlength=n)
+        usable_total = np.bincount(drug[usable], weights=balance[usable], minlength=n)
+        batches = np.bincount(drug[usable], minlength=n)
+        next_expiry = np.full(n, NO_EXPIRY, dtype=np.int64)
+        np.minimum.at(next_expiry, drug[usable], expiry[usable])
+
+        # Urutan global per expiry: batch kedaluwarsa <= today + days cukup satu searchsorted
+        if by_expiry is None:
+            by_expiry = np.array([], dtype=np.intp)
+        window = by_expiry[:np.searchsorted(expiry[by_expiry], today + days, side='right')]
+        window = window[held[window]]
+        window_stock = np.bincount(drug[window], weights=balance[window], minlength=n)
+        window_batches = np.bincount(drug[window], minlength=n)
+        window_first = np.full(n, NO_EXPIRY, dtype=np.int64)
+        np.minimum.at(window_first, drug[window], expiry[window])
+        expiring = [{'drug_name': names[c], 'current_stock': int(window_stock[c]),
+                     'batches': int(window_batches[c]), 'earliest_expiry': _format_day(window_first[c])}
+                    for c in np.argsort(window_first, kind='stable') if window_batches[c]]
+
+        current = active & (balance <= LOW_STOCK_UNITS)
+        result = {
+            'as_of_seq': seq,
+            'drugs': {names[c]: {
+                'stock': int(total[c]), 'usable_stock': int(usable_total[c]),
+                'batches': int(batches[c]),
+                'next_expiry': _format_day(next_expiry[c]),
+            } for c in range(n) if names[c] != '-'},
+            'expiring': expiring,
+            'expiring_batches': [{
+                'drug_id': ids[b], 'drug_name': names[drug[b]], 'current_stock': int(balance[b]),
+                'expiry_date': _format_day(expiry[b]), 'expired': bool(expiry[b] < today),
+            } for b in window[:limit]],
+            'expiring_batch_count': len(window),
+            'low_stock_drugs': sorted(names[c] for c in range(n)
+                                      if names[c] != '-' and usable_total[c] <= REORDER_LEVEL),
+            'batch_counts': {
+                'total': int(active.sum()),
+                'in_stock': int((active & (balance > LOW_STOCK_UNITS)).sum()),
+                'low_stock': int((current & (balance > 0)).sum()),
+                'out_of_stock': int((active & (balance <= 0)).sum()),
+            },
+            'window_days': days,
+            'reorder_level': REORDER_LEVEL,
+        }
+        with self._lock:
+            if seq == self._seq:
+                self._summaries[key] = result
+        return result
+
+    def stock_at(self, when):
+        """
+        Stok per drug pada waktu `when` (datetime): snapshot terakhir sebelum
+        `when` + replay event sesudahnya. ValueError kalau di luar retensi.
+        """
+        ts = when.timestamp()
+        with self._lock:
+            candidates = [snap for snap in self._snapshots if snap[1] <= ts]
+            if not candidates:
+                raise ValueError("Waktu di luar retensi snapshot ledger")
+            seq, _, balance = candidates[-1]
+            start, end = seq - self._base, self._seq - self._base
+            times = self._events['time'][start:end]
+            replay = times <= ts
+            batches = self._events['batch'][start:end][replay]
+            qtys = self._events['qty'][start:end][replay]
+            state = np.zeros(len(self._balance), dtype=np.int64)
+            state[:len(balance)] = balance
+            drug, names = self._drug, list(self._drugs)
+        np.add.at(state, batches, qtys)
+        totals = np.bincount(drug, weights=np.maximum(state, 0), minlength=len(names))
+        return {
+            'at': when.isoformat(timespec='seconds'),
+            'from_snapshot_seq': seq,
+            'replayed_events': int(replay.sum()),
+            'drugs': {name: int(totals[c]) for c, name in enumerate(names) if name != '-'},
+        }
+
+    def stats(self):
+        with self._lock:
+            kinds = np.bincount(self._events['kind'][:self._seq - self._base], minlength=len(EVENT_KINDS))
+            return {
+                **self._stats,
+                'batches': int(self._active.sum()),
+                'drugs': len(self._drugs),
+                'events': self._seq,
+                'events_retained': self._seq - self._base,
+                'events_by_kind': dict(zip(EVENT_KINDS, map(int, kinds))),
+                'snapshots': len(self._snapshots),
+                'snapshot_every': SNAPSHOT_EVENTS,
+                'oldest_snapshot': datetime.fromtimestamp(self._snapshots[0][1]).isoformat(timespec='seconds')
+                if self._snapshots else None,
+                'ledger_bytes': int(sum(column.nbytes for column in self._events.values())
+                                    + sum(snap[2].nbytes for snap in self._snapshots)),
+            }
+
+
+pharmacy_ledger = PharmacyLedger()
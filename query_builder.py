@@ -0,0 +1,315 @@
+from datetime import date, datetime
+
+from normalize import LAB_STATUS, SCHEDULE_DAY, STAFF_ACTIVE
+
+# ------------------------------
+# QUERY BUILDER UNTUK FILTER TAB
+# ------------------------------
+# Filter dari request.args diterjemahkan menjadi WHERE clause yang
+# terparameterisasi, sehingga MySQL hanya mengirim baris yang cocok.
+#
+# Format spec: (nama argumen, kolom, operator)
+#   '='          kolom = nilai
+#   '>=' / '<='  range (tanggal 'YYYY-MM-DD')
+#   'like'       substring, case-insensitive; kolom boleh tuple (di-OR)
+#   'status'     Active/Inactive -> kolom active 'True'/'False'
+#   'lab_status' / 'day'
+#                nilai kanonik (normalize.py) -> semua ejaan mentahnya (IN)
+#   'age_group'  label kelompok umur -> range birth_date
+FILTER_SPECS = {
+    'doctor_schedule': [
+        ('specialization', 'specialization', '='),
+        ('day', 'schedule_day', 'day'),
+        ('search_doctor', 'name', 'like'),
+        ('room_id', 'room_id', '='),
+    ],
+    'rooms': [],
+    'pharmacy_stock': [],
+    'patients': [
+        ('gender', 'gender', '='),
+        ('payment_type', 'payment_type', '='),
+        ('age_group', 'birth_date', 'age_group'),
+        ('search_patient', ('name', 'patient_id'), 'like'),
+    ],
+    'lab_tests': [
+        ('test_type', 'lt.test_type', '='),
+        ('result_status', 'lt.result_status', 'lab_status'),
+        ('start_date', 'lt.scheduled_date', '>='),
+        ('end_date', 'lt.scheduled_date', '<='),
+    ],
+    'staff': [
+        ('staff_role', 'role', '='),
+        ('staff_department', 'department', '='),
+        ('staff_status', 'active', 'status'),
+        ('search_staff', ('name', 'staff_id'), 'like'),
+    ],
+    'finance': [
+        ('entry_type', 'entry_type', '='),
+        ('service_type', 'service_type', '='),
+        ('payment_type', 'payment_type', '='),
+        ('start_date', 'transaction_date', '>='),
+        ('end_date', 'transaction_date', '<='),
+    ],
+    'registrations': [
+        ('department', 'department', '='),
+        ('status', 'status', '='),
+        ('start_date', 'visit_date', '>='),
+        ('end_date', 'visit_date', '<='),
+    ],
+    'patient_trends': [],
+}
+
+BASE_QUERIES = {
+    'doctor_schedule': "SELECT * FROM doctor_schedule",
+    'rooms': "SELECT * FROM rooms",
+    'pharmacy_stock': "SELECT * FROM pharmacy_stock",
+    'patients': "SELECT * FROM patients",
+    'lab_tests': """
+        SELECT lt.*, p.name as patient_name
+        FROM lab_tests lt
+        LEFT JOIN patients p ON lt.patient_id = p.patient_id
+        """,
+    'staff': "SELECT * FROM staff",
+    'finance': "SELECT * FROM finance",
+    'registrations': "SELECT * FROM registrations",
+    'patient_trends': "SELECT * FROM patient_trends",
+}
+
+# Operator filter yang nilainya dinormalisasi lewat Vocabulary
+VOCABULARY_OPS = {
+    'status': STAFF_ACTIVE,
+    'lab_status': LAB_STATUS,
+    'day': SCHEDULE_DAY,
+}
+
+# Batas umur (tahun) per kelompok, sama dengan categorize_age di load_patient_data
+AGE_GROUP_BOUNDS = {
+    'Anak (<18)': (0, 18),
+    'Dewasa Muda (18-39)': (18, 40),
+    'Dewasa (40-59)': (40, 60),
+    'Lansia (60+)': (60, None),
+}
+
+# Index pendukung untuk kolom yang difilter (dibuat lewat `python query_builder.py`)
+INDEXES = [
+    "CREATE INDEX idx_finance_date ON finance (transaction_date)",
+    "CREATE INDEX idx_finance_payment_date ON finance (payment_type, transaction_date)",
+    "CREATE INDEX idx_finance_service_date ON finance (service_type, transaction_date)",
+    "CREATE INDEX idx_finance_entry_date ON finance (entry_type, transaction_date)",
+    "CREATE INDEX idx_lab_scheduled ON lab_tests (scheduled_date)",
+    "CREATE INDEX idx_lab_type_scheduled ON lab_tests (test_type, scheduled_date)",
+    "CREATE INDEX idx_lab_status_scheduled ON lab_tests (result_status, scheduled_date)",
+    "CREATE INDEX idx_lab_patient ON lab_tests (patient_id)",
+    "CREATE INDEX idx_patients_gender ON patients (gender)",
+    "CREATE INDEX idx_patients_payment ON patients (payment_type)",
+    "CREATE INDEX idx_patients_birth ON patients (birth_date)",
+    "CREATE INDEX idx_staff_role ON staff (role)",
+    "CREATE INDEX idx_staff_department ON staff (department)",
+    "CREATE INDEX idx_staff_active ON staff (active)",
+    "CREATE INDEX idx_lab_result ON lab_tests (result_date)",
+    "CREATE INDEX idx_rooms_updated ON rooms (last_updated)",
+    "CREATE INDEX idx_pharmacy_stock_date ON pharmacy_stock (stock_date)",
+    "CREATE INDEX idx_registrations_visit ON registrations (visit_date)",
+    "CREATE INDEX idx_registrations_department_visit ON registrations (department, visit_date)",
+]
+
+# Kolom tanggal untuk load incremental (lihat delta_loader.py): baris dengan
+# salah satu kolom >= high-water mark-nya dianggap baru/berubah
+DELTA_COLUMNS = {
+    'rooms': ('last_updated',),
+    'finance': ('transaction_date',),
+    'lab_tests': ('lt.scheduled_date', 'lt.result_date'),
+    'pharmacy_stock': ('stock_date',),
+    'registrations': ('visit_date',),
+}
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' -> date; None kalau formatnya tidak valid"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def filter_args(table, args):
+    """
+    Ambil argumen filter yang aktif untuk `table` sebagai tuple (hashable, dipakai
+    sebagai cache key). Tanggal range yang tidak valid dibuang, bukan dikirim ke SQL.
+    """
+    active = []
+    for arg, _, op in FILTER_SPECS[table]:
+        value = (args.get(arg) or '').strip()
+        if op in ('>=', '<=') and value:
+            value = parse_date(value)
+            value = value.isoformat() if value else ''
+        if value and value != 'All':
+            active.append((arg, value))
+    return tuple(active)
+
+
+def _years_before(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 Februari
+        return today.replace(year=today.year - years, day=28)
+
+
+def _like_pattern(value):
+    # '!' sebagai escape char supaya sama di MySQL dan engine lain
+    escaped = value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+    return f"%{escaped}%"
+
+
+def build_where(table, filters, today=None):
+    """Return (where_sql, params). where_sql kosong kalau tidak ada filter"""
+    specs = {arg: (column, op) for arg, column, op in FILTER_SPECS[table]}
+    clauses, params = [], []
+
+    for arg, value in filters:
+        column, op = specs[arg]
+        if op == '=':
+            clauses.append(f"{column} {op} %s")
+            params.append(value)
+        elif op in ('>=', '<='):
+            bound = parse_date(value)
+            if bound is None:
+                continue
+            clauses.append(f"{column} {op} %s")
+            params.append(bound)
+        elif op == 'like':
+            columns = column if isinstance(column, tuple) else (column,)
+            clauses.append('(' + ' OR '.join(f"{col} LIKE %s ESCAPE '!'" for col in columns) + ')')
+            params.extend([_like_pattern(value)] * len(columns))
+        elif op in VOCABULARY_OPS:
+            vocabulary = VOCABULARY_OPS[op]
+            spellings = vocabulary.spellings(vocabulary.canonical(value) or value)
+            clauses.append(f"{column} IN ({', '.join(['%s'] * len(spellings))})")
+            params.extend(spellings)
+        elif op == 'age_group':
+            if value not in AGE_GROUP_BOUNDS:
+                clauses.append("1 = 0")
+                continue
+            # umur >= N  <=>  lahir pada/sebelum tanggal hari ini N tahun lalu
+            today = today or date.today()
+            min_age, max_age = AGE_GROUP_BOUNDS[value]
+            parts = []
+            if min_age:
+                parts.append(f"{column} <= %s")
+                params.append(_years_before(today, min_age))
+            if max_age is not None:
+                parts.append(f"{column} > %s")
+                params.append(_years_before(today, max_age))
+            clause = ' AND '.join(parts)
+            if min_age == 0:
+                # birth_date kosong dihitung umur 0 oleh loader
+                clause = f"({clause} OR {column} IS NULL)"
+            clauses.append(clause)
+
+    if not clauses:
+        return '', []
+    return ' WHERE ' + ' AND '.join(clauses), params
+
+
+def build_select(table, filters=(), today=None):
+    """SELECT lengkap untuk loader `table` dengan filter yang sudah di-push down"""
+    where, params = build_where(table, filters, today)
+    return BASE_QUERIES[table].rstrip() + where, params
+
+
+def build_delta_select(table, marks):
+    """
+    SELECT baris `table` yang berubah sejak high-water mark: `marks` berisi
+    satu nilai per kolom DELTA_COLUMNS[table] (urutan sama)
+    """
+    columns = DELTA_COLUMNS[table]
+    where = ' OR '.join(f"{column} >= %s" for column in columns)
+    return BASE_QUERIES[table].rstrip() + f" WHERE {where}", list(marks)
+
+
+def build_key_select(table, column, keys):
+    """SELECT baris `table` dengan `column` di `keys` (mis. primary key yang baru di-UPDATE)"""
+    placeholders = ', '.join(['%s'] * len(keys))
+    return BASE_QUERIES[table].rstrip() + f" WHERE {column} IN ({placeholders})", list(keys)
+
+
+def _frame_column(column):
+    # 'lt.test_type' -> 'test_type' (alias hanya relevan di SQL)
+    return column.split('.', 1)[-1]
+
+
+def apply_filters(df, table, filters, today=None):
+    """
+    Padanan build_where untuk DataFrame (sumber snapshot): semantik yang
+    sama dengan WHERE clause, termasuk LIKE case-insensitive dan range umur.
+    """
+    import pandas as pd
+
+    specs = {arg: (column, op) for arg, column, op in FILTER_SPECS[table]}
+    mask = pd.Series(True, index=df.index)
+
+    for arg, value in filters:
+        column, op = specs[arg]
+        if op == '=':
+            mask &= df[_frame_column(column)] == value
+        elif op in ('>=', '<='):
+            bound = parse_date(value)
+            if bound is None:
+                continue
+            values = pd.to_datetime(df[_frame_column(column)], errors='coerce')
+            bound = pd.Timestamp(bound)
+            mask &= (values >= bound) if op == '>=' else (values <= bound)
+        elif op == 'like':
+            columns = column if isinstance(column, tuple) else (column,)
+            any_match = pd.Series(False, index=df.index)
+            for col in columns:
+                any_match |= df[_frame_column(col)].astype(str).str.contains(
+                    value, case=False, regex=False, na=False
+                )
+            mask &= any_match
+        elif op in VOCABULARY_OPS:
+            vocabulary = VOCABULARY_OPS[op]
+            mask &= vocabulary.mask(df[_frame_column(column)], vocabulary.canonical(value) or value)
+        elif op == 'age_group':
+            if value not in AGE_GROUP_BOUNDS:
+                mask &= False
+                continue
+            today = today or date.today()
+            min_age, max_age = AGE_GROUP_BOUNDS[value]
+            births = pd.to_datetime(df[_frame_column(column)], errors='coerce')
+            in_group = pd.Series(True, index=df.index)
+            if min_age:
+                in_group &= births <= pd.Timestamp(_years_before(today, min_age))
+            if max_age is not None:
+                in_group &= births > pd.Timestamp(_years_before(today, max_age))
+            if min_age == 0:
+                in_group |= births.isna()
+            mask &= in_group
+
+    return df[mask]
+
+
+def ensure_indexes(conn):
+    """Buat index di INDEXES; index yang sudah ada dilewati"""
+    cursor = conn.cursor()
+    for ddl in INDEXES:
+        try:
+            cursor.execute(ddl)
+            print(f"✅ {ddl}")
+        except Exception as e:
+            # 1061 = Duplicate key name
+            if getattr(e, 'errno', None) == 1061:
+                print(f"⏭️  Sudah ada: {ddl}")
+            else:
+                print(f"[ERROR] {ddl}: {e}")
+    cursor.close()
+
+
+if __name__ == '__main__':
+    from db_pool import get_pool
+
+    conn = get_pool().connection()
+    try:
+        ensure_indexes(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,248 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from incremental import IncrementalIndex
+from schedule_conflicts import to_minutes
+
+# ------------------------------
+# INDEX COUNTER REGISTRASI (HARI x SLOT 15 MENIT x DEPARTEMEN x STATUS)
+# ------------------------------
+# Kunjungan di registrations dihitung sekali ke kubus counter numpy:
+#   counts[hari, slot, departemen, status]
+# hari = offset dari tanggal kunjungan paling awal, slot = menit // SLOT_MINUTES.
+# Prefix sum per hari (dibangun ulang hanya setelah counter berubah) membuat
+# total range tanggal apa pun cukup satu pengurangan prefix[end + 1] - prefix[start],
+# tanpa scan tabel kunjungan. Kurva kedatangan per jam, rasio pembatalan, dan
+# beban per departemen semuanya turunan dari hasil itu.
+#
+# Index mengikuti frame registrations dari cache (lihat incremental.py).
+# Kunjungan tanpa tanggal/jam yang terbaca tidak masuk kubus
+# (dicatat di stats 'skipped'), begitu juga tanggal di luar jendela
+# [hari build - HISTORY_DAYS, hari build + FUTURE_DAYS] (stats 'out_of_range'):
+# kubus rapat per hari, jadi satu tanggal salah ketik (1900 / 2099) tidak boleh
+# membuatnya puluhan ribu hari. Delta diterapkan dengan np.add.at pada indeks
+# datar dan prefix sum hanya dihitung ulang mulai hari paling awal yang berubah,
+# jadi biayanya sebanding dengan delta, bukan ukuran kubus.
+
+SLOT_MINUTES = int(os.environ.get('REGISTRATION_SLOT_MINUTES', 15))
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+
+# Status yang dihitung sebagai pembatalan
+CANCELLED_STATUSES = ('Batal',)
+
+HISTORY_DAYS = int(os.environ.get('REGISTRATION_HISTORY_DAYS', 3650))
+FUTURE_DAYS = int(os.environ.get('REGISTRATION_FUTURE_DAYS', 366))
+
+
+def _format_slot(slot):
+    minutes = slot * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class RegistrationIndex(IncrementalIndex):
+    TABLE = 'registrations'
+    HASH_COLUMNS = ['registration_id', 'visit_date', 'visit_time', 'department', 'status']
+
+    def __init__(self):
+        super().__init__()
+        self._counts = None          # int32[hari, slot, departemen, status]
+        self._origin = None          # datetime64[D] hari ke-0
+        self._departments = {}       # nama -> kode (urutan kemunculan)
+        self._statuses = {}
+        self._prefix = None          # prefix sum per hari, dibangun saat query
+        self._daily = None           # counts dijumlah per slot: [hari, departemen, status]
+        self._dirty_from = None      # offset hari paling awal yang berubah sejak prefix dibangun
+        self._window = None          # (hari pertama, hari terakhir) yang diterima, tetap sampai rebuild
+        self._stats.update({'skipped': 0, 'out_of_range': 0, 'queries': 0})
+
+    # ---- pemeliharaan index ----
+
+    def _codes(self, values, mapping):
+        """Kode kategori untuk Series `values`; nilai baru ditambahkan ke `mapping`"""
+        filled = values.astype(object).where(values.notna(), '-')
+        for value in pd.unique(filled):
+            mapping.setdefault(value, len(mapping))
+        return filled.map(mapping).to_numpy(dtype=np.int64)
+
+    def _ensure_shape(self, first_day, last_day):
+        """Perbesar kubus supaya mencakup [first_day, last_day] dan semua kode kategori"""
+        shape = (0, SLOTS_PER_DAY, len(self._departments), len(self._statuses))
+        if self._counts is None:
+            self._origin = first_day
+            self._counts = np.zeros((int((last_day - first_day).astype(int)) + 1,) + shape[1:], dtype=np.int32)
+            return
+        end = self._origin + np.timedelta64(len(self._counts) - 1, 'D')
+        before = max(int((self._origin - first_day).astype(int)), 0)
+        after = max(int((last_day - end).astype(int)), 0)
+        pad = [(before, after), (0, 0),
+               (0, shape[2] - self._counts.shape[2]), (0, shape[3] - self._counts.shape[3])]
+        if any(p != (0, 0) for p in pad):
+            self._counts = np.pad(self._counts, pad)
+            self._origin = self._origin - np.timedelta64(before, 'D')
+            self._prefix = self._daily = None
+
+    def _apply(self, df, sign):
+        """Tambah (sign=1) / kurangi (sign=-1) kunjungan di `df` ke counter"""
+        days = pd.to_datetime(df['visit_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+        minutes = to_minutes(df['visit_time']).to_numpy()
+        valid = ~np.isnat(days) & ~np.isnan(minutes)
+        self._stats['skipped'] += int((~valid).sum()) * sign
+        in_window = (days >= self._window[0]) & (days <= self._window[1])
+        self._stats['out_of_range'] += int((valid & ~in_window).sum()) * sign
+        valid &= in_window
+        if not valid.any():
+            return
+        df, days, minutes = df[valid], days[valid], minutes[valid]
+        departments = self._codes(df['department'], self._departments)
+        statuses = self._codes(df['status'], self._statuses)
+        self._ensure_shape(days.min(), days.max())
+
+        offsets = (days - self._origin).astype(np.int64)
+        slots = (minutes // SLOT_MINUTES).astype(np.int64) % SLOTS_PER_DAY
+        flat = np.ravel_multi_index((offsets, slots, departments, statuses), self._counts.shape)
+        np.add.at(self._counts.reshape(-1), flat, sign)
+        first = int(offsets.min())
+        self._dirty_from = first if self._dirty_from is None else min(self._dirty_from, first)
+
+    def _reset(self, df):
+        self._counts, self._origin, self._prefix, self._daily = None, None, None, None
+        self._departments, self._statuses = {}, {}
+        today = np.datetime64('today', 'D')
+        self._window = (today - np.timedelta64(HISTORY_DAYS, 'D'), today + np.timedelta64(FUTURE_DAYS, 'D'))
+        self._stats['skipped'] = self._stats['out_of_range'] = 0
+        self._apply(df, 1)
+
+    def _update(self, removed, added):
+        self._apply(removed, -1)
+        self._apply(added, 1)
+
+    # ---- query ----
+
+    def _day_range(self, start=None, end=None):
+        """(offset awal, offset akhir inklusif) di kubus; None kalau range di luar data"""
+        if self._counts is None or not len(self._counts):
+            return None
+        first = 0 if start is None else int((np.datetime64(start, 'D') - self._origin).astype(int))
+        last = len(self._counts) - 1 if end is None else int((np.datetime64(end, 'D') - self._origin).astype(int))
+        first, last = max(first, 0), min(last, len(self._counts) - 1)
+        return (first, last) if first <= last else None
+
+    def _range_counts(self, first, last):
+        """counts[first..last] dijumlah per hari -> [slot, departemen, status]"""
+        if self._prefix is None:
+            prefix = np.zeros((len(self._counts) + 1,) + self._counts.shape[1:], dtype=np.int32)
+            np.cumsum(self._counts, axis=0, out=prefix[1:])
+            self._prefix = prefix
+            self._daily = self._counts.sum(axis=1)
+        elif self._dirty_from is not None:
+            # Hanya hari >= hari paling awal yang berubah (biasanya hari-hari terakhir)
+            dirty = self._dirty_from
+            np.cumsum(self._counts[dirty:], axis=0, out=self._prefix[dirty + 1:])
+            self._prefix[dirty + 1:] += self._prefix[dirty]
+            self._daily[dirty:] = self._counts[dirty:].sum(axis=1)
+        self._dirty_from = None
+        return self._prefix[last + 1] - self._prefix[first]
+
+    def _selector(self, mapping, value):
+        if value is None:
+            return slice(None)
+        return [mapping[value]] if value in mapping else []
+
+    def summary(self, start=None, end=None, department=None, status=None):
+        """
+        Kurva kedatangan, rasio pembatalan, beban departemen dan tren harian
+        untuk range tanggal [start, end] (inklusif, None = terbuka). Filter
+        department/status opsional; rasio pembatalan mengabaikan filter status.
+        """
+        with self._lock:
+            self._stats['queries'] += 1
+            departments = list(self._departments)
+            statuses = list(self._statuses)
+            day_range = self._day_range(start, end)
+            if day_range is None:
+                return _empty_summary(departments, statuses)
+            first, last = day_range
+            totals = self._range_counts(first, last)
+            dept_sel = self._selector(self._departments, department)
+            by_day = self._daily[first:last + 1][:, dept_sel].copy()   # _daily diperbarui in-place
+            origin = self._origin
+
+        status_sel = self._selector(self._statuses, status)
+        # [slot, departemen, status] sesuai filter departemen, semua status
+        dept_totals = totals[:, dept_sel]
+        selected = dept_totals[:, :, status_sel]
+        days = last - first + 1
+
+        per_slot = selected.sum(axis=(1, 2))
+        per_hour = per_slot.reshape(24, SLOTS_PER_HOUR).sum(axis=1)
+        by_dept_status = dept_totals.sum(axis=0)  # [departemen, status]
+        dept_names = [departments[i] for i in np.arange(len(departments))[dept_sel]]
+        cancelled = [self._statuses[s] for s in CANCELLED_STATUSES if s in self._statuses]
+
+        department_load = {}
+        cancellation_by_department = {}
+        for name, row in zip(dept_names, by_dept_status):
+            shown = row[status_sel].sum()
+            if row.sum() == 0:
+                continue
+            department_load[name] = {
+                'total': int(shown),
+                'by_status': {statuses[i]: int(row[i]) for i in np.arange(len(statuses))[status_sel] if row[i]},
+            }
+            cancellation_by_department[name] = round(row[cancelled].sum() / row.sum() * 100, 1)
+
+        status_totals = by_dept_status.sum(axis=0)
+        all_visits = int(status_totals.sum())
+        daily = by_day[:, :, status_sel].sum(axis=(1, 2))
+        dates = np.datetime_as_string(origin + np.arange(first, last + 1), unit='D')
+
+        return {
+            'start_date': str(dates[0]),
+            'end_date': str(dates[-1]),
+            'days': days,
+            'total_visits': int(per_slot.sum()),
+            'status_counts': {statuses[i]: int(n) for i, n in enumerate(status_totals) if n},
+            'cancelled_visits': int(status_totals[cancelled].sum()),
+            'cancellation_rate': round(status_totals[cancelled].sum() / all_visits * 100, 1) if all_visits else 0.0,
+            'arrivals_by_hour': {f"{h:02d}:00": int(n) for h, n in enumerate(per_hour)},
+            'avg_arrivals_by_hour': {f"{h:02d}:00": round(n / days, 2) for h, n in enumerate(per_hour)},
+            'arrivals_by_slot': {_format_slot(s): int(n) for s, n in enumerate(per_slot) if n},
+            'department_load': department_load,
+            'cancellation_by_department': cancellation_by_department,
+            'daily_visits': {str(d): int(n) for d, n in zip(dates, daily) if n},
+            'departments': sorted(d for d in departments if d != '-'),
+            'statuses': sorted(s for s in statuses if s != '-'),
+        }
+
+    def stats(self):
+        with self._lock:
+            counts = self._counts
+            return {
+                **self._stats,
+                'visits': int(counts.sum()) if counts is not None else 0,
+                'first_day': str(self._origin) if counts is not None else None,
+                'days': len(counts) if counts is not None else 0,
+                'departments': len(self._departments),
+                'statuses': len(self._statuses),
+                'slot_minutes': SLOT_MINUTES,
+                'cube_bytes': int(counts.nbytes) if counts is not None else 0,
+            }
+
+
+def _empty_summary(departments, statuses):
+    return {
+        'start_date': None, 'end_date': None, 'days': 0, 'total_visits': 0,
+        'status_counts': {}, 'cancelled_visits': 0, 'cancellation_rate': 0.0,
+        'arrivals_by_hour': {f"{h:02d}:00": 0 for h in range(24)},
+        'avg_arrivals_by_hour': {f"{h:02d}:00": 0.0 for h in range(24)},
+        'arrivals_by_slot': {}, 'department_load': {}, 'cancellation_by_department': {},
+        'daily_visits': {},
+        'departments': sorted(d for d in departments if d != '-'),
+        'statuses': sorted(s for s in statuses if s != '-'),
+    }
+
+
+registration_index = RegistrationIndex()
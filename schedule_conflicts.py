@@ -0,0 +1,134 @@
+import heapq
+
+import pandas as pd
+
+# ------------------------------
+# DETEKSI BENTROK JADWAL
+# ------------------------------
+# Jadwal dikelompokkan per (kunci, hari) -- kunci = doctor_id atau room_id --
+# lalu disapu sekali setelah diurutkan berdasarkan jam mulai. Interval yang
+# masih "aktif" disimpan di min-heap berdasarkan jam selesai; setiap jadwal
+# baru bentrok dengan semua interval yang masih aktif. Total O(n log n + k)
+# untuk k pasangan bentrok, tanpa membandingkan semua pasangan.
+#
+# Jadwal yang bersentuhan (08:00-12:00 lalu 12:00-16:00) tidak dianggap bentrok.
+
+CONFLICT_KEYS = {
+    'doctor': 'doctor_id',
+    'room': 'room_id',
+}
+
+CONFLICT_COLUMNS = [
+    'kind', 'key', 'schedule_day', 'overlap_start', 'overlap_end',
+    'schedule_id_a', 'name_a', 'room_id_a', 'start_time_a', 'end_time_a',
+    'schedule_id_b', 'name_b', 'room_id_b', 'start_time_b', 'end_time_b',
+]
+
+
+def to_minutes(times):
+    """
+    'HH:MM' (CSV/snapshot) atau '0 days HH:MM:SS' (TIME MySQL yang sudah
+    di-str) -> menit sejak 00:00. Nilai yang tidak terbaca -> NaN.
+    """
+    parts = times.astype(str).str.extract(r'(\d{1,2}):(\d{2})')
+    return pd.to_numeric(parts[0]) * 60 + pd.to_numeric(parts[1])
+
+
+def _format_minutes(minutes):
+    minutes = int(minutes) % (24 * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _sweep(starts, ends):
+    """Yield pasangan posisi (i, j) yang intervalnya overlap; input sudah urut menurut start"""
+    active = []  # heap (end, posisi)
+    for j in range(len(starts)):
+        while active and active[0][0] <= starts[j]:
+            heapq.heappop(active)
+        for _, i in active:
+            yield i, j
+        heapq.heappush(active, (ends[j], j))
+
+
+def find_overlaps(df, kind):
+    """Semua pasangan jadwal yang overlap untuk satu jenis kunci ('doctor' / 'room')"""
+    key = CONFLICT_KEYS[kind]
+    columns = ['schedule_id', 'schedule_day', 'name', 'room_id', 'start_time', 'end_time']
+    frame = df[list(dict.fromkeys([key] + columns))].copy()
+    frame['start'] = to_minutes(frame['start_time'])
+    frame['end'] = to_minutes(frame['end_time'])
+    frame = frame.dropna(subset=[key, 'schedule_day', 'start', 'end'])
+    # Shift yang lewat tengah malam (22:00-06:00) berakhir keesokan harinya
+    frame.loc[frame['end'] <= frame['start'], 'end'] += 24 * 60
+    frame = frame.sort_values([key, 'schedule_day', 'start'], kind='stable')
+
+    conflicts = []
+    records = frame.to_dict('records')
+    group_sizes = frame.groupby([key, 'schedule_day'], sort=False, observed=True).size()
+    offset = 0
+    for size in group_sizes:
+        group = records[offset:offset + size]
+        offset += size
+        if size < 2:
+            continue
+        starts = [r['start'] for r in group]
+        ends = [r['end'] for r in group]
+        for i, j in _sweep(starts, ends):
+            a, b = group[i], group[j]
+            conflicts.append({
+                'kind': kind,
+                'key': a[key],
+                'schedule_day': a['schedule_day'],
+                'overlap_start': _format_minutes(max(a['start'], b['start'])),
+                'overlap_end': _format_minutes(min(a['end'], b['end'])),
+                'schedule_id_a': a['schedule_id'], 'name_a': a['name'], 'room_id_a': a['room_id'],
+                'start_time_a': a['start_time'], 'end_time_a': a['end_time'],
+                'schedule_id_b': b['schedule_id'], 'name_b': b['name'], 'room_id_b': b['room_id'],
+                'start_time_b': b['start_time'], 'end_time_b': b['end_time'],
+            })
+    return conflicts
+
+
+def find_schedule_conflicts(df, kinds=('doctor', 'room')):
+    """Bentrok dokter dan ruangan sebagai DataFrame (kolom CONFLICT_COLUMNS)"""
+    required = {'schedule_id', 'schedule_day', 'name', 'room_id', 'start_time', 'end_time'}
+    if df.empty or not required.issubset(df.columns):
+        return pd.DataFrame(columns=CONFLICT_COLUMNS)
+
+    conflicts = []
+    for kind in kinds:
+        if CONFLICT_KEYS[kind] in df.columns:
+            conflicts.extend(find_overlaps(df, kind))
+    return pd.DataFrame(conflicts, columns=CONFLICT_COLUMNS)
+
+
+def conflict_summary(conflicts):
+    """Ringkasan untuk kartu/metric: jumlah per jenis, per hari, dan kunci yang terlibat"""
+    by_kind = conflicts.groupby('kind').size().to_dict() if not conflicts.empty else {}
+    return {
+        'total_conflicts': len(conflicts),
+        'doctor_conflicts': by_kind.get('doctor', 0),
+        'room_conflicts': by_kind.get('room', 0),
+        'by_day': conflicts['schedule_day'].astype(str).value_counts().to_dict() if not conflicts.empty else {},
+        'doctors_involved': conflicts.loc[conflicts['kind'] == 'doctor', 'key'].nunique(),
+        'rooms_involved': conflicts.loc[conflicts['kind'] == 'room', 'key'].nunique(),
+    }
+
+
+def filter_conflicts(conflicts, args):
+    """Filter ?kind=doctor|room, ?day=, ?key= (doctor_id/room_id), ?room_id= (salah satu sisi)"""
+    kind = args.get('kind', 'All')
+    day = args.get('day', 'All')
+    key = (args.get('key') or '').strip()
+    room_id = args.get('room_id', 'All')
+
+    mask = pd.Series(True, index=conflicts.index)
+    if kind in CONFLICT_KEYS:
+        mask &= conflicts['kind'] == kind
+    if day and day != 'All':
+        mask &= conflicts['schedule_day'] == day
+    if key:
+        mask &= conflicts['key'] == key
+    if room_id and room_id != 'All':
+        mask &= (conflicts['room_id_a'] == room_id) | (conflicts['room_id_b'] == room_id)
+    return conflicts[mask]
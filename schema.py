@@ -0,0 +1,224 @@
+import codecs
+import os
+
+import pandas as pd
+
+# ------------------------------
+# SKEMA TABEL HOSPITAL
+# ------------------------------
+# Satu sumber kebenaran untuk nama file CSV, primary key dan tipe kolom.
+# Tipe: 'string', 'category' (string dengan sedikit nilai unik), 'int', 'float',
+#       'date' ('YYYY-MM-DD'), 'time' ('HH:MM', disimpan sebagai string)
+# 'category' disimpan sebagai string (MySQL/snapshot) dan baru jadi dtype
+# category saat dimuat ke memori, lihat apply_dtypes.
+TABLES = {
+    'doctor_schedule': {
+        'csv': 'doctor_schedule.csv',
+        'primary_key': 'schedule_id',
+        'columns': {
+            'schedule_id': 'string', 'doctor_id': 'category', 'name': 'category',
+            'specialization': 'category', 'schedule_day': 'category',
+            'start_time': 'time', 'end_time': 'time', 'room_id': 'category',
+        },
+    },
+    'finance': {
+        'csv': 'finance.csv',
+        'primary_key': 'transaction_id',
+        'columns': {
+            'transaction_id': 'string', 'patient_id': 'string', 'entry_type': 'category',
+            'service_type': 'category', 'amount_idr': 'float', 'payment_type': 'category',
+            'insurance_provider': 'category', 'payment_method': 'category', 'transaction_date': 'date',
+        },
+    },
+    'lab_tests': {
+        'csv': 'lab_tests.csv',
+        'primary_key': 'test_id',
+        'columns': {
+            'test_id': 'string', 'patient_id': 'string', 'test_type': 'category',
+            'scheduled_date': 'date', 'result_date': 'date', 'result_status': 'category',
+            'lab_staff_id': 'category',
+        },
+    },
+    'patient_trends': {
+        'csv': 'patient_trends.csv',
+        'primary_key': 'date',
+        'columns': {
+            'date': 'date', 'total_patients': 'int', 'top_disease': 'category',
+            'weather': 'category', 'population_density': 'float', 'external_event': 'category',
+        },
+    },
+    'patients': {
+        'csv': 'patients.csv',
+        'primary_key': 'patient_id',
+        'columns': {
+            'patient_id': 'string', 'name': 'string', 'gender': 'category', 'birth_date': 'date',
+            'phone': 'string', 'address': 'string', 'city': 'category',
+            'payment_type': 'category', 'insurance_provider': 'category',
+        },
+    },
+    'pharmacy_stock': {
+        'csv': 'pharmacy_stock.csv',
+        'primary_key': 'drug_id',
+        'columns': {
+            'drug_id': 'string', 'drug_name': 'category', 'category': 'category',
+            'stock_in': 'int', 'stock_out': 'int', 'stock_date': 'date',
+            'expiry_date': 'date', 'supplier': 'category',
+        },
+    },
+    'registrations': {
+        'csv': 'registrations.csv',
+        'primary_key': 'registration_id',
+        'columns': {
+            'registration_id': 'string', 'patient_id': 'string', 'visit_date': 'date',
+            'visit_time': 'time', 'department': 'category', 'status': 'category',
+        },
+    },
+    'rooms': {
+        'csv': 'rooms.csv',
+        'primary_key': 'room_id',
+        'columns': {
+            'room_id': 'string', 'room_name': 'string', 'room_type': 'category',
+            'capacity': 'int', 'current_occupancy': 'int', 'special_note': 'category',
+            'last_updated': 'date',
+        },
+    },
+    'staff': {
+        'csv': 'staff.csv',
+        'primary_key': 'staff_id',
+        'columns': {
+            # active disimpan sebagai 'True'/'False', sama seperti yang dibandingkan di app
+            'staff_id': 'string', 'name': 'string', 'role': 'category', 'department': 'category',
+            'hire_date': 'date', 'active': 'category',
+        },
+    },
+}
+
+
+class SchemaError(ValueError):
+    """Nilai di CSV tidak sesuai tipe kolom di skema"""
+
+
+def detect_encoding(path, sample_size=65536):
+    """
+    Deteksi encoding file CSV. BOM dicek dulu (murah), lalu coba UTF-8;
+    chardet hanya dipakai kalau keduanya gagal dan package-nya terpasang.
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    try:
+        import chardet
+        return chardet.detect(sample)['encoding'] or 'latin-1'
+    except ImportError:
+        return 'latin-1'
+
+
+def coerce_types(df, table):
+    """
+    Konversi kolom string hasil baca CSV ke tipe di skema.
+    Nilai yang tidak valid memicu SchemaError (berisi contoh baris yang gagal).
+    """
+    columns = TABLES[table]['columns']
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise SchemaError(f"{table}: kolom tidak ditemukan di CSV: {missing}")
+
+    df = df[list(columns)].copy()
+    for col, col_type in columns.items():
+        raw = df[col]
+        if col_type in ('string', 'category'):
+            continue
+        if col_type == 'int':
+            values = pd.to_numeric(raw, errors='coerce')
+            bad = values.isna() & raw.notna() | (values.notna() & (values % 1 != 0))
+            df[col] = values.astype('Int64') if not bad.any() else values
+        elif col_type == 'float':
+            values = pd.to_numeric(raw, errors='coerce')
+            bad = values.isna() & raw.notna()
+            df[col] = values
+        elif col_type == 'date':
+            values = pd.to_datetime(raw, format='%Y-%m-%d', errors='coerce')
+            bad = values.isna() & raw.notna()
+            df[col] = values.dt.date
+        elif col_type == 'time':
+            values = pd.to_datetime(raw, format='%H:%M', errors='coerce')
+            bad = values.isna() & raw.notna()
+        else:
+            raise SchemaError(f"{table}.{col}: tipe tidak dikenal '{col_type}'")
+
+        if bad.any():
+            sample = raw[bad].head(3).tolist()
+            raise SchemaError(f"{table}.{col}: {int(bad.sum())} nilai bukan {col_type}, contoh {sample}")
+    return df
+
+
+def read_csv_chunks(table, path=None, chunksize=50000, encoding=None):
+    """Baca CSV tabel per chunk, sudah dikonversi ke tipe skema"""
+    path = path or TABLES[table]['csv']
+    encoding = encoding or detect_encoding(path)
+    reader = pd.read_csv(
+        path, encoding=encoding, dtype=str, keep_default_na=False,
+        na_values=[''], chunksize=chunksize
+    )
+    for chunk in reader:
+        yield coerce_types(chunk, table)
+
+
+def csv_path(table, source_dir='.'):
+    return os.path.join(source_dir, TABLES[table]['csv'])
+
+
+def apply_dtypes(df, table):
+    """
+    Dtype ringkas untuk DataFrame yang disimpan di memori/cache:
+    'category' -> category, 'string'/'time' -> str, 'date' -> datetime64,
+    angka -> numerik. Kolom di luar skema (mis. kolom hasil JOIN) dibiarkan.
+    """
+    for col, col_type in TABLES[table]['columns'].items():
+        if col not in df.columns:
+            continue
+        if col_type == 'category':
+            df[col] = df[col].astype('category')
+        elif col_type in ('string', 'time'):
+            df[col] = df[col].astype('str')
+        elif col_type == 'date':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def memory_report(source_dir='.'):
+    """
+    Memori per tabel (MB, deep): kolom object seperti hasil mysql.connector
+    dibandingkan dengan apply_dtypes. Return list of dict.
+    """
+    report = []
+    for table in TABLES:
+        df = pd.concat(read_csv_chunks(table, csv_path(table, source_dir)), ignore_index=True)
+        numeric = [col for col, col_type in TABLES[table]['columns'].items() if col_type in ('int', 'float')]
+        before = df.astype({col: object for col in df.columns if col not in numeric})
+        after = apply_dtypes(df.copy(), table)
+        before_mb = before.memory_usage(deep=True).sum() / 1e6
+        after_mb = after.memory_usage(deep=True).sum() / 1e6
+        report.append({
+            'table': table,
+            'rows': len(df),
+            'before_mb': round(before_mb, 3),
+            'after_mb': round(after_mb, 3),
+            'ratio': round(after_mb / before_mb, 3) if before_mb else 0,
+        })
+    return report
+
+
+if __name__ == '__main__':
+    # python schema.py  -> laporan memori per tabel
+    for r in memory_report():
+        print(f"{r['table']:<16} {r['rows']:>8} baris  {r['before_mb']:>8.3f} MB -> "
+              f"{r['after_mb']:>8.3f} MB  ({r['ratio']:.0%})")
@@ -0,0 +1,310 @@
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------
+# TRIGRAM SEARCH INDEX
+# ------------------------------
+# Inverted index trigram (per byte UTF-8) untuk pencarian nama/ID:
+#   - segmen dasar: postings CSR di numpy (kode trigram terurut -> posisi dokumen),
+#     dibangun vektor sekaligus dari DataFrame hasil loader
+#   - segmen delta: dokumen yang ditambah/diubah sejak build terakhir (dict biasa),
+#     dokumen lama yang diganti/dihapus ditandai tombstone
+# Query >= 3 byte = substring (sama dengan LIKE '%q%'), kandidat dari irisan
+# postings lalu diverifikasi. Query 2 byte = awalan kata (untuk typeahead).
+# Kalau delta melebihi REBUILD_RATIO dari jumlah dokumen, index dibangun ulang.
+
+REBUILD_RATIO = 0.1
+BUILD_CHUNK = 100000
+
+
+# Pemisah antar kolom teks. Termasuk whitespace bagi str.split(), jadi tidak
+# pernah ada di query ter-normalisasi maupun di isi kolom: substring tidak bisa
+# cocok melintasi batas dua kolom ('ta p' tidak cocok dengan '...ta' + 'p...')
+FIELD_SEPARATOR = '\x1f'
+
+
+def normalize(values):
+    """Series teks -> lowercase, spasi dirapikan, diapit spasi (untuk awalan kata)"""
+    text = values.astype(str).where(values.notna(), '').str.lower()
+    return ' ' + text.str.replace(r'\s+', ' ', regex=True).str.strip() + ' '
+
+
+def _normalize_query(query):
+    return ' '.join(str(query or '').lower().split())
+
+
+def _codes(data):
+    """bytes -> kode trigram (b0 << 16 | b1 << 8 | b2)"""
+    return {(data[i] << 16) | (data[i + 1] << 8) | data[i + 2] for i in range(len(data) - 2)}
+
+
+def _build_postings(texts):
+    """
+    Postings CSR dari list teks ter-normalisasi: return (codes, offsets, postings).
+    Teks di-encode ke matriks uint8 (n x panjang maks) per chunk, trigram
+    dihitung dengan shift, lalu pasangan (kode, dokumen) unik diurutkan sekali.
+    """
+    n = len(texts)
+    keys = []
+    for start in range(0, n, BUILD_CHUNK):
+        chunk = [t.encode('utf-8') for t in texts[start:start + BUILD_CHUNK]]
+        width = max((len(b) for b in chunk), default=0)
+        if width < 3:
+            continue
+        matrix = np.frombuffer(
+            np.array(chunk, dtype=f'S{width}').tobytes(), dtype=np.uint8
+        ).reshape(len(chunk), width).astype(np.int64)
+        codes = (matrix[:, :-2] << 16) | (matrix[:, 1:-1] << 8) | matrix[:, 2:]
+        valid = matrix[:, 2:] != 0
+        docs = np.broadcast_to(np.arange(start, start + len(chunk))[:, None], codes.shape)
+        keys.append(codes[valid] * n + docs[valid])
+
+    if not keys:
+        return np.empty(0, np.int64), np.zeros(1, np.int64), np.empty(0, np.int32)
+    # sort + mask lebih cepat dari np.unique untuk puluhan juta key
+    keys = np.concatenate(keys)
+    keys.sort()
+    keys = keys[np.append(True, keys[1:] != keys[:-1])]
+    code_per_key, postings = np.divmod(keys, n)
+    starts = np.flatnonzero(np.append(True, code_per_key[1:] != code_per_key[:-1]))
+    offsets = np.append(starts, len(postings))
+    return code_per_key[starts], offsets, postings.astype(np.int32)
+
+
+class TrigramIndex:
+    def __init__(self, id_column, text_columns, display_columns):
+        self.id_column = id_column
+        self.text_columns = text_columns
+        self.display_columns = display_columns
+        self._lock = threading.Lock()
+        self._source = None
+        empty = pd.DataFrame(columns=list(dict.fromkeys([id_column] + text_columns + display_columns)))
+        self._reset(*self._documents(empty))
+        self._stats = {'builds': 0, 'incremental_updates': 0, 'last_build_seconds': 0.0}
+
+    # ---- build ----
+
+    def _documents(self, df):
+        columns = list(dict.fromkeys([self.id_column] + self.text_columns + self.display_columns))
+        docs = df[[col for col in columns if col in df.columns]]
+        docs = docs.dropna(subset=[self.id_column]).drop_duplicates(self.id_column)
+        text = normalize(docs[self.text_columns[0]])
+        for col in self.text_columns[1:]:
+            text = text + FIELD_SEPARATOR + normalize(docs[col])
+        # Index object (hash table Python) -- diff/reindex per id jauh lebih cepat
+        ids = docs[self.id_column].astype(str).to_numpy(dtype=object)
+        return docs.reset_index(drop=True), pd.Series(text.to_numpy(dtype=object), index=ids)
+
+    def _reset(self, docs, texts):
+        start = time.perf_counter()
+        # Dokumen diurutkan menurut teks: posisi = urutan alfabetis, sehingga
+        # postings (dan hasil irisannya) sudah urut tanpa sort saat query
+        order = np.argsort(texts.to_numpy(), kind='stable')
+        docs, texts = docs.iloc[order].reset_index(drop=True), texts.iloc[order]
+        codes, offsets, postings = _build_postings(texts.tolist())
+        # Segmen dasar diganti sekaligus
+        self._base = {
+            'codes': codes, 'offsets': offsets, 'postings': postings,
+            'texts': texts.tolist(), 'ids': pd.Index(texts.index), 'docs': docs,
+        }
+        self._current = texts  # id -> teks, untuk diff incremental
+        self._deleted = set()  # posisi dokumen dasar yang sudah tidak berlaku
+        self._delta = {}  # id -> (teks, record)
+        self._delta_postings = {}  # kode trigram -> set id
+        return time.perf_counter() - start
+
+    # ---- update incremental ----
+
+    def _delta_remove(self, doc_id):
+        text, _ = self._delta.pop(doc_id)
+        for code in _codes(text.encode('utf-8')):
+            ids = self._delta_postings.get(code)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._delta_postings[code]
+
+    def _remove(self, doc_id):
+        if doc_id in self._delta:
+            self._delta_remove(doc_id)
+        ids = self._base['ids']
+        if doc_id in ids:
+            self._deleted.add(ids.get_loc(doc_id))
+
+    def _upsert(self, doc_id, text, record):
+        self._remove(doc_id)
+        self._delta[doc_id] = (text, record)
+        for code in _codes(text.encode('utf-8')):
+            self._delta_postings.setdefault(code, set()).add(doc_id)
+
+    def sync(self, df):
+        """
+        Samakan index dengan `df`. Frame yang sama (objek cache yang sama)
+        dilewati; frame baru di-diff per id dan hanya dokumen yang berubah
+        masuk delta. Return dict jumlah upsert/remove (atau rebuild=True).
+        """
+        if df is self._source:
+            return {'upserted': 0, 'removed': 0}
+        with self._lock:
+            if df is self._source:
+                return {'upserted': 0, 'removed': 0}
+
+            docs, texts = self._documents(df)
+            if self._source is None:
+                changed, removed = None, []
+            else:
+                old = self._current
+                removed = old.index.difference(texts.index)
+                previous = old.reindex(texts.index)
+                changed = texts.index[previous.isna() | (previous != texts)]
+
+            pending = (len(self._delta) + len(changed) + len(removed)) if changed is not None else None
+            if pending is None or pending > REBUILD_RATIO * max(len(texts), 1):
+                self._stats['last_build_seconds'] = round(self._reset(docs, texts), 3)
+                self._stats['builds'] += 1
+                self._source = df
+                return {'rebuild': True, 'documents': len(texts)}
+
+            positions = pd.Index(texts.index).get_indexer(changed)
+            records = docs.iloc[positions].to_dict('records')
+            for doc_id in removed:
+                self._remove(doc_id)
+            for doc_id, record in zip(changed, records):
+                self._upsert(doc_id, texts[doc_id], record)
+            self._current = texts
+            self._stats['incremental_updates'] += 1
+            self._source = df
+            return {'upserted': len(changed), 'removed': len(removed)}
+
+    # ---- query ----
+
+    def _base_candidates(self, codes):
+        base = self._base
+        idx = np.searchsorted(base['codes'], codes)
+        if (idx >= len(base['codes'])).any() or (base['codes'][idx] != codes).any():
+            return np.empty(0, np.int32)
+        # Postings terpendek dulu supaya irisan cepat mengecil
+        lists = sorted(
+            (base['postings'][base['offsets'][i]:base['offsets'][i + 1]] for i in idx), key=len
+        )
+        result = lists[0]
+        for postings in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, postings, assume_unique=True)
+        return result
+
+    def _delta_candidates(self, codes):
+        result = None
+        for code in codes:
+            ids = self._delta_postings.get(code, set())
+            result = set(ids) if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+    def _matches(self, query):
+        """
+        (posisi dasar yang cocok -- urut alfabetis, list (teks, record) delta yang cocok),
+        atau None kalau query < 2 byte. Query 2 byte dicari sebagai awalan kata.
+        """
+        needle = query if len(query.encode('utf-8')) >= 3 else ' ' + query
+        data = needle.encode('utf-8')
+        if len(data) < 3:
+            return None
+        codes = np.array(sorted(_codes(data)), dtype=np.int64)
+
+        positions = self._base_candidates(codes)
+        if self._deleted:
+            positions = positions[~np.isin(positions, list(self._deleted))]
+        positions = positions.tolist()
+        if len(data) > 3:
+            # Lebih dari satu trigram: irisan postings belum tentu substring utuh
+            texts = self._base['texts']
+            positions = [pos for pos in positions if needle in texts[pos]]
+        delta = []
+        for doc_id in self._delta_candidates(codes.tolist()):
+            text, record = self._delta[doc_id]
+            if needle in text:
+                delta.append((text, None, record))
+        return positions, delta
+
+    def search(self, query, limit=10):
+        """
+        Return (jumlah cocok, list record). Query >= 3 byte: substring nama/ID;
+        2 byte: awalan kata; lebih pendek: kosong. Urutan: awalan nama, awalan
+        kata, lalu substring; di dalamnya alfabetis.
+        """
+        query = _normalize_query(query)
+        with self._lock:
+            found = self._matches(query)
+            if found is None:
+                return 0, []
+            positions, delta = found
+            base, deleted = self._base, self._deleted
+            texts = base['texts']
+
+        # Teks diawali spasi: startswith = awalan nama, ' q' di dalam = awalan kata
+        word = ' ' + query
+        if limit:
+            # Awalan nama = satu rentang di teks yang terurut
+            lo, hi = bisect_left(texts, word), bisect_left(texts, word + '\uffff')
+            first = [pos for pos in range(lo, hi) if pos not in deleted][:limit]
+            rest, tail = [], []
+            for pos in positions:
+                if len(first) + len(rest) >= limit:
+                    break
+                if lo <= pos < hi:
+                    continue
+                if word in texts[pos]:
+                    rest.append(pos)
+                elif len(tail) < limit:
+                    tail.append(pos)
+            top = first + rest + tail
+        else:
+            top = positions
+
+        matches = [(texts[pos], pos, None) for pos in top] + delta
+        matches.sort(key=lambda m: (not m[0].startswith(word), word not in m[0], m[0]))
+        top = matches[:limit] if limit else matches
+
+        base_rows = [pos for _, pos, _ in top if pos is not None]
+        base_records = iter(base['docs'].iloc[base_rows].to_dict('records')) if base_rows else iter(())
+        results = []
+        for _, pos, record in top:
+            row = next(base_records) if pos is not None else record
+            results.append({col: row.get(col) for col in self.display_columns})
+        return len(positions) + len(delta), results
+
+    def search_ids(self, query):
+        """Semua id yang teksnya memuat `query` (substring), atau None kalau query < 3 byte"""
+        query = _normalize_query(query)
+        if len(query.encode('utf-8')) < 3:
+            return None
+        with self._lock:
+            positions, delta = self._matches(query)
+            ids = set(self._base['ids'][positions])
+        return ids | {str(record[self.id_column]) for _, _, record in delta}
+
+    def stats(self):
+        return {
+            **self._stats,
+            'documents': len(self._current),
+            'trigrams': int(len(self._base['codes'])),
+            'postings': int(len(self._base['postings'])),
+            'delta_documents': len(self._delta),
+            'tombstones': len(self._deleted),
+        }
+
+
+# Satu index per entitas typeahead (lihat /api/search/<entity> di app.py)
+search_indexes = {
+    'patients': TrigramIndex('patient_id', ['name', 'patient_id'],
+                             ['patient_id', 'name', 'gender', 'birth_date', 'city', 'payment_type']),
+    'doctors': TrigramIndex('doctor_id', ['name'], ['doctor_id', 'name', 'specialization']),
+    'staff': TrigramIndex('staff_id', ['name', 'staff_id'], ['staff_id', 'name', 'role', 'department', 'active']),
+}
@@ -0,0 +1,155 @@
+import datetime
+import decimal
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import DefaultJSONProvider
+
+from instrumentation import phase
+
+try:
+    import orjson
+except ImportError:  # encoder stdlib json sebagai fallback
+    orjson = None
+
+# ------------------------------
+# SERIALISASI JSON
+# ------------------------------
+# DataFrame dikonversi per kolom sesuai dtype (bukan per sel dengan hasattr):
+#   datetime64  -> 'YYYY-MM-DD' kalau tepat tengah malam, selain itu ISO 8601
+#   timedelta64 -> durasi ISO 8601 ('P0DT8H30M0S')
+#   category    -> kategori dikonversi sekali, lalu diambil lewat codes
+#   float       -> NaN/inf jadi null
+# Struktur lain (dict/list hasil route) di-walk sekali, lalu di-encode dengan
+# orjson kalau ter-install (fallback json stdlib). FastJSONProvider memasang
+# jalur ini untuk jsonify() dan filter |tojson di template.
+
+_PLAIN = (str, int, bool, type(None))
+
+
+def _timestamp(value):
+    if value is pd.NaT:
+        return None
+    if value == value.normalize():
+        # Kolom date dimuat sebagai datetime64; tanpa jam -> 'YYYY-MM-DD'
+        return value.date().isoformat()
+    return value.isoformat()
+
+
+def json_value(value):
+    """Satu nilai Python/numpy/pandas -> tipe yang bisa di-encode JSON"""
+    if isinstance(value, _PLAIN):
+        return value
+    if isinstance(value, float):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, np.generic):
+        return json_value(value.item())
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return _timestamp(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (pd.Timedelta, datetime.timedelta, np.timedelta64)):
+        value = pd.Timedelta(value)
+        return None if value is pd.NaT else value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return json_value(float(value))
+    return str(value)
+
+
+def column_values(series):
+    """Satu kolom -> list nilai JSON, dikonversi sekaligus menurut dtype"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = column_values(pd.Series(dtype.categories))
+        # code -1 (NaN) mengambil elemen terakhir = None
+        lookup = np.array(categories + [None], dtype=object)
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        missing = series.isna().to_numpy()
+        midnight = (series == series.dt.normalize()).to_numpy()
+        result = series.dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+        for pos in np.flatnonzero(~midnight & ~missing):
+            result[pos] = series.iat[pos].isoformat()
+        result[missing] = None
+        return result.tolist()
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return [None if value is pd.NaT else value.isoformat() for value in series]
+    if pd.api.types.is_bool_dtype(dtype) and not series.hasnans:
+        return series.to_numpy(dtype=bool).tolist()
+    if pd.api.types.is_integer_dtype(dtype) and not series.hasnans:
+        return series.to_numpy(dtype=np.int64).tolist()
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        result = values.astype(object)
+        result[~np.isfinite(values)] = None
+        return result.tolist()
+    # str/object/nullable: hanya sel yang bukan tipe dasar yang dikonversi
+    values = series.to_numpy(dtype=object)
+    return [value if type(value) is str else json_value(value) for value in values]
+
+
+def to_columns(df):
+    """DataFrame -> {'columns': [...], 'data': [[nilai kolom 1], [nilai kolom 2], ...]} (ringkas)"""
+    columns = [str(col) for col in df.columns]
+    return {'columns': columns, 'data': [column_values(df.iloc[:, i]) for i in range(df.shape[1])]}
+
+
+def to_records(df):
+    """DataFrame -> list dict per baris (format lama clean_data_for_json)"""
+    columns = [str(col) for col in df.columns]
+    data = [column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*data)] if columns else [{} for _ in range(len(df))]
+
+
+FRAME_ORIENTS = {'records': to_records, 'columns': to_columns}
+
+
+def serialize_frame(df, orient='records'):
+    """?orient=records (default, list dict) atau columns (ringkas, per kolom)"""
+    return FRAME_ORIENTS.get(orient, to_records)(df)
+
+
+def to_json_safe(data):
+    """DataFrame/Series/dict/list bersarang -> struktur Python yang siap di-encode"""
+    if isinstance(data, pd.DataFrame):
+        return to_records(data)
+    if isinstance(data, pd.Series):
+        return dict(zip((json_value(key) for key in data.index), column_values(data)))
+    if isinstance(data, dict):
+        return {
+            key if type(key) is str else json_value(key): to_json_safe(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [to_json_safe(value) for value in data]
+    if isinstance(data, np.ndarray):
+        return column_values(pd.Series(data))
+    return json_value(data)
+
+
+def dumps(data, sort_keys=False, indent=None):
+    """Encode ke string JSON; orjson kalau tersedia"""
+    data = to_json_safe(data)
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option).decode('utf-8')
+    separators = None if indent else (',', ':')
+    return json.dumps(data, sort_keys=sort_keys, indent=indent, separators=separators, ensure_ascii=False)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider Flask lewat dumps() di atas: app.json = FastJSONProvider(app)"""
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize') as info:
+            text = dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys), indent=kwargs.get('indent'))
+            info['bytes'] = len(text)
+        return text
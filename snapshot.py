@@ -0,0 +1,174 @@
+import argparse
+import os
+import time
+
+from schema import TABLES, csv_path, read_csv_chunks
+
+# ------------------------------
+# SNAPSHOT KOLUMNAR (ARROW / PARQUET)
+# ------------------------------
+# CSV seed dikonversi sekali ke file Arrow IPC bertipe (tanpa kompresi, jadi
+# bisa di-memory-map dan dibaca tanpa parsing ulang), plus Parquet opsional
+# untuk arsip/ekspor yang lebih kecil. pyarrow adalah dependency opsional:
+# modul ini tetap bisa di-import tanpa pyarrow, error baru muncul saat dipakai.
+#
+#   python snapshot.py                      # semua tabel -> snapshots/*.arrow
+#   python snapshot.py --parquet patients   # satu tabel, sekalian .parquet
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_CHUNK_SIZE = 50000
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError(
+            "pyarrow belum terpasang; jalankan `pip install pyarrow` untuk memakai snapshot"
+        ) from e
+    return pa
+
+
+def arrow_schema(table):
+    """pyarrow.Schema untuk tabel berdasarkan tipe di schema.TABLES"""
+    pa = _pyarrow()
+    types = {
+        'string': pa.string(),
+        'category': pa.string(),
+        'time': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'date': pa.date32(),
+    }
+    return pa.schema([(col, types[col_type]) for col, col_type in TABLES[table]['columns'].items()])
+
+
+def snapshot_path(table, snapshot_dir=None, fmt='arrow'):
+    return os.path.join(snapshot_dir or SNAPSHOT_DIR, f"{table}.{fmt}")
+
+
+def build_snapshot(table, source_dir='.', snapshot_dir=None, parquet=False, chunksize=SNAPSHOT_CHUNK_SIZE):
+    """
+    Konversi CSV `table` ke snapshot Arrow (dan Parquet kalau diminta).
+    Ditulis per chunk ke file sementara lalu di-rename, jadi pembaca tidak
+    pernah melihat snapshot setengah jadi. Return jumlah baris.
+    """
+    pa = _pyarrow()
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    os.makedirs(snapshot_dir, exist_ok=True)
+    schema = arrow_schema(table)
+
+    arrow_file = snapshot_path(table, snapshot_dir)
+    parquet_file = snapshot_path(table, snapshot_dir, 'parquet')
+    rows = 0
+
+    parquet_writer = None
+    if parquet:
+        import pyarrow.parquet as pq
+        parquet_writer = pq.ParquetWriter(parquet_file + '.tmp', schema)
+
+    try:
+        with pa.OSFile(arrow_file + '.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                for chunk in read_csv_chunks(table, csv_path(table, source_dir), chunksize=chunksize):
+                    batch = pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+                    writer.write_batch(batch)
+                    if parquet_writer is not None:
+                        parquet_writer.write_batch(batch)
+                    rows += len(chunk)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    os.replace(arrow_file + '.tmp', arrow_file)
+    if parquet:
+        os.replace(parquet_file + '.tmp', parquet_file)
+    return rows
+
+
+def has_snapshot(table, snapshot_dir=None):
+    return os.path.exists(snapshot_path(table, snapshot_dir))
+
+
+def _open_snapshot(table, snapshot_dir=None):
+    pa = _pyarrow()
+    source = pa.memory_map(snapshot_path(table, snapshot_dir), 'r')
+    return pa.ipc.open_file(source)
+
+
+def read_snapshot(table, columns=None, snapshot_dir=None):
+    """Baca snapshot `table` (memory-mapped) sebagai DataFrame"""
+    arrow_table = _open_snapshot(table, snapshot_dir).read_all()
+    if columns is not None:
+        arrow_table = arrow_table.select(list(columns))
+    return arrow_table.to_pandas()
+
+
+def iter_snapshot_batches(table, snapshot_dir=None):
+    """Yield DataFrame per record batch -- untuk ekspor streaming tanpa memuat seluruh tabel"""
+    reader = _open_snapshot(table, snapshot_dir)
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i).to_pandas()
+
+
+def _frame_schema(df):
+    pa = _pyarrow()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    # Kolom yang seluruhnya kosong di chunk pertama bertipe null; pakai string
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def write_frames(frames, sink, fmt='arrow'):
+    """
+    Tulis iterator DataFrame ke `sink` (path atau file object) sebagai Arrow IPC
+    atau Parquet, chunk demi chunk. Skema diambil dari chunk pertama.
+    Return jumlah baris yang ditulis.
+    """
+    pa = _pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        open_writer = lambda schema: pq.ParquetWriter(sink, schema)
+    elif fmt == 'arrow':
+        open_writer = lambda schema: pa.ipc.new_file(sink, schema)
+    else:
+        raise ValueError(f"format tidak dikenal: {fmt}")
+
+    writer, schema, rows = None, None, 0
+    try:
+        for df in frames:
+            if writer is None:
+                schema = _frame_schema(df)
+                writer = open_writer(schema)
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+            rows += len(df)
+        if writer is None:
+            writer = open_writer(pa.schema([]))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Konversi CSV seed ke snapshot Arrow/Parquet")
+    parser.add_argument('tables', nargs='*', help="tabel yang dikonversi (default: semua)")
+    parser.add_argument('--source', default='.', help="folder CSV")
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help="folder snapshot")
+    parser.add_argument('--parquet', action='store_true', help="tulis juga file .parquet")
+    parser.add_argument('--chunksize', type=int, default=SNAPSHOT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    for table in args.tables or list(TABLES):
+        if table not in TABLES:
+            parser.error(f"tabel tidak dikenal: {table}")
+        start = time.perf_counter()
+        rows = build_snapshot(table, args.source, args.out, args.parquet, args.chunksize)
+        size_kb = os.path.getsize(snapshot_path(table, args.out)) / 1024
+        print(f"✅ {table}: {rows} baris, {size_kb:.0f} KB ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
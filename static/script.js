@@ -61,6 +61,10 @@ function changePage(tableType, direction) {
 
 // Update table display based on current page
 function updateTableDisplay(tableType) {
+    // Tabel yang sudah dipaginasi di server hanya berisi satu halaman
+    const pagination = document.getElementById(`${tableType}-pagination`);
+    if (pagination && pagination.dataset.serverPaginated) return;
+
     const state = paginationState[tableType];
     const rows = document.querySelectorAll(`.table-row[data-type="${tableType}"]`);
     const totalRows = rows.length;